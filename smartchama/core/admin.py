@@ -1,8 +1,10 @@
 from django.contrib import admin
 from .models import (
     UserProfile, Chama, Membership, Contribution, 
-    Transaction, Announcement, Message
+    Transaction, Announcement, Message, ChamaBalance, ContributionRollup,
+    ArrearsSnapshot, StatementRun, Job, Notification, MessageThread, ThreadParticipant
 )
+from .search import get_search_backend
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
@@ -30,21 +32,90 @@ class ContributionAdmin(admin.ModelAdmin):
     search_fields = ['membership__user__username', 'notes']
     date_hierarchy = 'date'
 
+class FullTextSearchMixin:
+    """
+    Match the text fields through the full-text index; search_fields only
+    covers the remaining (related) lookups.
+    """
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        related, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        ids = get_search_backend().search_ids(self.search_kind, search_term)
+        return queryset.filter(pk__in=ids) | related, may_have_duplicates
+
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ['chama', 'transaction_type', 'amount', 'date', 'purpose', 'created_by']
     list_filter = ['transaction_type', 'date', 'created_at']
-    search_fields = ['chama__name', 'purpose', 'description']
+    search_fields = ['chama__name']
+    search_kind = 'transaction'
     date_hierarchy = 'date'
 
 @admin.register(Announcement)
-class AnnouncementAdmin(admin.ModelAdmin):
+class AnnouncementAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ['chama', 'title', 'created_by', 'is_important', 'created_at']
     list_filter = ['is_important', 'created_at']
-    search_fields = ['title', 'content', 'chama__name']
+    search_fields = ['chama__name']
+    search_kind = 'announcement'
 
 @admin.register(Message)
-class MessageAdmin(admin.ModelAdmin):
+class MessageAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ['sender', 'recipient', 'subject', 'chama', 'is_read', 'created_at']
     list_filter = ['is_read', 'created_at']
-    search_fields = ['subject', 'content', 'sender__username', 'recipient__username']
+    search_fields = ['sender__username', 'recipient__username']
+    search_kind = 'message'
+
+@admin.register(MessageThread)
+class MessageThreadAdmin(admin.ModelAdmin):
+    list_display = ['user_low', 'user_high', 'message_count', 'last_message_at']
+    search_fields = ['user_low__username', 'user_high__username']
+    raw_id_fields = ['user_low', 'user_high', 'last_message']
+    readonly_fields = ['message_count', 'last_message_at']
+
+@admin.register(ThreadParticipant)
+class ThreadParticipantAdmin(admin.ModelAdmin):
+    list_display = ['user', 'other', 'unread_count', 'is_archived', 'last_message_at']
+    list_filter = ['is_archived']
+    search_fields = ['user__username', 'other__username']
+    raw_id_fields = ['thread', 'user', 'other']
+
+@admin.register(ChamaBalance)
+class ChamaBalanceAdmin(admin.ModelAdmin):
+    list_display = ['chama', 'membership', 'contributions_in', 'transactions_in', 'transactions_out', 'balance', 'updated_at']
+    search_fields = ['chama__name', 'membership__user__username']
+    readonly_fields = ['contributions_in', 'transactions_in', 'transactions_out', 'balance', 'updated_at']
+
+@admin.register(ContributionRollup)
+class ContributionRollupAdmin(admin.ModelAdmin):
+    list_display = ['chama', 'membership', 'period', 'period_start', 'total', 'count']
+    list_filter = ['period']
+    search_fields = ['chama__name', 'membership__user__username']
+    date_hierarchy = 'period_start'
+
+@admin.register(ArrearsSnapshot)
+class ArrearsSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['chama', 'membership', 'as_of', 'periods_due', 'expected', 'paid', 'arrears']
+    search_fields = ['chama__name', 'membership__user__username']
+    date_hierarchy = 'as_of'
+
+@admin.register(StatementRun)
+class StatementRunAdmin(admin.ModelAdmin):
+    list_display = ['chama', 'period_start', 'period_end', 'status', 'rendered', 'total', 'created_at', 'finished_at']
+    list_filter = ['status']
+    search_fields = ['chama__name']
+    readonly_fields = ['total', 'rendered', 'output_dir', 'output_format', 'error', 'started_at', 'finished_at']
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'attempts', 'run_at', 'locked_by', 'duration_ms', 'created_at']
+    list_filter = ['status', 'name']
+    readonly_fields = ['attempts', 'locked_by', 'locked_at', 'last_error', 'started_at', 'finished_at', 'duration_ms']
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ['user', 'chama', 'title', 'is_read', 'email_status', 'sms_status', 'created_at']
+    list_filter = ['is_read', 'email_status', 'sms_status']
+    search_fields = ['title', 'user__username', 'chama__name']
@@ -0,0 +1,241 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+from .db import replica_reads
+from .messaging import THREAD_ORDERING, cleared_by
+from .models import Announcement, Chama, Contribution, Membership, Message, Transaction
+from .pagination import paginate_keyset
+from .permissions import get_membership_map
+from .views import ANNOUNCEMENT_ORDERING, CONTRIBUTION_ORDERING, TRANSACTION_ORDERING
+
+
+class Resource:
+    """
+    How one model is exposed: public field name -> ORM path (read with
+    values(), so related names cost a join rather than a query), the keyset
+    ordering, and the timestamp that feeds Last-Modified.
+    """
+
+    def __init__(self, model, fields, ordering, timestamp):
+        self.model = model
+        self.fields = fields
+        self.ordering = ordering
+        self.timestamp = timestamp
+
+    def requested_fields(self, request):
+        """Field names from ?fields=a,b (all by default; id is always included), or None if one is unknown."""
+        value = request.GET.get('fields')
+        if not value:
+            return list(self.fields)
+        names = ['id'] + [name.strip() for name in value.split(',') if name.strip() and name.strip() != 'id']
+        if any(name not in self.fields for name in names):
+            return None
+        return names
+
+    def values(self, queryset, names):
+        # Only the requested columns, plus what the cursor and Last-Modified need
+        paths = {self.fields[name] for name in names}
+        paths.update(term.lstrip('-') for term in self.ordering)
+        paths.add(self.timestamp)
+        return queryset.values(*paths)
+
+    def serialize(self, row, names):
+        return {name: row[self.fields[name]] for name in names}
+
+
+CHAMAS = Resource(Chama, {
+    'id': 'id',
+    'name': 'name',
+    'description': 'description',
+    'contribution_amount': 'contribution_amount',
+    'contribution_frequency': 'contribution_frequency',
+    'is_active': 'is_active',
+    'created_by': 'created_by',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}, ['-created_at', '-id'], 'updated_at')
+
+MEMBERSHIPS = Resource(Membership, {
+    'id': 'id',
+    'user': 'user',
+    'username': 'user__username',
+    'role': 'role',
+    'joined_at': 'joined_at',
+}, ['joined_at', 'id'], 'joined_at')
+
+CONTRIBUTIONS = Resource(Contribution, {
+    'id': 'id',
+    'membership': 'membership',
+    'member': 'membership__user__username',
+    'amount': 'amount',
+    'date': 'date',
+    'reference': 'reference',
+    'notes': 'notes',
+    'created_at': 'created_at',
+}, CONTRIBUTION_ORDERING, 'created_at')
+
+TRANSACTIONS = Resource(Transaction, {
+    'id': 'id',
+    'transaction_type': 'transaction_type',
+    'amount': 'amount',
+    'date': 'date',
+    'purpose': 'purpose',
+    'description': 'description',
+    'created_by': 'created_by',
+    'created_at': 'created_at',
+}, TRANSACTION_ORDERING, 'created_at')
+
+ANNOUNCEMENTS = Resource(Announcement, {
+    'id': 'id',
+    'title': 'title',
+    'content': 'content',
+    'is_important': 'is_important',
+    'created_by': 'created_by',
+    'created_at': 'created_at',
+}, ANNOUNCEMENT_ORDERING, 'created_at')
+
+MESSAGES = Resource(Message, {
+    'id': 'id',
+    'thread': 'thread',
+    'sender': 'sender',
+    'sender_username': 'sender__username',
+    'recipient': 'recipient',
+    'recipient_username': 'recipient__username',
+    'subject': 'subject',
+    'content': 'content',
+    'chama': 'chama',
+    'is_read': 'is_read',
+    'created_at': 'created_at',
+}, THREAD_ORDERING, 'created_at')
+
+
+# Responses
+def error(status, message):
+    return JsonResponse({'error': message}, status=status)
+
+
+def conditional_json(request, payload, last_modified=None, check_last_modified=False):
+    """
+    Serialize ``payload`` and answer 304 when the client already has it. The
+    strong ETag is a hash of the exact bytes, so it changes with any change
+    to the representation. ``If-Modified-Since`` is only honoured when
+    ``check_last_modified`` says the timestamp moves on every change; for
+    append-only timestamps (created_at) an edit or delete would not move it.
+    """
+    body = json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+    etag = quote_etag(hashlib.sha256(body).hexdigest()[:32])
+    response = get_conditional_response(
+        request, etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified and check_last_modified else None,
+    )
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Per-user data: caches may keep it but must revalidate every time
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def collection(request, resource, queryset):
+    """One cursor page of ``queryset`` as {"results": [...], "next": url}."""
+    names = resource.requested_fields(request)
+    if names is None:
+        return error(400, f'Unknown field. Available fields: {", ".join(resource.fields)}.')
+    page = paginate_keyset(request, resource.values(queryset, names), resource.ordering)
+    payload = {
+        'results': [resource.serialize(row, names) for row in page],
+        'next': request.build_absolute_uri(page.next_url) if page.has_next else None,
+    }
+    last_modified = max((row[resource.timestamp] for row in page), default=None)
+    return conditional_json(request, payload, last_modified)
+
+
+def api_view(view):
+    """GET/HEAD only, answered with JSON errors instead of login redirects."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error(401, 'Authentication required.')
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def chama_api_view(view):
+    """api_view for /chamas/<chama_id>/ resources; non-members get 404 so ids don't leak."""
+    @api_view
+    @wraps(view)
+    def wrapper(request, chama_id, *args, **kwargs):
+        if chama_id not in get_membership_map(request.user):
+            return error(404, 'Chama not found.')
+        return view(request, chama_id, *args, **kwargs)
+    return wrapper
+
+
+# Endpoints
+@replica_reads
+@api_view
+def chama_list(request):
+    return collection(request, CHAMAS, Chama.objects.filter(pk__in=list(get_membership_map(request.user))))
+
+
+@replica_reads
+@chama_api_view
+def chama_detail(request, chama_id):
+    names = CHAMAS.requested_fields(request)
+    if names is None:
+        return error(400, f'Unknown field. Available fields: {", ".join(CHAMAS.fields)}.')
+    row = CHAMAS.values(Chama.objects.filter(pk=chama_id), names).first()
+    if row is None:
+        return error(404, 'Chama not found.')
+    # Every save moves updated_at, so If-Modified-Since is reliable here
+    return conditional_json(request, CHAMAS.serialize(row, names), row['updated_at'], check_last_modified=True)
+
+
+@replica_reads
+@chama_api_view
+def membership_list(request, chama_id):
+    return collection(request, MEMBERSHIPS, Membership.objects.filter(chama_id=chama_id, is_active=True))
+
+
+@replica_reads
+@chama_api_view
+def contribution_list(request, chama_id):
+    return collection(request, CONTRIBUTIONS, Contribution.objects.filter(membership__chama_id=chama_id))
+
+
+@replica_reads
+@chama_api_view
+def transaction_list(request, chama_id):
+    return collection(request, TRANSACTIONS, Transaction.objects.filter(chama_id=chama_id))
+
+
+@replica_reads
+@chama_api_view
+def announcement_list(request, chama_id):
+    return collection(request, ANNOUNCEMENTS, Announcement.objects.filter(chama_id=chama_id))
+
+
+@replica_reads
+@api_view
+def message_list(request):
+    """Messages the user sent or received, newest first; ?thread=<id> narrows to one conversation."""
+    user = request.user
+    messages = Message.objects.filter(Q(sender=user) | Q(recipient=user)).exclude(cleared_by(user))
+    thread = request.GET.get('thread')
+    if thread:
+        if not thread.isdigit():
+            return error(400, 'thread must be an integer.')
+        messages = messages.filter(thread_id=int(thread))
+    return collection(request, MESSAGES, messages)
@@ -0,0 +1,128 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+from django.db.models import Max, Q, Sum
+from django.utils import timezone
+
+from .cache import get_version
+from .models import ArrearsSnapshot, Membership
+
+ROLE_LABELS = dict(Membership.MEMBER_ROLE_CHOICES)
+
+# Contribution frequency -> (unit, step); unknown values fall back to monthly
+FREQUENCIES = {
+    'daily': ('days', 1),
+    'weekly': ('days', 7),
+    'fortnightly': ('days', 14),
+    'biweekly': ('days', 14),
+    'bi-weekly': ('days', 14),
+    'monthly': ('months', 1),
+    'quarterly': ('months', 3),
+    'yearly': ('months', 12),
+    'annually': ('months', 12),
+}
+
+
+def parse_frequency(frequency):
+    return FREQUENCIES.get((frequency or '').strip().lower(), FREQUENCIES['monthly'])
+
+
+def periods_due(joined, as_of, frequency):
+    """Number of contribution periods from ``joined`` to ``as_of``, counting the joining period."""
+    if as_of < joined:
+        return 0
+    unit, step = parse_frequency(frequency)
+    if unit == 'days':
+        return (as_of - joined).days // step + 1
+    months = (as_of.year - joined.year) * 12 + (as_of.month - joined.month)
+    return months // step + 1
+
+
+def expected_vs_paid(joined, paid, amount, frequency, as_of):
+    due = periods_due(joined, as_of, frequency)
+    expected = amount * due
+    paid = paid or Decimal('0.00')
+    return {
+        'periods_due': due,
+        'expected': expected,
+        'paid': paid,
+        'arrears': max(expected - paid, Decimal('0.00')),
+        'credit': max(paid - expected, Decimal('0.00')),
+    }
+
+
+def compute_arrears(chama_ids, as_of=None):
+    """
+    Expected vs paid for every active membership of ``chama_ids`` using one
+    grouped query; the schedule arithmetic runs per row in Python.
+    """
+    as_of = as_of or timezone.localdate()
+    rows = Membership.objects.filter(chama_id__in=chama_ids, is_active=True).order_by().values(
+        'pk', 'chama_id', 'user__username', 'role', 'joined_at',
+        'chama__contribution_amount', 'chama__contribution_frequency',
+    ).annotate(paid=Sum('contributions__amount', filter=Q(contributions__date__lte=as_of)))
+
+    results = []
+    for row in rows:
+        result = expected_vs_paid(
+            timezone.localdate(row['joined_at']), row['paid'],
+            row['chama__contribution_amount'], row['chama__contribution_frequency'], as_of,
+        )
+        result.update(
+            membership_id=row['pk'], chama_id=row['chama_id'], username=row['user__username'],
+            role=row['role'], role_display=ROLE_LABELS.get(row['role'], row['role']), joined_at=row['joined_at'],
+        )
+        results.append(result)
+    results.sort(key=lambda r: (-r['arrears'], r['username']))
+    return results
+
+
+def cached_arrears(chama):
+    """
+    Today's compute_arrears rows for ``chama``, cached until the chama's
+    version moves (contributions, memberships and chama edits all bump it).
+    """
+    today = timezone.localdate()
+    key = f'core:arrears:{chama.pk}:{get_version("chama", chama.pk)}:{today.isoformat()}'
+    rows = cache.get(key)
+    if rows is None:
+        rows = compute_arrears([chama.pk], today)
+        cache.set(key, rows, getattr(settings, 'ARREARS_CACHE_TIMEOUT', 3600))
+    return rows
+
+
+def summarize(rows):
+    return {
+        'members': len(rows),
+        'in_arrears': sum(1 for row in rows if row['arrears']),
+        'expected': sum((row['expected'] for row in rows), Decimal('0.00')),
+        'paid': sum((row['paid'] for row in rows), Decimal('0.00')),
+        'arrears': sum((row['arrears'] for row in rows), Decimal('0.00')),
+    }
+
+
+def take_snapshot(chama_ids, as_of=None, batch_size=5000):
+    """Store today's (or ``as_of``'s) arrears for ``chama_ids``, replacing any snapshot for that day."""
+    as_of = as_of or timezone.localdate()
+    rows = compute_arrears(chama_ids, as_of)
+    with db_transaction.atomic():
+        ArrearsSnapshot.objects.filter(chama_id__in=chama_ids, as_of=as_of).delete()
+        ArrearsSnapshot.objects.bulk_create([
+            ArrearsSnapshot(
+                chama_id=row['chama_id'], membership_id=row['membership_id'], as_of=as_of,
+                periods_due=row['periods_due'], expected=row['expected'], paid=row['paid'], arrears=row['arrears'],
+            ) for row in rows
+        ], batch_size=batch_size)
+    return len(rows)
+
+
+def latest_snapshot(chama):
+    """Return (as_of, {membership_id: arrears}) for the chama's most recent snapshot."""
+    as_of = ArrearsSnapshot.objects.filter(chama=chama).aggregate(latest=Max('as_of'))['latest']
+    if as_of is None:
+        return None, {}
+    return as_of, dict(
+        ArrearsSnapshot.objects.filter(chama=chama, as_of=as_of).values_list('membership_id', 'arrears')
+    )
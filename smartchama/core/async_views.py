@@ -0,0 +1,61 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.shortcuts import render
+
+from .dashboard import get_global_stats
+from .permissions import async_login_required, chama_member_required
+from .profiling import track_queries
+from .views import chama_detail_context, chama_detail_reads, dashboard_context, dashboard_reads
+
+
+def parallel_reads_enabled():
+    enabled = getattr(settings, 'ASYNC_PARALLEL_READS', None)
+    if enabled is None:
+        # A private in-memory SQLite database can't be opened from other connections
+        return not (connection.vendor == 'sqlite' and connection.is_in_memory_db())
+    return enabled
+
+
+def isolated(read):
+    """Wrap ``read`` to run on a pool thread with its own DB connection."""
+    def run():
+        try:
+            with track_queries():
+                return read()
+        finally:
+            # Pool threads outlive the request; honour CONN_MAX_AGE like a request would
+            close_old_connections()
+    return run
+
+
+async def gather_reads(reads):
+    """
+    Run the independent read callables in ``reads`` concurrently and return
+    {name: result}. Django's async ORM methods (aget, acount, ...) all hop to
+    the request's single thread-sensitive executor, so their queries never
+    overlap; each read here gets its own thread and connection instead.
+    """
+    if parallel_reads_enabled():
+        calls = [sync_to_async(isolated(read), thread_sensitive=False)() for read in reads.values()]
+    else:
+        calls = [sync_to_async(read)() for read in reads.values()]
+    return dict(zip(reads, await asyncio.gather(*calls)))
+
+
+@async_login_required
+async def dashboard(request):
+    reads = await gather_reads(dashboard_reads(request.user))
+    global_stats = None
+    if reads['profile'].is_admin():
+        global_stats = (await gather_reads({'stats': get_global_stats}))['stats']
+    return await sync_to_async(render)(request, 'core/dashboard.html', dashboard_context(reads, global_stats))
+
+
+@chama_member_required()
+async def chama_detail(request, chama_id):
+    reads = await gather_reads(chama_detail_reads(request.chama))
+    context = chama_detail_context(request.chama, request.membership, reads)
+    return await sync_to_async(render)(request, 'core/chama_detail.html', context)
@@ -0,0 +1,314 @@
+import asyncio
+import copy
+import json
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+
+from . import urls as core_urls
+from .models import Membership, Message, StatementRun, ThreadParticipant
+from .sqlite.base import apply_pragmas
+
+# Views that change the session, redirect the benchmark away from its target, stream
+# indefinitely or only accept POST
+SKIPPED_VIEWS = {'user_logout', 'chama_join', 'event_stream', 'message_bulk'}
+
+# (sync view, async twin) pairs compared by run_async_comparison
+ASYNC_PAIRS = [('dashboard', 'dashboard_async'), ('chama_detail', 'chama_detail_async')]
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of ``values`` (q in 0..100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples_ms, query_counts):
+    return {
+        'runs': len(samples_ms),
+        'p50_ms': round(percentile(samples_ms, 50), 3),
+        'p95_ms': round(percentile(samples_ms, 95), 3),
+        'p99_ms': round(percentile(samples_ms, 99), 3),
+        'queries': max(query_counts),
+    }
+
+
+def url_targets(user, exclude=(), skipped=None):
+    """
+    Return {url_name: path} for every GET-able route in core.urls. Routes whose
+    arguments cannot be filled from the user's data are left out and, when
+    ``skipped`` is a list, appended to it by name.
+    """
+    membership = Membership.objects.filter(user=user, is_active=True).order_by('pk').first()
+    # Opening an unread message or thread marks it read, so only targets whose GET changes nothing
+    message = Message.objects.filter(sender=user).order_by('-pk').first()
+    thread = ThreadParticipant.objects.filter(user=user, unread_count=0).order_by('-last_message_at').first()
+    run = None
+    if membership:
+        run = StatementRun.objects.filter(chama_id=membership.chama_id, status='done').order_by('-pk').first()
+    values = {
+        'chama_id': membership.chama_id if membership else None,
+        'membership_id': membership.pk if membership else None,
+        'message_id': message.pk if message else None,
+        'thread_id': thread.thread_id if thread else None,
+        'run_id': run.pk if run else None,
+    }
+    targets = {}
+    for pattern in core_urls.urlpatterns:
+        if not isinstance(pattern, URLPattern) or pattern.name in SKIPPED_VIEWS or pattern.name in exclude:
+            continue
+        kwargs = {name: values.get(name) for name in pattern.pattern.converters}
+        if None in kwargs.values():
+            if skipped is not None:
+                skipped.append(pattern.name)
+            continue
+        targets[pattern.name] = reverse(pattern.name, kwargs=kwargs)
+    return targets
+
+
+def benchmark_host():
+    # The test client's default "testserver" host is only allowed under the test runner
+    hosts = [host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')]
+    return hosts[0] if hosts else 'localhost'
+
+
+def run_benchmark(user, warmup=3, repetitions=20, exclude=(), client=None, skipped=None):
+    client = client or Client(HTTP_HOST=benchmark_host())
+    client.force_login(user)
+    results = {}
+    for name, path in url_targets(user, exclude, skipped).items():
+        for _ in range(warmup):
+            client.get(path)
+        samples, queries = [], []
+        status = None
+        for _ in range(repetitions):
+            # Every alias, so reads routed to the replica count towards the budget too
+            with ExitStack() as stack:
+                contexts = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+                started = time.perf_counter()
+                response = client.get(path)
+                samples.append((time.perf_counter() - started) * 1000)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            queries.append(sum(len(ctx.captured_queries) for ctx in contexts))
+            status = response.status_code
+        results[name] = dict(summarize(samples, queries), path=path, status=status)
+    return results
+
+
+def compare_to_baseline(results, baseline, latency_tolerance=1.25):
+    """Return a list of human-readable regressions against ``baseline``."""
+    regressions = []
+    for name, current in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['queries'] > previous['queries']:
+            regressions.append(f'{name}: queries {previous["queries"]} -> {current["queries"]}')
+        if previous['p95_ms'] and current['p95_ms'] > previous['p95_ms'] * latency_tolerance:
+            regressions.append(f'{name}: p95 {previous["p95_ms"]:.1f}ms -> {current["p95_ms"]:.1f}ms')
+    return regressions
+
+
+def load_baseline(path):
+    with open(path) as fileobj:
+        return json.load(fileobj)
+
+
+def save_results(path, results):
+    with open(path, 'w') as fileobj:
+        json.dump(results, fileobj, indent=2, sort_keys=True)
+        fileobj.write('\n')
+
+
+@contextmanager
+def simulated_db_latency(ms):
+    """Add ``ms`` of sleep to every query, on every connection, to mimic a remote database."""
+    if not ms:
+        yield
+        return
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(ms / 1000)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        connection.execute_wrappers.append(delay)
+
+    connection_created.connect(install)
+    for conn in connections.all():
+        conn.execute_wrappers.append(delay)
+    try:
+        yield
+    finally:
+        connection_created.disconnect(install)
+        for conn in connections.all():
+            if delay in conn.execute_wrappers:
+                conn.execute_wrappers.remove(delay)
+
+
+def _isolated_get(client, path):
+    try:
+        started = time.perf_counter()
+        response = client.get(path)
+        return (time.perf_counter() - started) * 1000, response.status_code
+    finally:
+        close_old_connections()
+
+
+def run_wsgi_load(cookies, path, concurrency, requests):
+    """``requests`` GETs through the WSGI handler from ``concurrency`` threads."""
+    local = threading.local()
+
+    def fetch(_):
+        if not hasattr(local, 'client'):
+            local.client = Client(HTTP_HOST=benchmark_host())
+            local.client.cookies = copy.deepcopy(cookies)
+        return _isolated_get(local.client, path)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(fetch, range(requests)))
+    return results, time.perf_counter() - started
+
+
+def run_asgi_load(cookies, path, concurrency, requests):
+    """``requests`` GETs through the ASGI handler, at most ``concurrency`` in flight."""
+    async def main():
+        client = AsyncClient(HTTP_HOST=benchmark_host())
+        client.cookies = copy.deepcopy(cookies)
+        gate = asyncio.Semaphore(concurrency)
+
+        async def fetch():
+            async with gate:
+                started = time.perf_counter()
+                response = await client.get(path)
+                return (time.perf_counter() - started) * 1000, response.status_code
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(fetch() for _ in range(requests)))
+        return results, time.perf_counter() - started
+    return asyncio.run(main())
+
+
+def summarize_load(results, elapsed):
+    samples = [ms for ms, _ in results]
+    return {
+        'requests': len(results),
+        'errors': sum(1 for _, status in results if status != 200),
+        'rps': round(len(results) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+    }
+
+
+def run_async_comparison(user, concurrency=8, requests=100, db_latency_ms=0, pairs=ASYNC_PAIRS):
+    """Compare each sync view under WSGI with its async twin under ASGI at the same concurrency."""
+    login = Client(HTTP_HOST=benchmark_host())
+    login.force_login(user)
+    targets = url_targets(user)
+    results = {}
+    with simulated_db_latency(db_latency_ms):
+        for sync_name, async_name in pairs:
+            if sync_name not in targets or async_name not in targets:
+                continue
+            wsgi = run_wsgi_load(login.cookies, targets[sync_name], concurrency, requests)
+            asgi = run_asgi_load(login.cookies, targets[async_name], concurrency, requests)
+            results[sync_name] = {'wsgi': summarize_load(*wsgi), 'asgi': summarize_load(*asgi)}
+    return results
+
+
+# Write contention
+def write_configs():
+    """SQLite as Django runs it out of the box versus SQLITE_PRAGMAS in WAL mode."""
+    return {
+        'defaults': {'pragmas': {'journal_mode': 'DELETE', 'synchronous': 'FULL'}, 'transaction_mode': 'DEFERRED'},
+        'tuned': {
+            'pragmas': {'journal_mode': 'WAL', **getattr(settings, 'SQLITE_PRAGMAS', {})},
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+
+
+def run_write_contention(path, pragmas, transaction_mode, writers=8, writes=200, members=20):
+    """
+    ``writers`` threads, each with its own connection, record ``writes``
+    contributions apiece against the SQLite file at ``path``. Every write has
+    the shape of contribution_add: read the member's ledger row, insert the
+    contribution, update the ledger, commit. Lock errors are counted, not retried.
+    """
+    setup = sqlite3.connect(path, isolation_level=None)
+    apply_pragmas(setup, pragmas)
+    setup.execute('CREATE TABLE IF NOT EXISTS ledger (member INTEGER PRIMARY KEY, balance INTEGER NOT NULL)')
+    setup.execute('CREATE TABLE IF NOT EXISTS contribution (id INTEGER PRIMARY KEY, member INTEGER, amount INTEGER)')
+    setup.executemany('INSERT OR IGNORE INTO ledger VALUES (?, 0)', [(member,) for member in range(members)])
+    setup.close()
+
+    def writer(index):
+        # sqlite3's default 5s timeout matches what Django uses unless OPTIONS override it
+        conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        apply_pragmas(conn, pragmas)
+        samples, errors = [], 0
+        try:
+            for i in range(writes):
+                member = (index * writes + i) % members
+                started = time.perf_counter()
+                try:
+                    conn.execute(f'BEGIN {transaction_mode}')
+                    conn.execute('SELECT balance FROM ledger WHERE member = ?', [member]).fetchone()
+                    conn.execute('INSERT INTO contribution (member, amount) VALUES (?, 100)', [member])
+                    conn.execute('UPDATE ledger SET balance = balance + 100 WHERE member = ?', [member])
+                    conn.execute('COMMIT')
+                except sqlite3.OperationalError:
+                    errors += 1
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+                    continue
+                samples.append((time.perf_counter() - started) * 1000)
+        finally:
+            conn.close()
+        return samples, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        results = list(pool.map(writer, range(writers)))
+    elapsed = time.perf_counter() - started
+    samples = [ms for batch, _ in results for ms in batch]
+    return {
+        'writers': writers,
+        'attempted': writers * writes,
+        'committed': len(samples),
+        'errors': sum(errors for _, errors in results),
+        'writes_per_s': round(len(samples) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(samples, 50), 3) if samples else None,
+        'p95_ms': round(percentile(samples, 95), 3) if samples else None,
+        'p99_ms': round(percentile(samples, 99), 3) if samples else None,
+    }
+
+
+def run_write_comparison(writers=8, writes=200, configs=None):
+    """Run the contention benchmark for each config against a fresh temporary database."""
+    results = {}
+    for name, config in (configs or write_configs()).items():
+        with tempfile.TemporaryDirectory() as directory:
+            results[name] = run_write_contention(
+                os.path.join(directory, 'bench.sqlite3'), config['pragmas'], config['transaction_mode'],
+                writers, writes,
+            )
+    return results
@@ -0,0 +1,249 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction as db_transaction
+
+
+def version_key(scope, pk):
+    return f'core:version:{scope}:{pk}'
+
+
+def get_versions(scope, pks):
+    """
+    Return {pk: version} for ``pks``. Missing versions are seeded from the
+    clock so an evicted counter can never come back at a value that older
+    cache entries were stored under.
+    """
+    keys = {version_key(scope, pk): pk for pk in pks}
+    found = cache.get_many(list(keys))
+    versions = {}
+    for key, pk in keys.items():
+        if key not in found:
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+        versions[pk] = found[key]
+    return versions
+
+
+def get_version(scope, pk):
+    return get_versions(scope, [pk])[pk]
+
+
+def bump_version(scope, pk):
+    key = version_key(scope, pk)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def bump_version_on_commit(scope, pk):
+    # Readers must not see the new version before the write is visible to them
+    db_transaction.on_commit(lambda: bump_version(scope, pk))
+
+
+# Object cache
+class LocalLRU:
+    """Thread-safe, size-bounded LRU whose entries expire ``ttl`` seconds after they were stored."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                self.expirations += 1
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class ObjectCache:
+    """
+    Read-through cache of single rows by primary key. Lookups try a
+    per-process LRU, then the shared Django cache, then the primary database.
+    Shared entries are keyed by the row's version, which
+    invalidate_object_on_commit bumps, so a save or delete in any process
+    retires every shared copy at once. Copies in other processes' LRUs live
+    for at most OBJECT_CACHE_LOCAL_TTL seconds.
+
+    Instances are rebuilt with Model.from_db on every hit; callers get their
+    own copy and may modify it.
+    """
+
+    def __init__(self, model, max_entries=1000, local_ttl=5, timeout=3600):
+        self.model = model
+        self.label = model._meta.label_lower
+        self.scope = f'object.{self.label}'
+        self.field_names = [field.attname for field in model._meta.concrete_fields]
+        self.local = LocalLRU(max_entries, local_ttl)
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.counts = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+        # pks this thread wrote in a transaction that hasn't committed yet
+        self._pending = threading.local()
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def pending(self):
+        if not hasattr(self._pending, 'pks'):
+            self._pending.pks = set()
+        return self._pending.pks
+
+    def key(self, pk, version):
+        return f'core:object:{self.label}:{pk}:{version}'
+
+    def ref_key(self, lookup):
+        fields = ':'.join(f'{name}={value}' for name, value in sorted(lookup.items()))
+        return f'core:object-ref:{self.label}:{fields}'
+
+    def primary(self):
+        return self.model._default_manager.db_manager(router.db_for_write(self.model))
+
+    def load(self, values):
+        return self.model.from_db(router.db_for_write(self.model), self.field_names, values)
+
+    def store(self, obj, version):
+        if obj.pk in self.pending():
+            # Uncommitted; caching it would outlive a rollback
+            return
+        values = tuple(getattr(obj, name) for name in self.field_names)
+        cache.set(self.key(obj.pk, version), values, self.timeout)
+        self.local.set(obj.pk, values)
+
+    def get(self, pk, fetch=None, local=True):
+        """
+        The row with primary key ``pk`` (or what ``fetch()`` returns on a miss);
+        None if it doesn't exist. ``local=False`` skips this process's LRU, for
+        reads that must not be up to OBJECT_CACHE_LOCAL_TTL seconds stale.
+        """
+        values = self.local.get(pk) if local else None
+        if values is not None:
+            self.count('local_hits')
+            return self.load(values)
+        # Read the version before the row so a concurrent write can only make this entry unreachable
+        version = get_version(self.scope, pk)
+        values = cache.get(self.key(pk, version))
+        if values is not None:
+            self.count('shared_hits')
+            self.local.set(pk, values)
+            return self.load(values)
+        self.count('misses')
+        obj = fetch() if fetch else self.primary().filter(pk=pk).first()
+        if obj is not None:
+            self.store(obj, version)
+        return obj
+
+    def get_by(self, fetch=None, local=True, **lookup):
+        """
+        Look a row up by unique fields. Only the fields -> pk mapping is
+        cached on a miss: the row's version can't be read before its pk is
+        known, so the row itself is cached by the next get().
+        """
+        ref = self.ref_key(lookup)
+        pk = (local and self.local.get(ref)) or cache.get(ref)
+        if pk is not None:
+            obj = self.get(pk, local=local)
+            if obj is not None and all(getattr(obj, name) == value for name, value in lookup.items()):
+                self.local.set(ref, pk)
+                return obj
+        else:
+            self.count('misses')
+        obj = fetch() if fetch else self.primary().filter(**lookup).first()
+        if obj is not None and obj.pk not in self.pending():
+            cache.set(ref, obj.pk, self.timeout)
+            self.local.set(ref, obj.pk)
+        return obj
+
+    def invalidate(self, pk):
+        self.local.delete(pk)
+        bump_version(self.scope, pk)
+
+    def invalidate_on_commit(self, pk):
+        # Drop this process's copy and the current shared entry now, so the
+        # writing transaction reads its own changes; bump the version once
+        # the write is visible to everyone else
+        self.local.delete(pk)
+        cache.delete(self.key(pk, get_version(self.scope, pk)))
+        self.pending().add(pk)
+
+        def committed():
+            self.pending().discard(pk)
+            self.invalidate(pk)
+        db_transaction.on_commit(committed)
+
+    def clear_local(self):
+        self.local.clear()
+        self.pending().clear()
+
+    def stats(self):
+        with self.lock:
+            counts = dict(self.counts)
+        counts.update(evictions=self.local.evictions, expirations=self.local.expirations, size=len(self.local))
+        return counts
+
+
+_object_caches = {}
+_object_caches_lock = threading.Lock()
+
+
+def object_cache(model):
+    """The process-wide ObjectCache for ``model``, created on first use."""
+    label = model._meta.label_lower
+    with _object_caches_lock:
+        if label not in _object_caches:
+            _object_caches[label] = ObjectCache(
+                model,
+                max_entries=getattr(settings, 'OBJECT_CACHE_LOCAL_MAX_ENTRIES', 1000),
+                local_ttl=getattr(settings, 'OBJECT_CACHE_LOCAL_TTL', 5),
+                timeout=getattr(settings, 'OBJECT_CACHE_TIMEOUT', 3600),
+            )
+        return _object_caches[label]
+
+
+def invalidate_object_on_commit(model, pk):
+    object_cache(model).invalidate_on_commit(pk)
+
+
+def clear_local_object_caches():
+    for object_cache_ in list(_object_caches.values()):
+        object_cache_.clear_local()
+
+
+def object_cache_stats():
+    """{model label: hit/miss/eviction counters} for this process."""
+    return {label: object_cache_.stats() for label, object_cache_ in sorted(_object_caches.items())}
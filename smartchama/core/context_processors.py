@@ -0,0 +1,14 @@
+from django.conf import settings
+
+from .unread import get_unread_count
+
+
+def unread_messages(request):
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {
+        'unread_message_count': get_unread_count(user.pk),
+        # The event stream holds a connection open, so it is only offered when served under ASGI
+        'event_stream_enabled': getattr(settings, 'EVENTS_STREAM_ENABLED', False),
+    }
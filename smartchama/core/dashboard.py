@@ -0,0 +1,77 @@
+import hashlib
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Sum
+
+from .cache import get_version, get_versions
+from .models import Chama, ChamaBalance, Contribution, Announcement
+from .permissions import get_membership_map
+
+GLOBAL_SCOPE = 'dashboard-global'
+
+
+def cache_timeout():
+    return getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 600)
+
+
+def user_stats_key(user, chama_ids):
+    # The key changes whenever the user or any of their chamas is written to
+    versions = get_versions('chama', chama_ids)
+    parts = [f'{pk}:{versions[pk]}' for pk in sorted(chama_ids)]
+    parts.append(f'user:{get_version("user", user.pk)}')
+    digest = hashlib.md5('|'.join(parts).encode()).hexdigest()
+    return f'core:dashboard:user:{user.pk}:{digest}'
+
+
+def compute_user_stats(user):
+    user_chamas = list(
+        Chama.objects.filter(memberships__user=user, memberships__is_active=True).distinct().with_stats()
+    )
+    total_contributions = ChamaBalance.objects.filter(
+        membership__user=user
+    ).aggregate(total=Sum('contributions_in'))['total'] or Decimal('0.00')
+    recent_contributions = list(
+        Contribution.objects.filter(membership__user=user).select_related('membership__chama').order_by('-date')[:5]
+    )
+    recent_announcements = list(
+        Announcement.objects.filter(
+            chama__memberships__user=user, chama__memberships__is_active=True
+        ).select_related('chama').order_by('-created_at')[:5]
+    )
+    return {
+        'user_chamas': user_chamas,
+        'total_contributions': total_contributions,
+        'recent_contributions': recent_contributions,
+        'recent_announcements': recent_announcements,
+    }
+
+
+def get_user_stats(user):
+    key = user_stats_key(user, list(get_membership_map(user)))
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_user_stats(user)
+        cache.set(key, stats, cache_timeout())
+    return stats
+
+
+def compute_global_stats():
+    return {
+        'all_chamas_count': Chama.objects.count(),
+        'all_members': User.objects.filter(memberships__is_active=True).distinct().count(),
+        'total_chama_contributions': ChamaBalance.objects.filter(
+            membership__isnull=True
+        ).aggregate(total=Sum('contributions_in'))['total'] or Decimal('0.00'),
+    }
+
+
+def get_global_stats():
+    key = f'core:dashboard:global:{get_version(GLOBAL_SCOPE, 0)}'
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_global_stats()
+        cache.set(key, stats, cache_timeout())
+    return stats
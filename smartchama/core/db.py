@@ -0,0 +1,92 @@
+import contextvars
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = 'replica'
+PIN_COOKIE = 'pin_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Alias the current request's reads go to; None leaves them on the primary
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+
+
+def replica_configured():
+    return REPLICA in connections.settings
+
+
+def read_db():
+    """Alias that reads issued right now are routed to."""
+    return _read_alias.get() or DEFAULT_DB_ALIAS
+
+
+def pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+
+
+def replica_reads(view):
+    """
+    Mark a view whose GETs may read from the replica. Only mark views that
+    write nothing on GET (lazy backfills included) and can tolerate
+    replication lag; the test suite GETs every marked view and fails on any write.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return view(*args, **kwargs)
+    wrapper.replica_reads = True
+    return wrapper
+
+
+# Routing
+class ReplicaRouter:
+    """Writes always go to the primary; reads follow the alias chosen by ReplicaMiddleware."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema through replication
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    """
+    Send reads of views marked with @replica_reads to the replica. After a
+    write (any unsafe request) the browser is pinned to the primary for
+    REPLICA_PIN_SECONDS so the user always reads their own writes, even if
+    replication is behind.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.use_replica = False
+        try:
+            response = self.get_response(request)
+        finally:
+            token = getattr(request, '_read_alias_token', None)
+            if token is not None:
+                _read_alias.reset(token)
+        if request.method not in SAFE_METHODS and replica_configured():
+            response.set_cookie(PIN_COOKIE, '1', max_age=pin_seconds(), httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            getattr(view_func, 'replica_reads', False)
+            and request.method in SAFE_METHODS
+            and replica_configured()
+            and PIN_COOKIE not in request.COOKIES
+        ):
+            request.use_replica = True
+            request._read_alias_token = _read_alias.set(REPLICA)
+        return None
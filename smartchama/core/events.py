@@ -0,0 +1,227 @@
+import asyncio
+import json
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+
+from .models import Announcement, Membership, Message
+from .permissions import async_login_required, get_membership_map
+
+QUEUE_SIZE = 100
+
+
+def events_backend():
+    return getattr(settings, 'EVENTS_BACKEND', 'memory')
+
+
+def poll_interval():
+    return getattr(settings, 'EVENTS_POLL_INTERVAL', 2.0)
+
+
+def keepalive_interval():
+    return getattr(settings, 'EVENTS_KEEPALIVE', 15.0)
+
+
+def max_stream_seconds():
+    # Streams end periodically; EventSource reconnects and resumes from Last-Event-ID
+    return getattr(settings, 'EVENTS_MAX_STREAM_SECONDS', 300)
+
+
+# In-process pub/sub
+class Broker:
+    """
+    Fan events out to the asyncio queues of connected streams in this process.
+    publish() may be called from any thread; delivery hops onto each
+    subscriber's event loop.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(QUEUE_SIZE)
+        with self.lock:
+            self.subscribers.setdefault(user_id, set()).add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        with self.lock:
+            entries = self.subscribers.get(user_id, set())
+            entries.difference_update({entry for entry in entries if entry[1] is queue})
+            if not entries:
+                self.subscribers.pop(user_id, None)
+
+    def subscribed_users(self):
+        with self.lock:
+            return set(self.subscribers)
+
+    def publish(self, user_ids, event):
+        with self.lock:
+            targets = [entry for user_id in user_ids for entry in self.subscribers.get(user_id, ())]
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                # The subscriber's loop has closed; its stream is gone
+                pass
+
+
+def _offer(queue, event):
+    if queue.full():
+        # A slow client loses its oldest event rather than blocking the publisher
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+broker = Broker()
+
+
+# Event payloads
+def message_event(message):
+    return {
+        'type': 'message',
+        'id': message.pk,
+        'subject': message.subject,
+        'sender': message.sender.username,
+        'chama': message.chama_id,
+        'url': reverse('message_detail', args=[message.pk]),
+        'created_at': message.created_at.isoformat(),
+    }
+
+
+def announcement_event(announcement):
+    return {
+        'type': 'announcement',
+        'id': announcement.pk,
+        'title': announcement.title,
+        'chama': announcement.chama_id,
+        'is_important': announcement.is_important,
+        'url': reverse('announcement_list', args=[announcement.chama_id]),
+        'created_at': announcement.created_at.isoformat(),
+    }
+
+
+def publish_message(message):
+    if events_backend() == 'memory' and message.recipient_id in broker.subscribed_users():
+        broker.publish([message.recipient_id], message_event(message))
+
+
+def publish_announcement(announcement):
+    if events_backend() != 'memory':
+        return
+    listening = broker.subscribed_users()
+    if not listening:
+        return
+    recipients = Membership.objects.filter(
+        chama_id=announcement.chama_id, is_active=True, user_id__in=listening
+    ).values_list('user_id', flat=True)
+    broker.publish(list(recipients), announcement_event(announcement))
+
+
+# Catch-up / polling
+def parse_cursor(value):
+    """Cursor is "<last message id>.<last announcement id>", sent as the SSE event id."""
+    try:
+        message_id, announcement_id = (int(part) for part in value.split('.'))
+    except (AttributeError, ValueError):
+        return None
+    return message_id, announcement_id
+
+
+def current_cursor(user_id, chama_ids):
+    message_id = Message.objects.filter(recipient_id=user_id).order_by('-pk').values_list('pk', flat=True).first()
+    announcement_id = Announcement.objects.filter(
+        chama_id__in=chama_ids
+    ).order_by('-pk').values_list('pk', flat=True).first()
+    return message_id or 0, announcement_id or 0
+
+
+def events_since(user_id, chama_ids, cursor, limit=50):
+    """Messages and announcements newer than ``cursor``, oldest first."""
+    message_id, announcement_id = cursor
+    messages = list(
+        Message.objects.filter(recipient_id=user_id, pk__gt=message_id).select_related('sender').order_by('pk')[:limit]
+    )
+    announcements = list(
+        Announcement.objects.filter(chama_id__in=chama_ids, pk__gt=announcement_id).order_by('pk')[:limit]
+    )
+    events = [message_event(message) for message in messages]
+    events += [announcement_event(announcement) for announcement in announcements]
+    events.sort(key=lambda event: event['created_at'])
+    return events
+
+
+def advance(cursor, event):
+    message_id, announcement_id = cursor
+    if event['type'] == 'message':
+        return max(message_id, event['id']), announcement_id
+    return message_id, max(announcement_id, event['id'])
+
+
+def format_event(event, cursor):
+    return f'id: {cursor[0]}.{cursor[1]}\nevent: {event["type"]}\ndata: {json.dumps(event)}\n\n'
+
+
+async def stream(user, chama_ids, cursor):
+    deadline = time.monotonic() + max_stream_seconds()
+    # Subscribe before reading the cursor so nothing published in between is lost
+    queue = broker.subscribe(user.pk) if events_backend() == 'memory' else None
+    try:
+        yield f'retry: {int(poll_interval() * 1000)}\n\n'
+        if cursor is None:
+            cursor = await sync_to_async(current_cursor)(user.pk, chama_ids)
+            yield f'id: {cursor[0]}.{cursor[1]}\n\n'
+        else:
+            # Reconnect: replay what was missed while disconnected
+            for event in await sync_to_async(events_since)(user.pk, chama_ids, cursor):
+                cursor = advance(cursor, event)
+                yield format_event(event, cursor)
+
+        if queue is None:
+            # Works across processes: each stream polls two indexed queries
+            idle = 0.0
+            while time.monotonic() < deadline:
+                await asyncio.sleep(poll_interval())
+                events = await sync_to_async(events_since)(user.pk, chama_ids, cursor)
+                for event in events:
+                    cursor = advance(cursor, event)
+                    yield format_event(event, cursor)
+                idle = 0.0 if events else idle + poll_interval()
+                if idle >= keepalive_interval():
+                    idle = 0.0
+                    yield ': keepalive\n\n'
+            return
+
+        while time.monotonic() < deadline:
+            timeout = min(keepalive_interval(), max(deadline - time.monotonic(), 0))
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if event['type'] == 'announcement' and event['chama'] not in chama_ids:
+                continue
+            if advance(cursor, event) == cursor:
+                continue  # Already sent during catch-up
+            cursor = advance(cursor, event)
+            yield format_event(event, cursor)
+    finally:
+        if queue is not None:
+            broker.unsubscribe(user.pk, queue)
+
+
+@async_login_required
+async def event_stream(request):
+    """Server-sent events for new messages and announcements; serve under ASGI."""
+    user = request.user
+    chama_ids = set(await sync_to_async(get_membership_map)(user))
+    cursor = parse_cursor(request.headers.get('Last-Event-ID') or request.GET.get('cursor'))
+    response = StreamingHttpResponse(stream(user, chama_ids, cursor), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
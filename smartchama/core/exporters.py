@@ -0,0 +1,96 @@
+import csv
+
+from .models import Contribution, Transaction
+
+EXPORT_CHUNK_SIZE = 2000
+
+CONTRIBUTION_COLUMNS = [
+    ('Date', 'date'),
+    ('Chama', 'membership__chama__name'),
+    ('Member', 'membership__user__username'),
+    ('Amount', 'amount'),
+    ('Reference', 'reference'),
+    ('Notes', 'notes'),
+    ('Recorded At', 'created_at'),
+]
+
+TRANSACTION_COLUMNS = [
+    ('Date', 'date'),
+    ('Chama', 'chama__name'),
+    ('Type', 'transaction_type'),
+    ('Amount', 'amount'),
+    ('Purpose', 'purpose'),
+    ('Description', 'description'),
+    ('Created By', 'created_by__username'),
+    ('Recorded At', 'created_at'),
+]
+
+
+# Spreadsheets run a cell starting with one of these as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def escape_cell(value):
+    """Defuse member-entered text that Excel or LibreOffice would evaluate."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def contribution_rows(chama_ids=None, date_from=None, date_to=None):
+    queryset = Contribution.objects.all()
+    if chama_ids:
+        queryset = queryset.filter(membership__chama_id__in=chama_ids)
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    fields = [field for _, field in CONTRIBUTION_COLUMNS]
+    return queryset.order_by('date', 'id').values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def transaction_rows(chama_ids=None, date_from=None, date_to=None, transaction_types=None):
+    queryset = Transaction.objects.all()
+    if chama_ids:
+        queryset = queryset.filter(chama_id__in=chama_ids)
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    if transaction_types:
+        queryset = queryset.filter(transaction_type__in=transaction_types)
+    fields = [field for _, field in TRANSACTION_COLUMNS]
+    return queryset.order_by('date', 'id').values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def iter_csv(columns, rows, bom=False):
+    """Yield CSV lines one row at a time; ``bom`` helps Excel detect UTF-8."""
+    writer = csv.writer(Echo())
+    if bom:
+        yield '\ufeff'
+    yield writer.writerow([title for title, _ in columns])
+    for row in rows:
+        yield writer.writerow([escape_cell(value) for value in row])
+
+
+def write_xlsx(path, columns, rows, title='Export'):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append([heading for heading, _ in columns])
+    count = 0
+    for row in rows:
+        sheet.append([
+            value.replace(tzinfo=None) if getattr(value, 'tzinfo', None) else escape_cell(value) for value in row
+        ])
+        count += 1
+    workbook.save(path)
+    return count
@@ -79,13 +79,38 @@ class ChamaForm(forms.ModelForm):
 class ContributionForm(forms.ModelForm):
     class Meta:
         model = Contribution
-        fields = ['amount', 'date', 'notes']
+        fields = ['amount', 'date', 'reference', 'notes']
         widgets = {
             'date': forms.DateInput(attrs={'type': 'date'}),
             'amount': forms.NumberInput(attrs={'step': '0.01', 'min': '0.01'}),
             'notes': forms.Textarea(attrs={'rows': 3}),
         }
 
+class ContributionImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV or XLSX with phone_number or username, amount, date and optional reference and notes columns")
+    
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        if not upload.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError('Upload a .csv or .xlsx file.')
+        return upload
+
+class LedgerExportForm(forms.Form):
+    date_from = forms.DateField(required=False)
+    date_to = forms.DateField(required=False)
+    type = forms.MultipleChoiceField(choices=Transaction.TRANSACTION_TYPES, required=False)
+
+class StatementRunForm(forms.Form):
+    period_start = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    period_end = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('period_start'), cleaned_data.get('period_end')
+        if start and end and start > end:
+            raise forms.ValidationError('The statement period must start before it ends.')
+        return cleaned_data
+
 class TransactionForm(forms.ModelForm):
     class Meta:
         model = Transaction
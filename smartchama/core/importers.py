@@ -0,0 +1,278 @@
+import csv
+import io
+import re
+import time
+import zipfile
+from collections import Counter
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction as db_transaction
+from django.db.models import Count, Max
+
+from .cache import bump_version_on_commit
+from .dashboard import GLOBAL_SCOPE
+from .models import Contribution, ChamaBalance, ContributionRollup, Membership
+
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%m/%d/%Y', '%d.%m.%Y']
+# Column -> ContributionImporter lookups tried in order; a free-form "member" column may hold either
+MEMBER_COLUMNS = {
+    'phone_number': ['match_phone'],
+    'phone': ['match_phone'],
+    'username': ['match_username'],
+    'member': ['match_phone', 'match_username'],
+}
+MAX_REPORTED_ERRORS = 200
+AMOUNT_MAX_DIGITS = Contribution._meta.get_field('amount').max_digits
+# Row key for values beyond the header; never a lower-cased header name
+EXTRA_FIELDS = '__EXTRA__'
+
+
+class ImportFileError(Exception):
+    pass
+
+
+def normalize_phone(value):
+    digits = re.sub(r'\D', '', str(value or ''))
+    if digits.startswith('0') and len(digits) == 10:
+        return '254' + digits[1:]
+    if len(digits) == 9 and digits[0] in '17':
+        return '254' + digits
+    return digits
+
+
+# Marks an index key shared by several members, so rows using it are rejected rather than guessed
+AMBIGUOUS = object()
+
+
+def add_unique(index, key, value):
+    index[key] = AMBIGUOUS if index.get(key, value) != value else value
+
+
+def iter_csv_rows(fileobj):
+    """
+    Yield each CSV row as a dict keyed by lower-cased header. Values past the
+    last header column are counted under EXTRA_FIELDS so the row can be
+    rejected on its own; undecodable or malformed files raise ImportFileError.
+    """
+    if isinstance(fileobj, io.TextIOBase):
+        text = fileobj
+    else:
+        text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        for row in csv.DictReader(text, restkey=EXTRA_FIELDS):
+            extra = row.pop(EXTRA_FIELDS, None)
+            row = {(key or '').strip().lower(): (value or '').strip() for key, value in row.items()}
+            if extra:
+                row[EXTRA_FIELDS] = len(extra)
+            yield row
+    except UnicodeDecodeError:
+        raise ImportFileError('The file is not UTF-8 encoded. Save it as "CSV UTF-8" and upload it again.')
+    except csv.Error as exc:
+        raise ImportFileError(f'The file is not valid CSV: {exc}.')
+
+
+def iter_xlsx_rows(fileobj):
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise ImportFileError('Reading .xlsx files requires the openpyxl package.')
+    try:
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError, OSError):
+        raise ImportFileError('The file is not a valid .xlsx workbook.')
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell or '').strip().lower() for cell in next(rows, [])]
+        for values in rows:
+            yield {key: value for key, value in zip(header, values)}
+    finally:
+        workbook.close()
+
+
+def iter_rows(fileobj, filename):
+    if filename.lower().endswith('.xlsx'):
+        return iter_xlsx_rows(fileobj)
+    return iter_csv_rows(fileobj)
+
+
+def parse_amount(value):
+    try:
+        amount = Decimal(str(value).replace(',', '').strip()).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f'invalid amount {value!r}')
+    if not amount.is_finite():
+        raise ValueError(f'invalid amount {value!r}')
+    if amount < Decimal('0.01'):
+        raise ValueError(f'amount must be at least 0.01, got {amount}')
+    if len(amount.as_tuple().digits) > AMOUNT_MAX_DIGITS:
+        raise ValueError(f'amount {amount} is too large')
+    return amount
+
+
+def parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(str(value).strip(), fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f'invalid date {value!r}')
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.skipped = 0
+        self.error_count = 0
+        self.errors = []
+        self.warning_count = 0
+        self.warnings = []
+        self.elapsed = 0.0
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def add_warning(self, line, message):
+        self.warning_count += 1
+        if len(self.warnings) < MAX_REPORTED_ERRORS:
+            self.warnings.append((line, message))
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+class ContributionImporter:
+    """
+    Stream rows into Contribution records for one chama. Members are matched by
+    phone number or username through an in-memory index built up front; a
+    phone or username shared by several members is reported, not guessed. Rows
+    whose reference already exists are skipped so a rerun does not duplicate
+    them. Rows without a reference are matched per batch as a multiset on
+    (member, date, amount): the n-th occurrence in a batch is skipped when n
+    such rows were stored before the run started, so a rerun imports nothing
+    while two equal payments on the same day are both kept (and reported as
+    possible duplicates when they share a batch). Nothing is carried between
+    batches, so memory stays flat however long the file is.
+    """
+
+    def __init__(self, chama, batch_size=1000):
+        self.chama = chama
+        self.batch_size = batch_size
+        self.by_phone = {}
+        self.by_username = {}
+        self.by_folded_username = {}
+        memberships = Membership.objects.filter(chama=chama, is_active=True).values_list(
+            'pk', 'user__username', 'user__profile__phone_number'
+        )
+        for membership_id, username, phone in memberships:
+            self.by_username[username] = membership_id
+            add_unique(self.by_folded_username, username.lower(), membership_id)
+            phone = normalize_phone(phone)
+            # Placeholders such as "N/A" normalize to '' and must not match anything
+            if phone:
+                add_unique(self.by_phone, phone, membership_id)
+
+    def match_phone(self, value):
+        return self.by_phone.get(normalize_phone(value) or None)
+
+    def match_username(self, value):
+        return self.by_username.get(value) or self.by_folded_username.get(value.lower())
+
+    def match_member(self, row):
+        for column, lookups in MEMBER_COLUMNS.items():
+            value = str(row.get(column) or '').strip()
+            if not value:
+                continue
+            for lookup in lookups:
+                membership_id = getattr(self, lookup)(value)
+                if membership_id is AMBIGUOUS:
+                    raise ValueError(f'{column} {value!r} matches more than one active member')
+                if membership_id:
+                    return membership_id
+        raise ValueError('no active member matches this row')
+
+    def build(self, row):
+        if row.get(EXTRA_FIELDS):
+            raise ValueError(f'{row[EXTRA_FIELDS]} more field(s) than the header')
+        return Contribution(
+            membership_id=self.match_member(row),
+            amount=parse_amount(row.get('amount')),
+            date=parse_date(row.get('date')),
+            reference=str(row.get('reference') or '').strip()[:64],
+            notes=str(row.get('notes') or '').strip(),
+        )
+
+    def run(self, rows):
+        report = ImportReport()
+        started = time.monotonic()
+        batch = []
+        with db_transaction.atomic():
+            # Unreferenced rows are only matched against contributions older than this run
+            self.last_pk = Contribution.objects.aggregate(last=Max('pk'))['last'] or 0
+            # Line 1 is the header row
+            for line, row in enumerate(rows, start=2):
+                report.rows += 1
+                try:
+                    batch.append((line, self.build(row)))
+                except ValueError as exc:
+                    report.add_error(line, str(exc))
+                if len(batch) >= self.batch_size:
+                    self.flush(batch, report)
+                    batch = []
+            self.flush(batch, report)
+            if report.created:
+                ChamaBalance.objects.rebuild(chama_ids=[self.chama.pk])
+                ContributionRollup.objects.rebuild(chama_ids=[self.chama.pk])
+                # bulk_create skips post_save, so invalidate cached stats here
+                bump_version_on_commit('chama', self.chama.pk)
+                bump_version_on_commit(GLOBAL_SCOPE, 0)
+        report.elapsed = time.monotonic() - started
+        return report
+
+    def flush(self, batch, report):
+        if not batch:
+            return
+        references = {c.reference for _, c in batch if c.reference}
+        seen_references = set(
+            Contribution.objects.filter(reference__in=references).values_list('reference', flat=True)
+        )
+        keys = {(c.membership_id, c.date, c.amount) for _, c in batch if not c.reference}
+        stored = Counter()
+        if keys:
+            rows = Contribution.objects.filter(
+                pk__lte=self.last_pk,
+                membership_id__in={key[0] for key in keys},
+                date__in={key[1] for key in keys},
+                reference='',
+            ).values_list('membership_id', 'date', 'amount').annotate(count=Count('pk')).order_by()
+            for membership_id, day, amount, count in rows:
+                stored[membership_id, day, amount] = count
+        occurrences = Counter()
+
+        new = []
+        for line, contribution in batch:
+            if contribution.reference:
+                if contribution.reference in seen_references:
+                    report.skipped += 1
+                    continue
+                seen_references.add(contribution.reference)
+            else:
+                key = (contribution.membership_id, contribution.date, contribution.amount)
+                occurrences[key] += 1
+                if occurrences[key] <= stored[key]:
+                    report.skipped += 1
+                    continue
+                if occurrences[key] > 1:
+                    report.add_warning(line, 'possible duplicate: same member, date and amount without a reference')
+            new.append(contribution)
+        Contribution.objects.bulk_create(new, batch_size=self.batch_size)
+        report.created += len(new)
@@ -0,0 +1,184 @@
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Avg, Count, F, Max, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_tasks = {}
+
+
+class UnknownJob(LookupError):
+    pass
+
+
+def task(name):
+    """Register ``func`` as the handler for jobs called ``name``."""
+    def decorator(func):
+        _tasks[name] = func
+        func.job_name = name
+        return func
+    return decorator
+
+
+def get_task(name):
+    try:
+        return _tasks[name]
+    except KeyError:
+        raise UnknownJob(f'No task registered for job "{name}".')
+
+
+def enqueue(name, payload=None, delay=0, max_attempts=None):
+    """
+    Queue ``name`` to run with ``payload`` (JSON-serializable keyword
+    arguments). Inside a transaction the job becomes visible to workers only
+    once it commits.
+    """
+    name = getattr(name, 'job_name', name)
+    get_task(name)
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or getattr(settings, 'JOB_MAX_ATTEMPTS', 3),
+    )
+
+
+def retry_delay(attempts):
+    base = getattr(settings, 'JOB_RETRY_BACKOFF', 10)
+    return min(base * 2 ** (attempts - 1), getattr(settings, 'JOB_RETRY_BACKOFF_MAX', 3600))
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim_next(worker_id, names=None):
+    """
+    Claim the oldest due job. The claim is a conditional UPDATE on the queued
+    status, so concurrent workers on SQLite (no SELECT ... FOR UPDATE) race
+    safely: whoever updates the row first owns it, the others move on.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(status='queued', run_at__lte=now)
+    if names:
+        candidates = candidates.filter(name__in=names)
+    for pk in candidates.order_by('run_at', 'id').values_list('pk', flat=True)[:10]:
+        claimed = Job.objects.filter(pk=pk, status='queued').update(
+            status='running', locked_by=worker_id, locked_at=now, started_at=now,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def stale_check_interval():
+    return getattr(settings, 'JOB_STALE_CHECK_INTERVAL', 60)
+
+
+def requeue_stale(timeout=None):
+    """
+    Release jobs whose worker died mid-run. The lost run counts as an
+    attempt, so a job that keeps killing its worker ends up failed instead of
+    being retried forever. Returns how many jobs went back to the queue.
+    """
+    timeout = timeout or getattr(settings, 'JOB_LOCK_TIMEOUT', 15 * 60)
+    now = timezone.now()
+    stale = Job.objects.filter(status='running', locked_at__lt=now - timedelta(seconds=timeout))
+    error = f'Worker lock expired after {timeout}s; the worker stopped without finishing the job.'
+    released = dict(locked_by='', locked_at=None, attempts=F('attempts') + 1, last_error=error)
+    stale.filter(attempts__gte=F('max_attempts') - 1).update(status='failed', finished_at=now, **released)
+    return stale.update(status='queued', run_at=now, **released)
+
+
+def finish_job(job, **updates):
+    """
+    Record the outcome of ``job`` unless its claim was lost. A run that outlived
+    JOB_LOCK_TIMEOUT may have been requeued and claimed again; its late result
+    must not overwrite the newer claim, so the UPDATE matches this claim only.
+    """
+    finished = Job.objects.filter(
+        pk=job.pk, status='running', locked_by=job.locked_by, locked_at=job.locked_at,
+    ).update(locked_by='', locked_at=None, **updates)
+    if not finished:
+        logger.warning('Job %s (%s) lost its claim while running; discarding the result.', job.pk, job.name)
+    return bool(finished)
+
+
+def run_job(job):
+    started = time.perf_counter()
+    attempts = job.attempts + 1
+    try:
+        get_task(job.name)(**job.payload)
+    except Exception as exc:
+        duration_ms = (time.perf_counter() - started) * 1000
+        error = ''.join(traceback.format_exception(exc))[-4000:]
+        if attempts < job.max_attempts and not isinstance(exc, UnknownJob):
+            delay = retry_delay(attempts)
+            logger.warning('Job %s (%s) failed, retrying in %ss: %s', job.pk, job.name, delay, exc)
+            updates = {'status': 'queued', 'run_at': timezone.now() + timedelta(seconds=delay)}
+        else:
+            logger.error('Job %s (%s) failed permanently: %s', job.pk, job.name, exc)
+            updates = {'status': 'failed', 'finished_at': timezone.now()}
+        finish_job(job, attempts=attempts, last_error=error, duration_ms=duration_ms, **updates)
+        return False
+    duration_ms = (time.perf_counter() - started) * 1000
+    finish_job(job, status='done', attempts=attempts, duration_ms=duration_ms, finished_at=timezone.now())
+    return True
+
+
+class Worker:
+    def __init__(self, worker_id=None, names=None, poll_interval=1.0):
+        self.worker_id = worker_id or default_worker_id()
+        self.names = names
+        self.poll_interval = poll_interval
+        self.processed = 0
+        self.failed = 0
+
+    def run_once(self):
+        """Run one job if one is due; return whether there was anything to do."""
+        job = claim_next(self.worker_id, self.names)
+        if job is None:
+            return False
+        if not run_job(job):
+            self.failed += 1
+        self.processed += 1
+        return True
+
+    def run(self, burst=False, max_jobs=None):
+        next_stale_check = 0
+        while max_jobs is None or self.processed < max_jobs:
+            # Long-lived process: drop connections that errored or outlived CONN_MAX_AGE
+            close_old_connections()
+            # Any worker releases jobs left behind by one that died, not just one starting up
+            if time.monotonic() >= next_stale_check:
+                requeue_stale()
+                next_stale_check = time.monotonic() + stale_check_interval()
+            if not self.run_once():
+                if burst:
+                    break
+                time.sleep(self.poll_interval)
+        return self.processed
+
+
+def job_stats():
+    """Per job name: counts by status and timing of completed runs."""
+    rows = Job.objects.order_by().values('name').annotate(
+        queued=Count('pk', filter=Q(status='queued')),
+        running=Count('pk', filter=Q(status='running')),
+        done=Count('pk', filter=Q(status='done')),
+        failed=Count('pk', filter=Q(status='failed')),
+        avg_ms=Avg('duration_ms', filter=Q(status='done')),
+        max_ms=Max('duration_ms', filter=Q(status='done')),
+    )
+    return {row.pop('name'): row for row in rows}
+
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import ContributionRollup
+
+
+class Command(BaseCommand):
+    help = 'Recompute weekly and monthly contribution rollups from the Contribution table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chama', type=int, action='append', dest='chama_ids', help='Limit to a chama id (repeatable).')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = ContributionRollup.objects.rebuild(options['chama_ids'], batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Wrote {count} rollup row(s) in {elapsed:.2f}s.'))
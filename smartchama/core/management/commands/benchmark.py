@@ -0,0 +1,55 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from core.benchmark import run_benchmark, compare_to_baseline, load_baseline, save_results
+
+
+class Command(BaseCommand):
+    help = 'Drive every core URL through the test client and report p50/p95/p99 latency and query counts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username to browse as; defaults to the user with the most memberships.')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--repetitions', type=int, default=20)
+        parser.add_argument('--exclude', action='append', default=[], help='URL name to skip (repeatable).')
+        parser.add_argument('--output', help='Write results as JSON to this path.')
+        parser.add_argument('--baseline', help='Compare against a JSON file written by --output.')
+        parser.add_argument('--tolerance', type=float, default=1.25, help='Allowed p95 slowdown factor.')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'No user named {options["user"]}.')
+        else:
+            user = User.objects.annotate(n=Count('memberships')).order_by('-n', 'pk').first()
+            if user is None:
+                raise CommandError('No users to benchmark with; run seed_synthetic first.')
+
+        skipped = []
+        results = run_benchmark(
+            user, options['warmup'], options['repetitions'], exclude=options['exclude'], skipped=skipped
+        )
+
+        self.stdout.write(f'{"view":<24}{"status":>7}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"queries":>9}')
+        for name, row in sorted(results.items()):
+            self.stdout.write(
+                f'{name:<24}{row["status"]:>7}{row["p50_ms"]:>10.2f}{row["p95_ms"]:>10.2f}'
+                f'{row["p99_ms"]:>10.2f}{row["queries"]:>9}'
+            )
+        if skipped:
+            self.stdout.write(self.style.WARNING(f'Skipped, no data to fill their URLs: {", ".join(skipped)}'))
+        if options['output']:
+            save_results(options['output'], results)
+
+        if options['baseline']:
+            regressions = compare_to_baseline(results, load_baseline(options['baseline']), options['tolerance'])
+            for line in regressions:
+                self.stdout.write(self.style.WARNING(line))
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f'{len(regressions)} regression(s) against {options["baseline"]}.')
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS('No regressions against baseline.'))
@@ -0,0 +1,41 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from core.benchmark import run_async_comparison, save_results
+
+
+class Command(BaseCommand):
+    help = 'Compare sync (WSGI) and async (ASGI) dashboard/chama_detail latency under concurrent load.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username to browse as; defaults to the user with the most memberships.')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=100, help='Requests per view and server.')
+        parser.add_argument('--db-latency-ms', type=float, default=0, help='Sleep added to every query to mimic a remote database.')
+        parser.add_argument('--output', help='Write results as JSON to this path.')
+
+    def handle(self, *args, **options):
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'No user named {options["user"]}.')
+        else:
+            user = User.objects.annotate(n=Count('memberships')).order_by('-n', 'pk').first()
+            if user is None:
+                raise CommandError('No users to benchmark with; run seed_synthetic first.')
+
+        results = run_async_comparison(
+            user, options['concurrency'], options['requests'], options['db_latency_ms'],
+        )
+        self.stdout.write(f'{"view":<16}{"server":>7}{"rps":>9}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"errors":>8}')
+        for name, servers in sorted(results.items()):
+            for server in ('wsgi', 'asgi'):
+                row = servers[server]
+                self.stdout.write(
+                    f'{name:<16}{server:>7}{row["rps"]:>9.1f}{row["p50_ms"]:>10.2f}{row["p95_ms"]:>10.2f}'
+                    f'{row["p99_ms"]:>10.2f}{row["errors"]:>8}'
+                )
+        if options['output']:
+            save_results(options['output'], results)
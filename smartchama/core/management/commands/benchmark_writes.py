@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from core.benchmark import run_write_comparison, save_results
+
+
+class Command(BaseCommand):
+    help = 'Measure SQLite write throughput under concurrent writers, default settings versus SQLITE_PRAGMAS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help='Concurrent writer threads.')
+        parser.add_argument('--writes', type=int, default=200, help='Writes per writer.')
+        parser.add_argument('--output', help='Write results as JSON to this path.')
+
+    def handle(self, *args, **options):
+        results = run_write_comparison(options['writers'], options['writes'])
+        self.stdout.write(f'{"config":<10}{"writes/s":>10}{"committed":>11}{"errors":>8}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}')
+        for name, row in results.items():
+            self.stdout.write(
+                f'{name:<10}{row["writes_per_s"] or 0:>10.1f}{row["committed"]:>11}{row["errors"]:>8}'
+                f'{row["p50_ms"] or 0:>10.2f}{row["p95_ms"] or 0:>10.2f}{row["p99_ms"] or 0:>10.2f}'
+            )
+        if options['output']:
+            save_results(options['output'], results)
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from core.exporters import (
+    CONTRIBUTION_COLUMNS, TRANSACTION_COLUMNS, contribution_rows, transaction_rows, iter_csv, write_xlsx
+)
+from core.models import Transaction
+
+
+class Command(BaseCommand):
+    help = 'Stream contributions or transactions to CSV or XLSX without loading them into memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ledger', choices=['contributions', 'transactions'])
+        parser.add_argument('--chama', type=int, action='append', dest='chama_ids', help='Chama id (repeatable); all chamas by default.')
+        parser.add_argument('--from', dest='date_from', help='First date to include (YYYY-MM-DD).')
+        parser.add_argument('--to', dest='date_to', help='Last date to include (YYYY-MM-DD).')
+        parser.add_argument('--type', action='append', dest='types', choices=[t for t, _ in Transaction.TRANSACTION_TYPES],
+                            help='Transaction type to include (repeatable).')
+        parser.add_argument('--format', choices=['csv', 'xlsx'], default='csv')
+        parser.add_argument('--output', '-o', help='Output path; CSV goes to stdout by default.')
+
+    def handle(self, *args, **options):
+        dates = {}
+        for key in ['date_from', 'date_to']:
+            if options[key]:
+                try:
+                    dates[key] = parse_date(options[key])
+                except ValueError:
+                    dates[key] = None
+                if dates[key] is None:
+                    raise CommandError(f'Invalid date: {options[key]}')
+
+        if options['ledger'] == 'contributions':
+            columns = CONTRIBUTION_COLUMNS
+            rows = contribution_rows(chama_ids=options['chama_ids'], **dates)
+        else:
+            columns = TRANSACTION_COLUMNS
+            rows = transaction_rows(chama_ids=options['chama_ids'], transaction_types=options['types'], **dates)
+
+        if options['format'] == 'xlsx':
+            if not options['output']:
+                raise CommandError('--output is required for XLSX exports.')
+            try:
+                count = write_xlsx(options['output'], columns, rows, title=options['ledger'].title())
+            except ImportError:
+                raise CommandError('XLSX exports require the openpyxl package.')
+            self.stderr.write(f'Wrote {count} rows to {options["output"]}')
+            return
+
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as fileobj:
+                fileobj.writelines(iter_csv(columns, rows))
+        else:
+            for line in iter_csv(columns, rows):
+                self.stdout.write(line, ending='')
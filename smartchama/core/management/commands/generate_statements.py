@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import StatementRun
+from core.statements import generate_statements
+
+
+class Command(BaseCommand):
+    help = 'Render member statements for pending statement runs in a process pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--run', type=int, action='append', dest='run_ids', help='Render a specific run id (repeatable).')
+        parser.add_argument('--workers', type=int, help='Worker processes (defaults to STATEMENT_WORKERS).')
+
+    def handle(self, *args, **options):
+        if options['run_ids']:
+            runs = StatementRun.objects.filter(pk__in=options['run_ids'])
+            missing = set(options['run_ids']) - {run.pk for run in runs}
+            if missing:
+                raise CommandError(f'Unknown statement run(s): {", ".join(map(str, sorted(missing)))}')
+        else:
+            runs = StatementRun.objects.filter(status='pending').order_by('created_at')
+
+        for run in runs.select_related('chama'):
+            started = time.monotonic()
+            try:
+                run = generate_statements(run, workers=options['workers'])
+            except Exception as exc:
+                self.stderr.write(f'Run {run.pk} failed: {exc}')
+                continue
+            elapsed = time.monotonic() - started
+            self.stdout.write(self.style.SUCCESS(
+                f'Run {run.pk}: rendered {run.rendered} statement(s) for {run.chama.name} in {elapsed:.2f}s.'
+            ))
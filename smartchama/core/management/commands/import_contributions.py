@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import ContributionImporter, ImportFileError, iter_rows
+from core.models import Chama
+
+
+class Command(BaseCommand):
+    help = 'Import contributions for a chama from a CSV or XLSX statement, skipping references already recorded.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('chama_id', type=int)
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            chama = Chama.objects.get(pk=options['chama_id'])
+        except Chama.DoesNotExist:
+            raise CommandError(f"Chama {options['chama_id']} does not exist.")
+
+        path = options['path']
+        try:
+            with open(path, 'rb') as fileobj:
+                importer = ContributionImporter(chama, batch_size=options['batch_size'])
+                report = importer.run(iter_rows(fileobj, path))
+        except (OSError, ImportFileError) as exc:
+            raise CommandError(str(exc))
+
+        for line, error in report.errors:
+            self.stderr.write(f'line {line}: {error}')
+        if report.error_count > len(report.errors):
+            self.stderr.write(f'... {report.error_count - len(report.errors)} more error(s) not shown')
+        for line, warning in report.warnings:
+            self.stderr.write(f'line {line}: {warning}')
+        if report.warning_count > len(report.warnings):
+            self.stderr.write(f'... {report.warning_count - len(report.warnings)} more warning(s) not shown')
+        self.stdout.write(self.style.SUCCESS(
+            f'{report.rows} rows: {report.created} created, {report.skipped} skipped, '
+            f'{report.error_count} errors, {report.warning_count} possible duplicates in {report.elapsed:.2f}s ({report.rows_per_second:.0f} rows/s)'
+        ))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import ChamaBalance
+
+
+class Command(BaseCommand):
+    help = 'Recompute the chama balance ledger from contributions and transactions, or check it for drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chama', type=int, action='append', dest='chama_ids', help='Limit to a chama id (repeatable).')
+        parser.add_argument('--check', action='store_true', help='Report drift without writing anything.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chama_ids = options['chama_ids']
+        started = time.monotonic()
+
+        if options['check']:
+            drift = ChamaBalance.objects.find_drift(chama_ids)
+            for (chama_id, membership_id), expected, actual in drift:
+                scope = f'membership {membership_id}' if membership_id else 'chama total'
+                self.stdout.write(f'chama {chama_id} {scope}: stored={actual} expected={expected}')
+            if drift:
+                raise CommandError(f'{len(drift)} ledger row(s) have drifted; run rebuild_balances to fix them.')
+            self.stdout.write(self.style.SUCCESS('Ledger matches source rows.'))
+            return
+
+        count = ChamaBalance.objects.rebuild(chama_ids, batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} ledger row(s) in {elapsed:.2f}s.'))
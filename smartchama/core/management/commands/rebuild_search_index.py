@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for announcements, messages and transactions.'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = get_search_backend().rebuild()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} row(s) in {elapsed:.2f}s.'))
@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from core.models import Message
+from core.unread import unread_key, set_unread_counts
+
+
+class Command(BaseCommand):
+    help = 'Recount unread messages per user and reset the cached unread counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids', help='Limit to a user id (repeatable).')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk')
+        unread = Message.objects.filter(is_read=False).order_by()
+        if options['user_ids']:
+            users = users.filter(pk__in=options['user_ids'])
+            unread = unread.filter(recipient_id__in=options['user_ids'])
+        counts = dict(unread.values('recipient_id').annotate(total=Count('pk')).values_list('recipient_id', 'total'))
+
+        drifted = checked = 0
+        batch = {}
+        for user_id in users.values_list('pk', flat=True).iterator(chunk_size=options['batch_size']):
+            expected = counts.get(user_id, 0)
+            cached = cache.get(unread_key(user_id))
+            if cached is not None and cached != expected:
+                drifted += 1
+                self.stdout.write(f'user {user_id}: cached={cached} actual={expected}')
+            batch[user_id] = expected
+            checked += 1
+            if len(batch) >= options['batch_size']:
+                set_unread_counts(batch)
+                batch = {}
+        set_unread_counts(batch)
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {checked} user(s); {drifted} counter(s) had drifted.'))
@@ -0,0 +1,44 @@
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.jobs import Worker, job_stats
+
+
+class Command(BaseCommand):
+    help = 'Process queued background jobs. Run several copies to work the queue concurrently.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty.')
+        parser.add_argument('--max-jobs', type=int, help='Exit after processing this many jobs.')
+        parser.add_argument('--job', action='append', dest='names', help='Only run jobs with this name (repeatable).')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when idle.')
+        parser.add_argument('--worker-id', help='Identifier recorded on claimed jobs (defaults to host:pid).')
+        parser.add_argument('--stats', action='store_true', help='Print per-job counts and timings, then exit.')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for name, row in sorted(job_stats().items()):
+                avg = f'{row["avg_ms"]:.1f}ms' if row['avg_ms'] is not None else '-'
+                self.stdout.write(
+                    f'{name}: {row["queued"]} queued, {row["running"]} running, '
+                    f'{row["done"]} done, {row["failed"]} failed, avg {avg}'
+                )
+            return
+
+        if options['verbosity'] > 1:
+            logging.getLogger('core.jobs').setLevel(logging.INFO)
+        worker = Worker(worker_id=options['worker_id'], names=options['names'], poll_interval=options['poll_interval'])
+        self.stdout.write(f'Worker {worker.worker_id} started.')
+        if settings.CACHES['default']['BACKEND'].endswith('LocMemCache'):
+            # Cache invalidations from jobs would stay in this process
+            self.stderr.write(self.style.WARNING(
+                'CACHES uses the process-local LocMemCache, so web processes keep serving cached data '
+                'this worker changes. Set CACHE_BACKEND and CACHE_LOCATION to a shared cache.'
+            ))
+        try:
+            worker.run(burst=options['burst'], max_jobs=options['max_jobs'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Processed {worker.processed} job(s), {worker.failed} failed.'))
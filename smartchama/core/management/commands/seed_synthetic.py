@@ -0,0 +1,159 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction as db_transaction
+
+from core.cache import bump_version
+from core.dashboard import GLOBAL_SCOPE
+from core.models import (
+    UserProfile, Chama, Membership, Contribution,
+    Transaction, Announcement, Message, MessageThread, ChamaBalance, ContributionRollup
+)
+from core.search import get_search_backend
+
+FREQUENCIES = ['Monthly', 'Weekly', 'Daily']
+TRANSACTION_TYPES = [t for t, _ in Transaction.TRANSACTION_TYPES]
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic dataset with bulk_create for load testing and benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--chamas', type=int, default=200)
+        parser.add_argument('--members-per-chama', type=int, default=20)
+        parser.add_argument('--contributions', type=int, default=50000)
+        parser.add_argument('--transactions', type=int, default=10000)
+        parser.add_argument('--announcements', type=int, default=2000)
+        parser.add_argument('--messages', type=int, default=20000)
+        parser.add_argument('--days', type=int, default=3 * 365, help='Spread dated rows over this many past days.')
+        parser.add_argument('--prefix', default='synth', help='Username/chama name prefix for generated rows.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['members_per_chama'] > options['users']:
+            raise CommandError('--members-per-chama cannot exceed --users.')
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.today = date.today()
+        self.days = options['days']
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(f'Synthetic users with prefix "{prefix}" already exist; pick another --prefix.')
+
+        started = time.monotonic()
+        user_ids = self.seed_users(prefix, options['users'])
+        chama_ids = self.seed_chamas(prefix, options['chamas'], user_ids)
+        memberships = self.seed_memberships(chama_ids, user_ids, options['members_per_chama'])
+        by_chama = {}
+        for membership_id, chama_id, user_id in memberships:
+            by_chama.setdefault(chama_id, []).append((membership_id, user_id))
+
+        self.seed_rows('contributions', options['contributions'], Contribution, lambda: Contribution(
+            membership_id=self.rng.choice(memberships)[0],
+            amount=self.amount(100, 5000),
+            date=self.random_date(),
+        ))
+        self.seed_rows('transactions', options['transactions'], Transaction, lambda: Transaction(
+            chama_id=self.rng.choice(chama_ids),
+            transaction_type=self.rng.choice(TRANSACTION_TYPES),
+            amount=self.amount(50, 20000),
+            date=self.random_date(),
+            purpose='Synthetic transaction',
+            created_by_id=self.rng.choice(user_ids),
+        ))
+        self.seed_rows('announcements', options['announcements'], Announcement, lambda: Announcement(
+            chama_id=self.rng.choice(chama_ids),
+            title='Synthetic announcement',
+            content='Meeting moved to Saturday. ' * self.rng.randint(1, 10),
+            created_by_id=self.rng.choice(user_ids),
+            is_important=self.rng.random() < 0.1,
+        ))
+
+        def make_message():
+            chama_id = self.rng.choice(chama_ids)
+            (_, sender), (_, recipient) = self.rng.sample(by_chama[chama_id], 2)
+            return Message(
+                sender_id=sender, recipient_id=recipient, chama_id=chama_id,
+                subject='Synthetic message', content='Please confirm your contribution. ' * self.rng.randint(1, 8),
+                is_read=self.rng.random() < 0.7,
+            )
+        if options['messages'] and options['members_per_chama'] >= 2:
+            self.seed_rows('messages', options['messages'], Message, make_message)
+            self.stdout.write('Threading messages...')
+            MessageThread.objects.rebuild()
+
+        self.stdout.write('Rebuilding balance ledger...')
+        ChamaBalance.objects.rebuild(chama_ids)
+        self.stdout.write('Rebuilding contribution rollups...')
+        ContributionRollup.objects.rebuild(chama_ids)
+        self.stdout.write('Rebuilding search index...')
+        get_search_backend().rebuild()
+        bump_version(GLOBAL_SCOPE, 0)
+        self.stdout.write(self.style.SUCCESS(f'Seeded synthetic data in {time.monotonic() - started:.1f}s.'))
+
+    def amount(self, low, high):
+        return Decimal(self.rng.randrange(low * 100, high * 100)) / 100
+
+    def random_date(self):
+        return self.today - timedelta(days=self.rng.randrange(self.days))
+
+    def seed_users(self, prefix, count):
+        password = make_password(None)
+        for start in range(0, count, self.batch_size):
+            stop = min(start + self.batch_size, count)
+            with db_transaction.atomic():
+                User.objects.bulk_create(
+                    [User(username=f'{prefix}_{i}', email=f'{prefix}_{i}@example.com', password=password)
+                     for i in range(start, stop)]
+                )
+                created = User.objects.filter(
+                    username__in=[f'{prefix}_{i}' for i in range(start, stop)]
+                ).values_list('pk', flat=True)
+                UserProfile.objects.bulk_create(
+                    [UserProfile(user_id=pk, phone_number=f'2547{pk:08d}') for pk in created]
+                )
+        self.stdout.write(f'users: {count}')
+        return list(User.objects.filter(username__startswith=f'{prefix}_').values_list('pk', flat=True))
+
+    def seed_chamas(self, prefix, count, user_ids):
+        with db_transaction.atomic():
+            Chama.objects.bulk_create(
+                [Chama(
+                    name=f'{prefix} chama {i}',
+                    created_by_id=self.rng.choice(user_ids),
+                    contribution_amount=Decimal(self.rng.choice([500, 1000, 2000, 5000])),
+                    contribution_frequency=self.rng.choice(FREQUENCIES),
+                ) for i in range(count)],
+                batch_size=self.batch_size,
+            )
+        self.stdout.write(f'chamas: {count}')
+        return list(Chama.objects.filter(name__startswith=f'{prefix} chama ').values_list('pk', flat=True))
+
+    def seed_memberships(self, chama_ids, user_ids, per_chama):
+        roles = ['admin', 'treasurer', 'chairperson']
+        batch = []
+        for chama_id in chama_ids:
+            for position, user_id in enumerate(self.rng.sample(user_ids, per_chama)):
+                role = roles[position] if position < len(roles) else 'member'
+                batch.append(Membership(chama_id=chama_id, user_id=user_id, role=role))
+        with db_transaction.atomic():
+            Membership.objects.bulk_create(batch, batch_size=self.batch_size)
+        self.stdout.write(f'memberships: {len(batch)}')
+        return list(Membership.objects.filter(chama_id__in=chama_ids).values_list('pk', 'chama_id', 'user_id'))
+
+    def seed_rows(self, label, count, model, factory):
+        started = time.monotonic()
+        for start in range(0, count, self.batch_size):
+            stop = min(start + self.batch_size, count)
+            with db_transaction.atomic():
+                model.objects.bulk_create([factory() for _ in range(start, stop)])
+        elapsed = time.monotonic() - started
+        rate = count / elapsed if elapsed else 0
+        self.stdout.write(f'{label}: {count} ({rate:.0f} rows/s)')
@@ -0,0 +1,33 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.arrears import take_snapshot
+from core.models import Chama
+
+
+class Command(BaseCommand):
+    help = 'Compute expected-vs-paid for every active membership and store an arrears snapshot.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chama', type=int, action='append', dest='chama_ids', help='Limit to a chama id (repeatable).')
+        parser.add_argument('--as-of', help='Snapshot date (YYYY-MM-DD), defaults to today.')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Chamas per grouped query.')
+
+    def handle(self, *args, **options):
+        as_of = None
+        if options['as_of']:
+            try:
+                as_of = date.fromisoformat(options['as_of'])
+            except ValueError:
+                raise CommandError('--as-of must be a YYYY-MM-DD date.')
+        chama_ids = options['chama_ids'] or list(Chama.objects.order_by('pk').values_list('pk', flat=True))
+
+        started = time.monotonic()
+        count = 0
+        step = options['chunk_size']
+        for start in range(0, len(chama_ids), step):
+            count += take_snapshot(chama_ids[start:start + step], as_of)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Snapshotted arrears for {count} membership(s) in {elapsed:.2f}s.'))
@@ -0,0 +1,111 @@
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.db.models.functions import Substr
+
+from .models import Message, ThreadParticipant
+from .unread import adjust_unread_count, set_unread_counts
+
+# Characters of the last message shown under each conversation in the inbox
+PREVIEW_CHARS = 120
+
+INBOX_ORDERING = ['-last_message_at', '-id']
+THREAD_ORDERING = ['-created_at', '-id']
+
+
+def inbox(user, archived=False):
+    """
+    The user's conversations, newest first. One row per thread with the last
+    message's subject, sender and a preview cut in SQL; message bodies are
+    never loaded, so the cost doesn't grow with the size of the mailbox.
+    """
+    return ThreadParticipant.objects.filter(
+        Q(cleared_at__isnull=True) | Q(last_message_at__gt=F('cleared_at')), user=user, is_archived=archived,
+    ).select_related(
+        'other', 'thread__last_message__chama',
+    ).only(
+        'thread', 'other', 'last_message_at', 'unread_count', 'is_archived',
+        'other__username',
+        'thread__message_count', 'thread__last_message',
+        'thread__last_message__subject', 'thread__last_message__sender', 'thread__last_message__created_at',
+        'thread__last_message__chama', 'thread__last_message__chama__name',
+    # One extra character tells truncatechars whether to add an ellipsis
+    ).annotate(preview=Substr('thread__last_message__content', 1, PREVIEW_CHARS + 1))
+
+
+def cleared_by(user):
+    """True for messages the user hid by deleting the conversation; use with filter() or exclude()."""
+    return Exists(ThreadParticipant.objects.filter(
+        thread=OuterRef('thread'), user=user, cleared_at__gte=OuterRef('created_at'),
+    ))
+
+
+def thread_messages(thread_id, since=None):
+    messages = Message.objects.filter(thread_id=thread_id).select_related('sender', 'chama')
+    if since is not None:
+        messages = messages.filter(created_at__gt=since)
+    return messages
+
+
+def read_message(message):
+    """
+    Mark ``message`` read for its recipient. The UPDATE is conditional on
+    is_read, so when two requests race only the one that flips the row moves
+    the counters. Returns whether this call marked it.
+    """
+    if not Message.objects.filter(pk=message.pk, is_read=False).update(is_read=True):
+        return False
+    message.is_read = True
+    ThreadParticipant.objects.filter(
+        thread_id=message.thread_id, user_id=message.recipient_id, unread_count__gt=0
+    ).update(unread_count=F('unread_count') - 1)
+    adjust_unread_count(message.recipient_id, -1)
+    return True
+
+
+# Bulk operations: each is one UPDATE per table, whatever the number of rows
+def mark_threads_read(user_id, thread_ids):
+    """Mark every message the user received in the threads as read; return how many changed."""
+    with transaction.atomic():
+        count = Message.objects.filter(thread_id__in=thread_ids, recipient_id=user_id, is_read=False).update(is_read=True)
+        ThreadParticipant.objects.filter(thread_id__in=thread_ids, user_id=user_id, unread_count__gt=0).update(unread_count=0)
+    if count:
+        adjust_unread_count(user_id, -count)
+    return count
+
+
+def mark_all_read(user_id):
+    with transaction.atomic():
+        count = Message.objects.filter(recipient_id=user_id, is_read=False).update(is_read=True)
+        ThreadParticipant.objects.filter(user_id=user_id, unread_count__gt=0).update(unread_count=0)
+    set_unread_counts({user_id: 0})
+    return count
+
+
+def archive_threads(user_id, thread_ids, archived=True):
+    """Move the user's side of the threads in or out of the archive; the other participant is unaffected."""
+    return ThreadParticipant.objects.filter(
+        thread_id__in=thread_ids, user_id=user_id
+    ).exclude(is_archived=archived).update(is_archived=archived)
+
+
+def delete_threads(user_id, thread_ids):
+    """
+    Delete conversations for this user only. The other participant keeps
+    their copy, so no Message rows are removed: the user's view is cleared up
+    to the latest message and the thread returns when a new one arrives.
+    """
+    with transaction.atomic():
+        mark_threads_read(user_id, thread_ids)
+        return ThreadParticipant.objects.filter(
+            thread_id__in=thread_ids, user_id=user_id
+        ).update(cleared_at=F('last_message_at'), is_archived=False)
+
+
+# action -> (function, whether it takes thread ids)
+BULK_ACTIONS = {
+    'mark_all_read': (mark_all_read, False),
+    'mark_read': (mark_threads_read, True),
+    'archive': (archive_threads, True),
+    'unarchive': (lambda user_id, thread_ids: archive_threads(user_id, thread_ids, archived=False), True),
+    'delete': (delete_threads, True),
+}
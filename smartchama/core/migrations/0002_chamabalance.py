@@ -0,0 +1,61 @@
+# Generated by Django 4.2.26 on 2026-10-16 20:29
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_balances(apps, schema_editor):
+    Membership = apps.get_model('core', 'Membership')
+    Transaction = apps.get_model('core', 'Transaction')
+    Chama = apps.get_model('core', 'Chama')
+    ChamaBalance = apps.get_model('core', 'ChamaBalance')
+    outflow_types = ['withdrawal', 'loan', 'expense', 'dividend']
+
+    chama_rows = {pk: ChamaBalance(chama_id=pk) for pk in Chama.objects.values_list('pk', flat=True)}
+    member_rows = []
+    memberships = Membership.objects.annotate(total=models.Sum('contributions__amount')).values_list('pk', 'chama_id', 'total')
+    for membership_id, chama_id, total in memberships:
+        total = total or Decimal('0.00')
+        member_rows.append(ChamaBalance(chama_id=chama_id, membership_id=membership_id, contributions_in=total, balance=total))
+        chama_rows[chama_id].contributions_in += total
+    for row in Transaction.objects.values('chama_id', 'transaction_type').annotate(total=models.Sum('amount')).order_by():
+        if row['transaction_type'] in outflow_types:
+            chama_rows[row['chama_id']].transactions_out += row['total']
+        else:
+            chama_rows[row['chama_id']].transactions_in += row['total']
+    for balance in chama_rows.values():
+        balance.balance = balance.contributions_in + balance.transactions_in - balance.transactions_out
+    ChamaBalance.objects.bulk_create(list(chama_rows.values()) + member_rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChamaBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contributions_in', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('transactions_in', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('transactions_out', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('chama', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balances', to='core.chama')),
+                ('membership', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='balances', to='core.membership')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='chamabalance',
+            constraint=models.UniqueConstraint(fields=('chama', 'membership'), name='unique_member_balance'),
+        ),
+        migrations.AddConstraint(
+            model_name='chamabalance',
+            constraint=models.UniqueConstraint(condition=models.Q(('membership__isnull', True)), fields=('chama',), name='unique_chama_balance'),
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
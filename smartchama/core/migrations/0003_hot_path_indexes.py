@@ -0,0 +1,49 @@
+# Generated by Django 4.2.26 on 2026-10-16 20:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_chamabalance'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['chama', '-is_important', '-created_at'], name='announcement_chama_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['chama', '-created_at'], name='announcement_chama_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contribution',
+            index=models.Index(fields=['membership', '-date', '-created_at'], name='contribution_member_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['user'], name='membership_user_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['chama'], name='membership_chama_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['recipient', '-created_at'], name='message_recipient_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['recipient'], name='message_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['sender', '-created_at'], name='message_sender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['chama', '-date', '-created_at'], name='transaction_chama_date_idx'),
+        ),
+    ]
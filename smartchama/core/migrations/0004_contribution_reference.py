@@ -0,0 +1,22 @@
+# Generated by Django 4.2.26 on 2026-10-16 20:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contribution',
+            name='reference',
+            field=models.CharField(blank=True, help_text='e.g., M-Pesa receipt code', max_length=64),
+        ),
+        migrations.AddConstraint(
+            model_name='contribution',
+            constraint=models.UniqueConstraint(condition=models.Q(('reference', ''), _negated=True), fields=('reference',), name='unique_contribution_reference'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.26 on 2026-10-16 20:38
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models.functions import TruncMonth, TruncWeek
+
+
+def backfill_rollups(apps, schema_editor):
+    Contribution = apps.get_model('core', 'Contribution')
+    ContributionRollup = apps.get_model('core', 'ContributionRollup')
+    contributions = Contribution.objects.order_by()
+    for period, trunc in [('week', TruncWeek('date')), ('month', TruncMonth('date'))]:
+        for fields in [('membership_id', 'membership__chama_id'), ('membership__chama_id',)]:
+            groups = contributions.annotate(start=trunc).values(*fields, 'start').annotate(
+                total=models.Sum('amount'), n=models.Count('pk')
+            )
+            ContributionRollup.objects.bulk_create(
+                [
+                    ContributionRollup(
+                        chama_id=row['membership__chama_id'], membership_id=row.get('membership_id'),
+                        period=period, period_start=row['start'], total=row['total'], count=row['n'],
+                    )
+                    for row in groups.iterator()
+                ],
+                batch_size=5000,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_contribution_reference'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContributionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('week', 'Week'), ('month', 'Month')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('chama', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contribution_rollups', to='core.chama')),
+                ('membership', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='contribution_rollups', to='core.membership')),
+            ],
+            options={
+                'ordering': ['period_start'],
+                'indexes': [models.Index(fields=['chama', 'period', 'period_start'], name='rollup_chama_period_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='contributionrollup',
+            constraint=models.UniqueConstraint(fields=('membership', 'period', 'period_start'), name='unique_member_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='contributionrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('membership__isnull', True)), fields=('chama', 'period', 'period_start'), name='unique_chama_rollup'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.26 on 2026-10-16 20:40
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_contribution_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArrearsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateField()),
+                ('periods_due', models.PositiveIntegerField(default=0)),
+                ('expected', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('paid', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('arrears', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('chama', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='arrears_snapshots', to='core.chama')),
+                ('membership', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='arrears_snapshots', to='core.membership')),
+            ],
+            options={
+                'ordering': ['-as_of', '-arrears'],
+                'indexes': [models.Index(fields=['chama', '-as_of'], name='arrears_chama_asof_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='arrearssnapshot',
+            constraint=models.UniqueConstraint(fields=('membership', 'as_of'), name='unique_arrears_snapshot'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+CREATE_SQL = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS core_search_index USING fts5('
+    'title, body, kind UNINDEXED, object_id UNINDEXED, chama_id UNINDEXED, '
+    "sender_id UNINDEXED, recipient_id UNINDEXED, created_at UNINDEXED, tokenize = 'porter unicode61')"
+)
+
+BACKFILL_SQL = [
+    "INSERT INTO core_search_index (rowid, title, body, kind, object_id, chama_id, sender_id, recipient_id, created_at) "
+    "SELECT id * 4 + 1, title, content, 'announcement', id, chama_id, NULL, NULL, created_at FROM core_announcement",
+    "INSERT INTO core_search_index (rowid, title, body, kind, object_id, chama_id, sender_id, recipient_id, created_at) "
+    "SELECT id * 4 + 2, subject, content, 'message', id, chama_id, sender_id, recipient_id, created_at FROM core_message",
+    "INSERT INTO core_search_index (rowid, title, body, kind, object_id, chama_id, sender_id, recipient_id, created_at) "
+    "SELECT id * 4 + 3, purpose, description, 'transaction', id, chama_id, NULL, NULL, created_at FROM core_transaction",
+]
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite-only; other databases use core.search.DatabaseSearchBackend
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_SQL)
+    for sql in BACKFILL_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS core_search_index')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_notifications'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
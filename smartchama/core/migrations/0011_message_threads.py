@@ -0,0 +1,123 @@
+# Generated by Django 4.2.26 on 2026-10-16 21:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backfill_threads(apps, schema_editor):
+    Message = apps.get_model('core', 'Message')
+    MessageThread = apps.get_model('core', 'MessageThread')
+    ThreadParticipant = apps.get_model('core', 'ThreadParticipant')
+    pairs = {}
+    for row in Message.objects.order_by().values('sender_id', 'recipient_id').annotate(
+        n=models.Count('pk'), last=models.Max('created_at')
+    ):
+        pair = tuple(sorted([row['sender_id'], row['recipient_id']]))
+        count, last = pairs.get(pair, (0, row['last']))
+        pairs[pair] = (count + row['n'], max(last, row['last']))
+    for (low, high), (count, last_at) in pairs.items():
+        thread = MessageThread.objects.create(
+            user_low_id=low, user_high_id=high, message_count=count, last_message_at=last_at,
+        )
+        messages = Message.objects.filter(
+            models.Q(sender_id=low, recipient_id=high) | models.Q(sender_id=high, recipient_id=low)
+        )
+        messages.update(thread=thread)
+        thread.last_message_id = messages.order_by('-created_at', '-id').values_list('pk', flat=True).first()
+        thread.save(update_fields=['last_message'])
+
+    unread = {
+        (row['thread_id'], row['recipient_id']): row['n']
+        for row in Message.objects.filter(is_read=False).order_by().values('thread_id', 'recipient_id').annotate(n=models.Count('pk'))
+    }
+    participants = []
+    for thread in MessageThread.objects.all().iterator():
+        for user_id, other_id in {(thread.user_low_id, thread.user_high_id), (thread.user_high_id, thread.user_low_id)}:
+            participants.append(ThreadParticipant(
+                thread_id=thread.pk, user_id=user_id, other_id=other_id, last_message_at=thread.last_message_at,
+                unread_count=unread.get((thread.pk, user_id), 0),
+            ))
+    ThreadParticipant.objects.bulk_create(participants, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0010_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageThread',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('message_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ThreadParticipant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_at', models.DateTimeField()),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('is_archived', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='threadparticipant',
+            name='other',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='threadparticipant',
+            name='thread',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, db_index=False, related_name='participants', to='core.messagethread'),
+        ),
+        migrations.AddField(
+            model_name='threadparticipant',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, db_index=False, related_name='threads', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='messagethread',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.message'),
+        ),
+        migrations.AddField(
+            model_name='messagethread',
+            name='user_high',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='messagethread',
+            name='user_low',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='thread',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, db_index=False, related_name='messages', to='core.messagethread'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['thread', '-created_at', '-id'], name='message_thread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='threadparticipant',
+            index=models.Index(fields=['user', 'is_archived', '-last_message_at', '-id'], name='thread_inbox_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='threadparticipant',
+            constraint=models.UniqueConstraint(fields=('thread', 'user'), name='unique_thread_participant'),
+        ),
+        migrations.AddConstraint(
+            model_name='messagethread',
+            constraint=models.UniqueConstraint(fields=('user_low', 'user_high'), name='unique_thread_pair'),
+        ),
+        migrations.RunPython(backfill_threads, migrations.RunPython.noop),
+    ]
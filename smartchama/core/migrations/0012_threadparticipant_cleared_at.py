@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-16 21:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_message_threads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='threadparticipant',
+            name='cleared_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.26 on 2026-10-16 21:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_threadparticipant_cleared_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='delivery_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='last_error',
+            field=models.TextField(blank=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-16 22:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_notification_delivery_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='statementrun',
+            name='output_format',
+            field=models.CharField(blank=True, help_text='File type the statements were rendered as', max_length=10),
+        ),
+    ]
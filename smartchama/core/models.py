@@ -1,6 +1,9 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction as db_transaction
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
+from django.utils import timezone
+from datetime import timedelta
 from decimal import Decimal
 
 # User Roles
@@ -35,6 +38,25 @@ class UserProfile(models.Model):
         return self.role == 'chairperson'
 
 # Chama Group
+class ChamaQuerySet(models.QuerySet):
+    def with_stats(self):
+        # Correlated subqueries keep each card's numbers to a single query and
+        # avoid the row multiplication a double join would cause.
+        member_count = Membership.objects.filter(
+            chama=models.OuterRef('pk'), is_active=True
+        ).order_by().values('chama').annotate(c=models.Count('pk')).values('c')
+        total_contributions = Contribution.objects.filter(
+            membership__chama=models.OuterRef('pk')
+        ).order_by().values('membership__chama').annotate(t=models.Sum('amount')).values('t')
+        return self.annotate(
+            member_count=Coalesce(models.Subquery(member_count, output_field=models.IntegerField()), 0),
+            total_contributions=Coalesce(
+                models.Subquery(total_contributions, output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+                models.Value(Decimal('0.00')),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+        )
+
 class Chama(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
@@ -45,6 +67,8 @@ class Chama(models.Model):
     contribution_frequency = models.CharField(max_length=50, default='Monthly', help_text="e.g., Monthly, Weekly, Daily")
     is_active = models.BooleanField(default=True)
     
+    objects = ChamaQuerySet.as_manager()
+    
     class Meta:
         verbose_name_plural = "Chamas"
         ordering = ['-created_at']
@@ -53,13 +77,20 @@ class Chama(models.Model):
         return self.name
     
     def get_total_contributions(self):
-        return self.contributions.aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
+        # Contributions hang off memberships; Chama has no direct relation to them
+        contributions = Contribution.objects.filter(membership__chama=self)
+        return contributions.aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
     
     def get_member_count(self):
         return self.memberships.filter(is_active=True).count()
     
     def get_admin_members(self):
         return self.memberships.filter(role__in=['admin', 'chairperson'], is_active=True)
+    
+    def get_rollup_period(self):
+        # Weekly and daily chamas report per week, everything else per month
+        frequency = (self.contribution_frequency or '').strip().lower()
+        return 'week' if frequency in ('weekly', 'daily') else 'month'
 
 # Membership in Chama
 class Membership(models.Model):
@@ -69,6 +100,8 @@ class Membership(models.Model):
         ('treasurer', 'Treasurer'),
         ('chairperson', 'Chairperson'),
     ]
+    EDITOR_ROLES = ['admin', 'chairperson']
+    TREASURY_ROLES = ['admin', 'treasurer', 'chairperson']
     
     chama = models.ForeignKey(Chama, on_delete=models.CASCADE, related_name='memberships')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='memberships')
@@ -79,25 +112,36 @@ class Membership(models.Model):
     class Meta:
         unique_together = ['chama', 'user']
         ordering = ['-joined_at']
+        indexes = [
+            models.Index(fields=['user'], condition=models.Q(is_active=True), name='membership_user_active_idx'),
+            models.Index(fields=['chama'], condition=models.Q(is_active=True), name='membership_chama_active_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.chama.name} ({self.role})"
     
     def can_edit_chama(self):
-        return self.role in ['admin', 'chairperson'] and self.is_active
+        return self.role in self.EDITOR_ROLES and self.is_active
     
     def can_add_transactions(self):
-        return self.role in ['admin', 'treasurer', 'chairperson'] and self.is_active
+        return self.role in self.TREASURY_ROLES and self.is_active
     
-    def get_total_contributions(self):
-        return self.contributions.aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
+    def get_total_contributions(self, as_of=None):
+        contributions = self.contributions.all()
+        if as_of is not None:
+            contributions = contributions.filter(date__lte=as_of)
+        return contributions.aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
     
-    def get_pending_amount(self):
-        # Calculate based on expected contributions vs actual
-        if not self.chama.contribution_amount:
+    def get_pending_amount(self, as_of=None):
+        # Expected contributions since joining minus what was paid by as_of; matches core.arrears
+        from .arrears import expected_vs_paid
+        if not self.chama.contribution_amount or not self.is_active:
             return Decimal('0.00')
-        # This is a simplified calculation - you might want to track expected contributions separately
-        return Decimal('0.00')
+        as_of = as_of or timezone.localdate()
+        return expected_vs_paid(
+            timezone.localdate(self.joined_at), self.get_total_contributions(as_of),
+            self.chama.contribution_amount, self.chama.contribution_frequency, as_of,
+        )['arrears']
 
 # Contribution
 class Contribution(models.Model):
@@ -105,10 +149,19 @@ class Contribution(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal('0.01'))])
     date = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
+    reference = models.CharField(max_length=64, blank=True, help_text="e.g., M-Pesa receipt code")
     notes = models.TextField(blank=True)
     
     class Meta:
         ordering = ['-date', '-created_at']
+        indexes = [
+            models.Index(fields=['membership', '-date', '-created_at'], name='contribution_member_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['reference'], condition=~models.Q(reference=''), name='unique_contribution_reference'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.membership.user.username} - {self.amount} on {self.date}"
@@ -119,6 +172,9 @@ class Contribution(models.Model):
 
 # Transaction
 class Transaction(models.Model):
+    # Types that take money out of the chama; everything else is an inflow
+    OUTFLOW_TYPES = ['withdrawal', 'loan', 'expense', 'dividend']
+    
     TRANSACTION_TYPES = [
         ('contribution', 'Contribution'),
         ('withdrawal', 'Withdrawal'),
@@ -139,9 +195,15 @@ class Transaction(models.Model):
     
     class Meta:
         ordering = ['-date', '-created_at']
+        indexes = [
+            models.Index(fields=['chama', '-date', '-created_at'], name='transaction_chama_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.chama.name} - {self.transaction_type} - {self.amount} on {self.date}"
+    
+    def is_outflow(self):
+        return self.transaction_type in self.OUTFLOW_TYPES
 
 # Announcement
 class Announcement(models.Model):
@@ -154,6 +216,10 @@ class Announcement(models.Model):
     
     class Meta:
         ordering = ['-is_important', '-created_at']
+        indexes = [
+            models.Index(fields=['chama', '-is_important', '-created_at'], name='announcement_chama_idx'),
+            models.Index(fields=['chama', '-created_at'], name='announcement_chama_recent_idx'),
+        ]
     
     def __str__(self):
         return f"{self.chama.name} - {self.title}"
@@ -165,11 +231,548 @@ class Message(models.Model):
     subject = models.CharField(max_length=200)
     content = models.TextField()
     chama = models.ForeignKey(Chama, on_delete=models.CASCADE, null=True, blank=True, related_name='messages')
+    # Set by MessageThread.objects.record_message when the message is created; message_thread_idx covers lookups
+    thread = models.ForeignKey(
+        'MessageThread', on_delete=models.CASCADE, null=True, blank=True, related_name='messages', db_index=False,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', '-created_at'], name='message_recipient_idx'),
+            models.Index(fields=['recipient'], condition=models.Q(is_read=False), name='message_unread_idx'),
+            models.Index(fields=['sender', '-created_at'], name='message_sender_idx'),
+            models.Index(fields=['thread', '-created_at', '-id'], name='message_thread_idx'),
+        ]
     
     def __str__(self):
         return f"{self.sender.username} to {self.recipient.username} - {self.subject}"
+
+# Conversation threads
+class MessageThreadManager(models.Manager):
+    def for_pair(self, user_id, other_id):
+        low, high = sorted([user_id, other_id])
+        try:
+            with db_transaction.atomic():
+                return self.get_or_create(user_low_id=low, user_high_id=high)[0]
+        except IntegrityError:
+            # Created concurrently by the other participant
+            return self.get(user_low_id=low, user_high_id=high)
+    
+    def record_message(self, message):
+        """Attach a newly created message to its thread and move the thread's pointers and counters."""
+        with db_transaction.atomic():
+            thread = self.for_pair(message.sender_id, message.recipient_id)
+            Message.objects.filter(pk=message.pk).update(thread=thread)
+            message.thread = thread
+            self.filter(pk=thread.pk).update(
+                last_message=message, last_message_at=message.created_at, message_count=models.F('message_count') + 1,
+            )
+            # user -> (other user, unread delta); a note to yourself is one participant
+            participants = {message.sender_id: (message.recipient_id, 0)}
+            participants[message.recipient_id] = (message.sender_id, 1)
+            for user_id, (other_id, unread) in participants.items():
+                # A new message brings an archived conversation back to the inbox
+                updated = ThreadParticipant.objects.filter(thread=thread, user_id=user_id).update(
+                    last_message_at=message.created_at, is_archived=False,
+                    unread_count=models.F('unread_count') + unread,
+                )
+                if not updated:
+                    ThreadParticipant.objects.create(
+                        thread=thread, user_id=user_id, other_id=other_id,
+                        last_message_at=message.created_at, unread_count=unread,
+                    )
+        return thread
+    
+    def refresh(self, thread_ids):
+        """Recompute last-message pointers, counts and per-user unread counts from Message."""
+        for thread in self.filter(pk__in=thread_ids):
+            messages = Message.objects.filter(thread=thread)
+            last = messages.order_by('-created_at', '-id').only('pk', 'created_at').first()
+            self.filter(pk=thread.pk).update(
+                last_message=last, last_message_at=last.created_at if last else thread.created_at,
+                message_count=messages.count(),
+            )
+            for participant in ThreadParticipant.objects.filter(thread=thread):
+                ThreadParticipant.objects.filter(pk=participant.pk).update(
+                    last_message_at=last.created_at if last else thread.created_at,
+                    unread_count=messages.filter(recipient_id=participant.user_id, is_read=False).count(),
+                )
+    
+    def rebuild(self):
+        """Thread every message that has none yet, e.g. rows loaded with bulk_create."""
+        unthreaded = Message.objects.filter(thread__isnull=True)
+        pairs = {
+            tuple(sorted(pair))
+            for pair in unthreaded.order_by().values_list('sender_id', 'recipient_id').distinct()
+        }
+        touched = set()
+        for low, high in pairs:
+            with db_transaction.atomic():
+                thread = self.for_pair(low, high)
+                unthreaded.filter(
+                    models.Q(sender_id=low, recipient_id=high) | models.Q(sender_id=high, recipient_id=low)
+                ).update(thread=thread)
+                for user_id, other_id in {(low, high), (high, low)}:
+                    ThreadParticipant.objects.get_or_create(
+                        thread=thread, user_id=user_id, defaults={'other_id': other_id, 'last_message_at': thread.last_message_at},
+                    )
+                self.refresh([thread.pk])
+            touched.add(thread.pk)
+        return len(touched)
+
+class MessageThread(models.Model):
+    """The conversation between two users; user_low is always the smaller user id."""
+    # unique_thread_pair doubles as the index for user_low
+    user_low = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', db_index=False)
+    user_high = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    last_message = models.ForeignKey(Message, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_message_at = models.DateTimeField(default=timezone.now)
+    message_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    objects = MessageThreadManager()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user_low', 'user_high'], name='unique_thread_pair'),
+        ]
+    
+    def __str__(self):
+        return f"Thread {self.user_low_id}/{self.user_high_id}"
+
+class ThreadParticipant(models.Model):
+    """One user's view of a thread: the inbox row, ordered by the thread's latest message."""
+    # Covered by unique_thread_participant and thread_inbox_idx respectively
+    thread = models.ForeignKey(MessageThread, on_delete=models.CASCADE, related_name='participants', db_index=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='threads', db_index=False)
+    other = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    last_message_at = models.DateTimeField()
+    unread_count = models.PositiveIntegerField(default=0)
+    is_archived = models.BooleanField(default=False)
+    # Deleting a conversation only hides it from this user: messages up to here are dropped from their view
+    cleared_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['thread', 'user'], name='unique_thread_participant'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'is_archived', '-last_message_at', '-id'], name='thread_inbox_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} in {self.thread}"
+
+# Running balance ledger
+class ChamaBalanceManager(models.Manager):
+    def open(self, chama_id, membership_id=None):
+        """Create the zero row for a new chama or membership; rows already there are left alone."""
+        self.bulk_create([self.model(chama_id=chama_id, membership_id=membership_id)], ignore_conflicts=True)
+    
+    def for_chama(self, chama):
+        # Read-only so it is safe on replica reads; rows are opened when the chama is created
+        balance = self.filter(chama=chama, membership__isnull=True).first()
+        return balance if balance is not None else self.model(chama=chama)
+    
+    def _bump(self, queryset, **deltas):
+        net = deltas.get('contributions_in', 0) + deltas.get('transactions_in', 0) - deltas.get('transactions_out', 0)
+        changes = {field: models.F(field) + amount for field, amount in deltas.items()}
+        return queryset.update(balance=models.F('balance') + net, updated_at=timezone.now(), **changes)
+    
+    def record_contribution(self, contribution, sign=1):
+        """Add ``contribution`` to its chama and member rows; ``sign=-1`` takes it back out."""
+        membership = contribution.membership
+        amount = sign * contribution.amount
+        with db_transaction.atomic():
+            self._bump(self.filter(chama_id=membership.chama_id, membership__isnull=True), contributions_in=amount)
+            self._bump(self.filter(membership=membership), contributions_in=amount)
+    
+    def record_transaction(self, transaction, sign=1):
+        field = 'transactions_out' if transaction.is_outflow() else 'transactions_in'
+        self._bump(self.filter(chama_id=transaction.chama_id, membership__isnull=True), **{field: sign * transaction.amount})
+    
+    def remove_membership(self, membership):
+        """Take a departing member's contributions out of the chama row; their own row goes with them."""
+        total = Contribution.objects.filter(membership=membership).aggregate(total=models.Sum('amount'))['total']
+        if total:
+            self._bump(self.filter(chama_id=membership.chama_id, membership__isnull=True), contributions_in=-total)
+    
+    def compute(self, chama_ids=None):
+        """Return fresh ledger totals keyed by (chama_id, membership_id)."""
+        chamas = Chama.objects.all()
+        memberships = Membership.objects.all()
+        contributions = Contribution.objects.all()
+        transactions = Transaction.objects.all()
+        if chama_ids is not None:
+            chamas = chamas.filter(pk__in=chama_ids)
+            memberships = memberships.filter(chama_id__in=chama_ids)
+            contributions = contributions.filter(membership__chama_id__in=chama_ids)
+            transactions = transactions.filter(chama_id__in=chama_ids)
+        
+        zero = Decimal('0.00')
+        totals = {}
+        for chama_id in chamas.values_list('pk', flat=True):
+            totals[(chama_id, None)] = dict(contributions_in=zero, transactions_in=zero, transactions_out=zero)
+        for membership_id, chama_id in memberships.values_list('pk', 'chama_id'):
+            totals[(chama_id, membership_id)] = dict(contributions_in=zero, transactions_in=zero, transactions_out=zero)
+        
+        rows = contributions.order_by().values('membership_id', 'membership__chama_id').annotate(total=models.Sum('amount'))
+        for row in rows:
+            amount = row['total']
+            totals[(row['membership__chama_id'], row['membership_id'])]['contributions_in'] += amount
+            totals[(row['membership__chama_id'], None)]['contributions_in'] += amount
+        
+        rows = transactions.order_by().values('chama_id', 'transaction_type').annotate(total=models.Sum('amount'))
+        for row in rows:
+            field = 'transactions_out' if row['transaction_type'] in Transaction.OUTFLOW_TYPES else 'transactions_in'
+            totals[(row['chama_id'], None)][field] += row['total']
+        
+        for values in totals.values():
+            values['balance'] = values['contributions_in'] + values['transactions_in'] - values['transactions_out']
+        return totals
+    
+    def rebuild(self, chama_ids=None, batch_size=1000):
+        totals = self.compute(chama_ids)
+        with db_transaction.atomic():
+            existing = self.all() if chama_ids is None else self.filter(chama_id__in=chama_ids)
+            existing.delete()
+            self.bulk_create(
+                [
+                    self.model(chama_id=chama_id, membership_id=membership_id, **values)
+                    for (chama_id, membership_id), values in totals.items()
+                ],
+                batch_size=batch_size,
+            )
+        return len(totals)
+    
+    def find_drift(self, chama_ids=None):
+        """Compare stored rows with fresh totals and return the mismatches."""
+        totals = self.compute(chama_ids)
+        stored = self.all() if chama_ids is None else self.filter(chama_id__in=chama_ids)
+        drift = []
+        seen = set()
+        for row in stored.iterator():
+            key = (row.chama_id, row.membership_id)
+            seen.add(key)
+            expected = totals.get(key)
+            actual = {field: getattr(row, field) for field in ChamaBalance.AMOUNT_FIELDS}
+            if expected != actual:
+                drift.append((key, expected, actual))
+        for key in totals.keys() - seen:
+            drift.append((key, totals[key], None))
+        return drift
+
+class ChamaBalance(models.Model):
+    AMOUNT_FIELDS = ['contributions_in', 'transactions_in', 'transactions_out', 'balance']
+    
+    chama = models.ForeignKey(Chama, on_delete=models.CASCADE, related_name='balances')
+    # Null membership marks the chama-wide row
+    membership = models.ForeignKey(Membership, on_delete=models.CASCADE, null=True, blank=True, related_name='balances')
+    contributions_in = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    transactions_in = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    transactions_out = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = ChamaBalanceManager()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['chama', 'membership'], name='unique_member_balance'),
+            models.UniqueConstraint(
+                fields=['chama'], condition=models.Q(membership__isnull=True), name='unique_chama_balance'
+            ),
+        ]
+    
+    def __str__(self):
+        if self.membership_id:
+            return f"{self.chama.name} - {self.membership.user.username} balance"
+        return f"{self.chama.name} balance"
+
+# Contribution rollups per period
+def period_start(day, period):
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+def period_end(start, period):
+    if period == 'week':
+        return start + timedelta(days=7)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+class ContributionRollupManager(models.Manager):
+    def _add(self, chama_id, membership, period, start, amount, count=1):
+        rows = self.filter(chama_id=chama_id, membership=membership, period=period, period_start=start)
+        if rows.update(total=models.F('total') + amount, count=models.F('count') + count):
+            return
+        # First write to this bucket: seed it from the source rows, which
+        # already reflect the contribution being recorded or removed
+        source = Contribution.objects.filter(date__gte=start, date__lt=period_end(start, period))
+        if membership is not None:
+            source = source.filter(membership=membership)
+        else:
+            source = source.filter(membership__chama_id=chama_id)
+        totals = source.aggregate(total=models.Sum('amount'), count=models.Count('pk'))
+        try:
+            with db_transaction.atomic():
+                self.create(
+                    chama_id=chama_id, membership=membership, period=period, period_start=start,
+                    total=totals['total'] or Decimal('0.00'), count=totals['count'],
+                )
+        except IntegrityError:
+            rows.update(total=models.F('total') + amount, count=models.F('count') + count)
+    
+    def record_contribution(self, contribution, sign=1):
+        """Add ``contribution`` to its week and month buckets; ``sign=-1`` takes it back out."""
+        if sign > 0:
+            self.record_change(None, contribution)
+        else:
+            self.record_change(contribution, None)
+    
+    def record_change(self, previous, contribution):
+        """
+        Move ``previous`` (the row as stored before an edit) out of its buckets
+        and ``contribution`` into its own; either may be None. Deltas for a
+        bucket both touch are merged first, since seeding a bucket from the
+        source rows already accounts for the whole change.
+        """
+        deltas = {}
+        for obj, sign in ((previous, -1), (contribution, 1)):
+            if obj is None:
+                continue
+            for period in ContributionRollup.PERIODS:
+                start = period_start(obj.date, period)
+                for membership in (obj.membership, None):
+                    key = (obj.membership.chama_id, membership, period, start)
+                    amount, count = deltas.get(key, (0, 0))
+                    deltas[key] = (amount + sign * obj.amount, count + sign)
+        with db_transaction.atomic():
+            for (chama_id, membership, period, start), (amount, count) in deltas.items():
+                if amount or count:
+                    self._add(chama_id, membership, period, start, amount, count)
+    
+    def remove_membership(self, membership):
+        """Take a departing member's contributions out of the chama-wide buckets; their own rows go with them."""
+        contributions = Contribution.objects.filter(membership=membership).order_by()
+        truncs = {'week': TruncWeek('date'), 'month': TruncMonth('date')}
+        for period, trunc in truncs.items():
+            groups = contributions.annotate(start=trunc).values('start').annotate(
+                total=models.Sum('amount'), n=models.Count('pk')
+            )
+            for row in groups:
+                self.filter(
+                    chama_id=membership.chama_id, membership=None, period=period, period_start=row['start']
+                ).update(total=models.F('total') - row['total'], count=models.F('count') - row['n'])
+    
+    def rebuild(self, chama_ids=None, batch_size=5000):
+        """Recompute rollups from Contribution with grouped queries, streaming the groups."""
+        contributions = Contribution.objects.order_by()
+        if chama_ids is not None:
+            contributions = contributions.filter(membership__chama_id__in=chama_ids)
+        truncs = {'week': TruncWeek('date'), 'month': TruncMonth('date')}
+        created = 0
+        with db_transaction.atomic():
+            existing = self.all() if chama_ids is None else self.filter(chama_id__in=chama_ids)
+            existing.delete()
+            for period, trunc in truncs.items():
+                member_groups = contributions.annotate(start=trunc).values(
+                    'membership_id', 'membership__chama_id', 'start'
+                ).annotate(total=models.Sum('amount'), n=models.Count('pk'))
+                chama_groups = contributions.annotate(start=trunc).values(
+                    'membership__chama_id', 'start'
+                ).annotate(total=models.Sum('amount'), n=models.Count('pk'))
+                for groups in (member_groups, chama_groups):
+                    batch = []
+                    for row in groups.iterator(chunk_size=batch_size):
+                        batch.append(self.model(
+                            chama_id=row['membership__chama_id'], membership_id=row.get('membership_id'),
+                            period=period, period_start=row['start'], total=row['total'], count=row['n'],
+                        ))
+                        if len(batch) >= batch_size:
+                            self.bulk_create(batch)
+                            created += len(batch)
+                            batch = []
+                    self.bulk_create(batch)
+                    created += len(batch)
+        return created
+    
+    def series(self, chama, period, start, end, membership=None):
+        """Chama-wide (or one member's) totals per period between start and end, gaps filled."""
+        rows = self.filter(
+            chama=chama, membership=membership, period=period, period_start__gte=start, period_start__lte=end
+        ).values_list('period_start', 'total', 'count')
+        found = {day: (total, count) for day, total, count in rows}
+        points = []
+        cursor = period_start(start, period)
+        while cursor <= end:
+            total, count = found.get(cursor, (Decimal('0.00'), 0))
+            points.append({'period_start': cursor, 'total': total, 'count': count})
+            cursor = period_end(cursor, period)
+        return points
+    
+    def member_totals(self, chama, period, start, end):
+        return self.filter(
+            chama=chama, membership__isnull=False, period=period, period_start__gte=start, period_start__lte=end
+        ).values('membership_id', 'membership__user__username').annotate(
+            total=models.Sum('total'), count=models.Sum('count')
+        ).order_by('-total')
+
+
+class ContributionRollup(models.Model):
+    PERIODS = ['week', 'month']
+    PERIOD_CHOICES = [('week', 'Week'), ('month', 'Month')]
+    
+    chama = models.ForeignKey(Chama, on_delete=models.CASCADE, related_name='contribution_rollups')
+    # Null membership marks the chama-wide row
+    membership = models.ForeignKey(Membership, on_delete=models.CASCADE, null=True, blank=True, related_name='contribution_rollups')
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    count = models.PositiveIntegerField(default=0)
+    
+    objects = ContributionRollupManager()
+    
+    class Meta:
+        ordering = ['period_start']
+        constraints = [
+            models.UniqueConstraint(fields=['membership', 'period', 'period_start'], name='unique_member_rollup'),
+            models.UniqueConstraint(
+                fields=['chama', 'period', 'period_start'], condition=models.Q(membership__isnull=True),
+                name='unique_chama_rollup',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['chama', 'period', 'period_start'], name='rollup_chama_period_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.chama.name} - {self.period} of {self.period_start}: {self.total}"
+
+# Arrears Snapshot
+class ArrearsSnapshot(models.Model):
+    chama = models.ForeignKey(Chama, on_delete=models.CASCADE, related_name='arrears_snapshots')
+    membership = models.ForeignKey(Membership, on_delete=models.CASCADE, related_name='arrears_snapshots')
+    as_of = models.DateField()
+    periods_due = models.PositiveIntegerField(default=0)
+    expected = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    paid = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    arrears = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-as_of', '-arrears']
+        constraints = [
+            models.UniqueConstraint(fields=['membership', 'as_of'], name='unique_arrears_snapshot'),
+        ]
+        indexes = [
+            models.Index(fields=['chama', '-as_of'], name='arrears_chama_asof_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.membership} arrears on {self.as_of}: {self.arrears}"
+
+# Member Statements
+class StatementRun(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    chama = models.ForeignKey(Chama, on_delete=models.CASCADE, related_name='statement_runs')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='statement_runs')
+    period_start = models.DateField()
+    period_end = models.DateField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    total = models.PositiveIntegerField(default=0)
+    rendered = models.PositiveIntegerField(default=0)
+    output_dir = models.CharField(max_length=255, blank=True)
+    output_format = models.CharField(max_length=10, blank=True, help_text="File type the statements were rendered as")
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['chama', '-created_at'], name='statement_run_chama_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.chama.name} statements {self.period_start} to {self.period_end} ({self.status})"
+    
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+
+# Background Job
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_ms = models.FloatField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['run_at', 'id']
+        indexes = [
+            models.Index(fields=['run_at', 'id'], condition=models.Q(status='queued'), name='job_queued_idx'),
+            models.Index(fields=['name', 'status'], name='job_name_status_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+# Notification
+class Notification(models.Model):
+    DELIVERY_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+        ('skipped', 'Skipped'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    chama = models.ForeignKey(Chama, on_delete=models.CASCADE, related_name='notifications')
+    announcement = models.ForeignKey(Announcement, on_delete=models.CASCADE, null=True, blank=True, related_name='notifications')
+    title = models.CharField(max_length=200)
+    body = models.TextField(blank=True)
+    is_read = models.BooleanField(default=False)
+    email_status = models.CharField(max_length=10, choices=DELIVERY_CHOICES, default='pending')
+    sms_status = models.CharField(max_length=10, choices=DELIVERY_CHOICES, default='pending')
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    delivery_attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at', '-id']
+        constraints = [
+            models.UniqueConstraint(fields=['announcement', 'user'], name='unique_announcement_notification'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='notification_inbox_idx'),
+            models.Index(fields=['user', '-created_at'], condition=models.Q(is_read=False), name='notification_unread_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username}: {self.title}"
@@ -0,0 +1,211 @@
+import json
+import logging
+import sys
+import threading
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django.utils.text import Truncator
+
+from .models import Announcement, Membership, Notification
+
+logger = logging.getLogger(__name__)
+
+CHANNELS = {
+    'email': 'email_status',
+    'sms': 'sms_status',
+}
+
+DEFAULT_BACKENDS = {
+    'email': 'core.notifications.ConsoleBackend',
+    'sms': 'core.notifications.ConsoleBackend',
+}
+
+
+class NotificationsUndelivered(Exception):
+    """Some recipients could not be reached yet; the job should be retried."""
+
+
+# Backends
+class BaseBackend:
+    """
+    Delivers a batch of messages for one channel. ``messages`` is a list of
+    dicts with ``id``, ``to``, ``subject`` and ``body``; return the ids that
+    were delivered.
+    """
+
+    def __init__(self, channel, **options):
+        self.channel = channel
+        self.options = options
+
+    def send_batch(self, messages):
+        raise NotImplementedError
+
+
+class ConsoleBackend(BaseBackend):
+    _lock = threading.Lock()
+
+    def send_batch(self, messages):
+        stream = self.options.get('stream') or sys.stdout
+        with self._lock:
+            for message in messages:
+                stream.write(f'[{self.channel}] to={message["to"]} subject={message["subject"]!r}\n{message["body"]}\n')
+            stream.flush()
+        return [message['id'] for message in messages]
+
+
+class FileBackend(BaseBackend):
+    """Append one JSON line per message to ``options['path']``."""
+
+    _lock = threading.Lock()
+
+    def send_batch(self, messages):
+        path = self.options.get('path') or settings.BASE_DIR / f'notifications-{self.channel}.log'
+        with self._lock, open(path, 'a', encoding='utf-8') as fileobj:
+            for message in messages:
+                fileobj.write(json.dumps(dict(message, channel=self.channel), default=str) + '\n')
+        return [message['id'] for message in messages]
+
+
+class DjangoEmailBackend(BaseBackend):
+    """Send through Django's EMAIL_BACKEND over a single connection per batch."""
+
+    def send_batch(self, messages):
+        delivered = []
+        with get_connection(fail_silently=False) as connection:
+            for message in messages:
+                try:
+                    EmailMessage(message['subject'], message['body'], to=[message['to']], connection=connection).send()
+                except Exception:
+                    logger.exception('Email notification %s to %s failed', message['id'], message['to'])
+                else:
+                    delivered.append(message['id'])
+        return delivered
+
+
+def get_backend(channel):
+    config = getattr(settings, 'NOTIFICATION_BACKENDS', {}).get(channel, DEFAULT_BACKENDS[channel])
+    if isinstance(config, str):
+        config = {'BACKEND': config}
+    options = {key.lower(): value for key, value in config.items() if key != 'BACKEND'}
+    return import_string(config['BACKEND'])(channel, **options)
+
+
+def batch_size():
+    return getattr(settings, 'NOTIFICATION_BATCH_SIZE', 200)
+
+
+def max_attempts():
+    return getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 3)
+
+
+# Fan-out and delivery
+def fan_out_announcement(announcement):
+    """Create one notification per active member (except the author) with bulk_create."""
+    body = Truncator(announcement.content).chars(500)
+    recipients = Membership.objects.filter(chama_id=announcement.chama_id, is_active=True)
+    if announcement.created_by_id:
+        recipients = recipients.exclude(user_id=announcement.created_by_id)
+    created = Notification.objects.bulk_create(
+        [
+            Notification(
+                user_id=user_id, chama_id=announcement.chama_id, announcement=announcement,
+                title=announcement.title, body=body,
+            )
+            for user_id in recipients.values_list('user_id', flat=True).iterator()
+        ],
+        batch_size=batch_size(),
+        ignore_conflicts=True,
+    )
+    return len(created)
+
+
+def pending_batches(announcement_id):
+    """
+    Yield lists of undelivered notifications for ``announcement_id``, keyset-walked
+    by id. Rows that have already failed ``NOTIFICATION_MAX_ATTEMPTS`` times are left out.
+    """
+    last_id = 0
+    while True:
+        batch = list(
+            Notification.objects.filter(
+                announcement_id=announcement_id, delivered_at__isnull=True,
+                delivery_attempts__lt=max_attempts(), pk__gt=last_id,
+            ).order_by('pk').values(
+                'pk', 'title', 'body', 'email_status', 'sms_status', 'user__email', 'user__profile__phone_number'
+            )[:batch_size()]
+        )
+        if not batch:
+            return
+        last_id = batch[-1]['pk']
+        yield batch
+
+
+def deliver_batch(rows):
+    """
+    Send ``rows`` on every channel that has not already gone out and record
+    per-channel delivery state in bulk. Only rows delivered on every channel are
+    stamped ``delivered_at``; the rest get an attempt counted and the error kept
+    so a later pass retries them. Returns the number of rows delivered.
+    """
+    errors = {}
+    for channel, field in CHANNELS.items():
+        address = 'user__email' if channel == 'email' else 'user__profile__phone_number'
+        messages, skipped = [], []
+        for row in rows:
+            if row[field] in ('sent', 'skipped'):
+                continue
+            if row[address]:
+                messages.append({'id': row['pk'], 'to': row[address], 'subject': row['title'], 'body': row['body']})
+            else:
+                skipped.append(row['pk'])
+        delivered, error = set(), f'{channel}: not delivered'
+        if messages:
+            try:
+                delivered = set(get_backend(channel).send_batch(messages))
+            except Exception as exc:
+                logger.exception('%s backend failed for a batch of %s notifications', channel, len(messages))
+                error = f'{channel}: {exc}'
+        failed = [message['id'] for message in messages if message['id'] not in delivered]
+        for pk in failed:
+            errors.setdefault(pk, []).append(error)
+        for status, ids in (('sent', delivered), ('failed', failed), ('skipped', skipped)):
+            if ids:
+                Notification.objects.filter(pk__in=ids).update(**{field: status})
+
+    succeeded = [row['pk'] for row in rows if row['pk'] not in errors]
+    if succeeded:
+        Notification.objects.filter(pk__in=succeeded).update(delivered_at=timezone.now(), last_error='')
+    by_error = {}
+    for pk, reasons in errors.items():
+        by_error.setdefault('; '.join(reasons), []).append(pk)
+    for error, ids in by_error.items():
+        Notification.objects.filter(pk__in=ids).update(
+            delivery_attempts=F('delivery_attempts') + 1, last_error=error
+        )
+    return len(succeeded)
+
+
+def notify_announcement(announcement_id):
+    """
+    Fan out and deliver ``announcement_id``. Raises ``NotificationsUndelivered``
+    while retryable failures remain so the job queue runs it again with backoff.
+    """
+    announcement = Announcement.objects.filter(pk=announcement_id).first()
+    if announcement is None:
+        return 0
+    fan_out_announcement(announcement)
+    delivered = 0
+    for rows in pending_batches(announcement_id):
+        delivered += deliver_batch(rows)
+    remaining = Notification.objects.filter(
+        announcement_id=announcement_id, delivered_at__isnull=True, delivery_attempts__lt=max_attempts()
+    ).count()
+    if remaining:
+        raise NotificationsUndelivered(
+            f'{remaining} notifications for announcement {announcement_id} are still undelivered.'
+        )
+    return delivered
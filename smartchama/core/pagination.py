@@ -0,0 +1,106 @@
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(values):
+    raw = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, fields):
+    """Turn an opaque cursor back into typed field values, or None if it is invalid."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(fields):
+            return None
+        return [model._meta.get_field(name).to_python(value) for name, value in zip(fields, values)]
+    except Exception:
+        return None
+
+
+def keyset_filter(ordering, values):
+    # (a, b, c) after (x, y, z) == a<x OR (a=x AND b<y) OR (a=x AND b=y AND c<z)
+    condition = Q()
+    for i, term in enumerate(ordering):
+        name = term.lstrip('-')
+        lookup = 'lt' if term.startswith('-') else 'gt'
+        step = Q(**{f'{name}__{lookup}': values[i]})
+        for prev, value in zip(ordering[:i], values):
+            step &= Q(**{prev.lstrip('-'): value})
+        condition |= step
+    return condition
+
+
+def get_page_size(request):
+    default = getattr(settings, 'PAGINATION_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    limit = getattr(settings, 'PAGINATION_MAX_PAGE_SIZE', MAX_PAGE_SIZE)
+    try:
+        size = int(request.GET.get('page_size', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, limit))
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor, request, param):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.has_next = next_cursor is not None
+        self.is_first = not request.GET.get(param)
+        self._request = request
+        self._param = param
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def _url(self, cursor):
+        query = self._request.GET.copy()
+        query.pop(self._param, None)
+        if cursor:
+            query[self._param] = cursor
+        return f'?{query.urlencode()}' if query else self._request.path
+
+    @property
+    def next_url(self):
+        return self._url(self.next_cursor) if self.has_next else None
+
+    @property
+    def first_url(self):
+        return self._url(None)
+
+
+def paginate_keyset(request, queryset, ordering, param='cursor', page_size=None):
+    """
+    Return one page of ``queryset`` ordered by ``ordering``, starting after the
+    row encoded in ``request.GET[param]``. The last ordering term must be unique.
+    """
+    page_size = page_size or get_page_size(request)
+    fields = [term.lstrip('-') for term in ordering]
+    queryset = queryset.order_by(*ordering)
+
+    cursor = request.GET.get(param)
+    values = decode_cursor(cursor, queryset.model, fields) if cursor else None
+    if values is not None:
+        queryset = queryset.filter(keyset_filter(ordering, values))
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        # Rows are model instances, or dicts when ``queryset`` comes from values()
+        next_cursor = encode_cursor([last[name] if isinstance(last, dict) else getattr(last, name) for name in fields])
+    return CursorPage(rows, next_cursor, request, param)
@@ -0,0 +1,120 @@
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+from django.http import Http404
+from django.shortcuts import redirect
+
+from .cache import object_cache
+from .models import Chama, Membership
+
+MEMBERSHIP_MAP_TIMEOUT = 300
+
+
+def membership_map_key(user_id):
+    return f'core:memberships:{user_id}'
+
+
+def get_membership_map(user):
+    """Return {chama_id: role} for the user's active memberships, cached per user."""
+    key = membership_map_key(user.pk)
+    roles = cache.get(key)
+    if roles is None:
+        roles = dict(
+            Membership.objects.filter(user=user, is_active=True).order_by().values_list('chama_id', 'role')
+        )
+        cache.set(key, roles, MEMBERSHIP_MAP_TIMEOUT)
+    return roles
+
+
+def invalidate_membership_map(user_id):
+    cache.delete(membership_map_key(user_id))
+
+
+def invalidate_membership_map_on_commit(user_id):
+    # Drop the map now so the writing transaction sees its own change, and
+    # again on commit in case another request cached the old roles meanwhile
+    invalidate_membership_map(user_id)
+    db_transaction.on_commit(lambda: invalidate_membership_map(user_id))
+
+
+def async_login_required(view_func):
+    """login_required for async views; the session and user are loaded off the event loop."""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        if not await sync_to_async(lambda: request.user.is_authenticated)():
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def chama_member_required(roles=None, message='You are not a member of this Chama.', redirect_to='chama_list'):
+    """
+    Require an active membership in the chama named by the ``chama_id`` URL
+    argument, optionally with one of ``roles``. Role checks are answered from
+    the cached membership map; allowed requests get ``request.chama`` and
+    ``request.membership`` from the object cache (a single query when cold).
+    The membership is read from the shared cache, never this process's LRU,
+    so a removal or role change made elsewhere applies on the next request.
+    Works on sync and async views.
+    """
+    def deny(request, chama_id):
+        messages.error(request, message)
+        if redirect_to == 'chama_list':
+            return redirect(redirect_to)
+        return redirect(redirect_to, chama_id=chama_id)
+
+    def check(request, chama_id):
+        """Return a denial response, or None once request.chama/membership are set."""
+        role = get_membership_map(request.user).get(chama_id)
+        if role is not None and roles is not None and role not in roles:
+            return deny(request, chama_id)
+
+        membership = object_cache(Membership).get_by(
+            fetch=lambda: Membership.objects.select_related('chama').filter(chama_id=chama_id, user=request.user).first(),
+            local=False, chama_id=chama_id, user_id=request.user.pk,
+        )
+        if membership is None or not membership.is_active:
+            if object_cache(Chama).get(chama_id) is None:
+                raise Http404('No Chama matches the given query.')
+            return deny(request, chama_id)
+        if not Membership.chama.is_cached(membership):
+            membership.chama = object_cache(Chama).get(chama_id)
+        if role != membership.role:
+            # Written by another process since the map was cached
+            invalidate_membership_map(request.user.pk)
+        if roles is not None and membership.role not in roles:
+            return deny(request, chama_id)
+
+        request.membership = membership
+        request.chama = membership.chama
+        return None
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            def login_and_check(request, chama_id):
+                if not request.user.is_authenticated:
+                    return redirect_to_login(request.get_full_path())
+                return check(request, chama_id)
+
+            @wraps(view_func)
+            async def async_wrapper(request, chama_id, *args, **kwargs):
+                denied = await sync_to_async(login_and_check)(request, chama_id)
+                if denied is not None:
+                    return denied
+                return await view_func(request, chama_id, *args, **kwargs)
+            return async_wrapper
+
+        @login_required
+        @wraps(view_func)
+        def wrapper(request, chama_id, *args, **kwargs):
+            denied = check(request, chama_id)
+            if denied is not None:
+                return denied
+            return view_func(request, chama_id, *args, **kwargs)
+        return wrapper
+    return decorator
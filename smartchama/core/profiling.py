@@ -0,0 +1,324 @@
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.template.backends.django import Template as DjangoTemplate
+
+from .cache import object_cache_stats
+from .jobs import job_stats
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+QUERY_BUCKETS = [1, 2, 5, 10, 20, 50, 100]
+DUPLICATE_THRESHOLD = 3
+MAX_FINGERPRINTS = 20
+
+# A ContextVar rather than a thread-local so the profile follows async views into sync_to_async threads
+_current = contextvars.ContextVar('request_profile', default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def quantile(self, q):
+        """Upper bucket bound containing the q-th observation."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + [float('inf')], self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float('inf')
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.total, 3),
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.counts)),
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+        }
+
+
+class ViewStats:
+    def __init__(self):
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.db_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.template_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.duplicates = Counter()
+        self.budget_exceeded = 0
+
+    def as_dict(self):
+        return {
+            'latency_ms': self.latency_ms.as_dict(),
+            'db_ms': self.db_ms.as_dict(),
+            'template_ms': self.template_ms.as_dict(),
+            'queries': self.queries.as_dict(),
+            'duplicate_queries': dict(self.duplicates.most_common(MAX_FINGERPRINTS)),
+            'budget_exceeded': self.budget_exceeded,
+        }
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def record(self, view_name, profile, latency_ms, over_budget):
+        with self.lock:
+            stats = self.views.setdefault(view_name, ViewStats())
+            stats.latency_ms.observe(latency_ms)
+            stats.db_ms.observe(profile.db_ms)
+            stats.template_ms.observe(profile.template_ms)
+            stats.queries.observe(profile.query_count)
+            for fingerprint in profile.duplicates():
+                stats.duplicates[fingerprint] += 1
+            if over_budget:
+                stats.budget_exceeded += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {name: stats.as_dict() for name, stats in sorted(self.views.items())}
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+
+registry = Registry()
+
+
+class RequestProfile:
+    def __init__(self):
+        self.query_count = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.fingerprints = Counter()
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            with self.lock:
+                self.db_ms += elapsed
+                self.query_count += 1
+                # Parameters are passed separately, so the SQL text is already a fingerprint
+                self.fingerprints[sql] += 1
+
+    def duplicates(self):
+        return [sql for sql, count in self.fingerprints.items() if count >= DUPLICATE_THRESHOLD]
+
+
+_original_render = DjangoTemplate.render
+
+
+def _timed_render(self, context=None, request=None):
+    profile = _current.get()
+    if profile is None:
+        return _original_render(self, context, request)
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context, request)
+    finally:
+        profile.template_ms += (time.perf_counter() - started) * 1000
+
+
+def install_template_timer():
+    """Time template rendering; only done once ProfilingMiddleware is loaded and enabled."""
+    DjangoTemplate.render = _timed_render
+
+
+def uninstall_template_timer():
+    DjangoTemplate.render = _original_render
+
+
+def install_wrappers(profile):
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(profile))
+    return stack
+
+
+@contextmanager
+def track_queries():
+    """Count queries made on this thread's connections towards the current request's profile."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    with install_wrappers(profile):
+        yield
+
+
+def get_query_budget(view_name):
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+
+
+class ProfilingMiddleware:
+    """
+    Record query count, DB time, duplicate queries, template time and latency
+    per URL name, and enforce the per-view limits in ``settings.QUERY_BUDGETS``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', True):
+            uninstall_template_timer()
+            raise MiddlewareNotUsed
+        install_template_timer()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        started = time.perf_counter()
+        try:
+            with install_wrappers(profile):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile, started)
+
+    async def __acall__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        started = time.perf_counter()
+        # Sync ORM calls from async views run on the request's thread-sensitive executor thread
+        stack = await sync_to_async(install_wrappers)(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            _current.reset(token)
+        return self.finish(request, response, profile, started)
+
+    def finish(self, request, response, profile, started):
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else 'unresolved'
+        budget = get_query_budget(view_name)
+        over_budget = budget is not None and profile.query_count > budget
+        registry.record(view_name, profile, latency_ms, over_budget)
+
+        response['Server-Timing'] = (
+            f'db;dur={profile.db_ms:.1f}, tpl;dur={profile.template_ms:.1f}, total;dur={latency_ms:.1f}'
+        )
+        if over_budget:
+            message = f'{view_name} ran {profile.query_count} queries (budget {budget})'
+            duplicates = profile.duplicates()
+            if duplicates:
+                message += f'; repeated: {duplicates[0][:200]}'
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+def render_prometheus(snapshot):
+    lines = []
+    metrics = [
+        ('latency_ms', 'smartchama_request_latency_ms', 'Request latency in milliseconds'),
+        ('db_ms', 'smartchama_request_db_ms', 'Database time per request in milliseconds'),
+        ('template_ms', 'smartchama_request_template_ms', 'Template render time per request in milliseconds'),
+        ('queries', 'smartchama_request_queries', 'SQL queries per request'),
+    ]
+    for key, name, help_text in metrics:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for view_name, stats in snapshot.items():
+            histogram = stats[key]
+            cumulative = 0
+            for bound, count in histogram['buckets'].items():
+                cumulative += count
+                lines.append(f'{name}_bucket{{view="{view_name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{view="{view_name}"}} {histogram["sum"]}')
+            lines.append(f'{name}_count{{view="{view_name}"}} {histogram["count"]}')
+    lines.append('# HELP smartchama_query_budget_exceeded_total Requests that ran more queries than their budget')
+    lines.append('# TYPE smartchama_query_budget_exceeded_total counter')
+    for view_name, stats in snapshot.items():
+        lines.append(f'smartchama_query_budget_exceeded_total{{view="{view_name}"}} {stats["budget_exceeded"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def render_job_metrics(stats):
+    lines = [
+        '# HELP smartchama_jobs Background jobs by name and status',
+        '# TYPE smartchama_jobs gauge',
+    ]
+    for name, row in sorted(stats.items()):
+        for status in ('queued', 'running', 'done', 'failed'):
+            lines.append(f'smartchama_jobs{{job="{name}",status="{status}"}} {row[status]}')
+    lines.append('# HELP smartchama_job_duration_ms Mean and max duration of completed jobs in milliseconds')
+    lines.append('# TYPE smartchama_job_duration_ms gauge')
+    for name, row in sorted(stats.items()):
+        if row['avg_ms'] is not None:
+            lines.append(f'smartchama_job_duration_ms{{job="{name}",stat="avg"}} {row["avg_ms"]:.3f}')
+            lines.append(f'smartchama_job_duration_ms{{job="{name}",stat="max"}} {row["max_ms"]:.3f}')
+    return '\n'.join(lines) + '\n'
+
+
+def render_cache_metrics(stats):
+    lines = [
+        '# HELP smartchama_object_cache_total Object cache lookups and evictions in this process',
+        '# TYPE smartchama_object_cache_total counter',
+    ]
+    for model, row in sorted(stats.items()):
+        for counter in ('local_hits', 'shared_hits', 'misses', 'evictions', 'expirations'):
+            lines.append(f'smartchama_object_cache_total{{model="{model}",counter="{counter}"}} {row[counter]}')
+    lines.append('# HELP smartchama_object_cache_size Entries held in the per-process LRU')
+    lines.append('# TYPE smartchama_object_cache_size gauge')
+    for model, row in sorted(stats.items()):
+        lines.append(f'smartchama_object_cache_size{{model="{model}"}} {row["size"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics(request):
+    token = getattr(settings, 'PROFILING_METRICS_TOKEN', None)
+    authorized = request.user.is_staff or (token and request.headers.get('Authorization') == f'Bearer {token}')
+    if not authorized:
+        return HttpResponseForbidden('Metrics are restricted to staff.')
+    snapshot = registry.snapshot()
+    if request.GET.get('format') == 'json':
+        return JsonResponse(dict(snapshot, object_cache=object_cache_stats()), json_dumps_params={'indent': 2})
+    body = render_prometheus(snapshot) + render_job_metrics(job_stats()) + render_cache_metrics(object_cache_stats())
+    return HttpResponse(body, content_type='text/plain; version=0.0.4')
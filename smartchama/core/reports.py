@@ -0,0 +1,42 @@
+from datetime import date, timedelta
+
+from django.utils import timezone
+
+from .models import ContributionRollup, period_start
+
+DEFAULT_MONTHS = 12
+MAX_MONTHS = 60
+
+
+def contribution_report(chama, period=None, months=None):
+    """Build a trend report for ``chama`` from the rollup tables only."""
+    if period not in ContributionRollup.PERIODS:
+        period = chama.get_rollup_period()
+    try:
+        months = min(max(int(months), 1), MAX_MONTHS)
+    except (TypeError, ValueError):
+        months = DEFAULT_MONTHS
+
+    end = period_start(timezone.localdate(), period)
+    if period == 'month':
+        index = end.year * 12 + end.month - 1 - (months - 1)
+        start = date(index // 12, index % 12 + 1, 1)
+    else:
+        start = end - timedelta(weeks=round(months * 52 / 12) - 1)
+    series = ContributionRollup.objects.series(chama, period, start, end)
+    peak = max((point['total'] for point in series), default=0) or 1
+    for point in series:
+        point['percent'] = round(point['total'] / peak * 100)
+    members = list(ContributionRollup.objects.member_totals(chama, period, start, end))
+    return {
+        'period': period,
+        'months': months,
+        'start': start,
+        'end': end,
+        'series': series,
+        'members': [
+            {'membership': row['membership_id'], 'username': row['membership__user__username'],
+             'total': row['total'], 'count': row['count']}
+            for row in members
+        ],
+    }
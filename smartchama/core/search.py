@@ -0,0 +1,236 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from .messaging import cleared_by
+from .models import Announcement, Message, ThreadParticipant, Transaction
+
+# kind -> (model, title field, body field, rowid offset)
+KINDS = {
+    'announcement': (Announcement, 'title', 'content', 1),
+    'message': (Message, 'subject', 'content', 2),
+    'transaction': (Transaction, 'purpose', 'description', 3),
+}
+CHAMA_KINDS = ['announcement', 'transaction']
+MAX_RESULTS = 50
+MAX_TERMS = 8
+
+# snippet() markers, swapped for <mark> after the text is escaped
+HIT_START, HIT_END = '\x02', '\x03'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchHit:
+    def __init__(self, kind, object_id, chama_id, created_at, title, snippet, rank):
+        self.kind = kind
+        self.object_id = object_id
+        self.chama_id = chama_id
+        self.created_at = created_at
+        self.title = title
+        self.snippet = snippet
+        self.rank = rank
+
+
+def highlight(text):
+    text = escape(text or '')
+    return mark_safe(text.replace(HIT_START, '<mark>').replace(HIT_END, '</mark>'))
+
+
+def stored_datetime(value):
+    value = parse_datetime(value) if isinstance(value, str) else value
+    if value is not None and settings.USE_TZ and timezone.is_naive(value):
+        value = timezone.make_aware(value, timezone.utc)
+    return value
+
+
+def search_terms(query):
+    return TOKEN_RE.findall(query or '')[:MAX_TERMS]
+
+
+class BaseSearchBackend:
+    def index(self, kind, obj):
+        raise NotImplementedError
+
+    def remove(self, kind, pk):
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def search(self, user_id, chama_ids, query, kinds=None, limit=MAX_RESULTS):
+        """
+        Ranked hits visible to the user: chama content for their chamas, and
+        messages they sent or received that are not in a conversation they deleted.
+        """
+        raise NotImplementedError
+
+    def search_ids(self, kind, query, limit=1000):
+        """Unfiltered matching ids of one kind, for staff tools such as the admin."""
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """
+    One FTS5 table for every searchable kind. The rowid encodes kind and
+    primary key (pk * 4 + offset) so updates and deletes hit the rowid
+    instead of scanning the UNINDEXED columns.
+    """
+    table = 'core_search_index'
+    # bm25 weights: a hit in the title counts ten times one in the body
+    rank_expression = f'bm25({table}, 10.0, 1.0)'
+
+    def rowid(self, kind, pk):
+        return pk * 4 + KINDS[kind][3]
+
+    def index(self, kind, obj):
+        model, title_field, body_field, _ = KINDS[kind]
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [self.rowid(kind, obj.pk)])
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, title, body, kind, object_id, chama_id, sender_id, recipient_id, created_at) '
+                'VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)',
+                [
+                    self.rowid(kind, obj.pk), getattr(obj, title_field), getattr(obj, body_field), kind, obj.pk,
+                    obj.chama_id, getattr(obj, 'sender_id', None), getattr(obj, 'recipient_id', None),
+                    connection.ops.adapt_datetimefield_value(obj.created_at),
+                ],
+            )
+
+    def remove(self, kind, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [self.rowid(kind, pk)])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            for kind, (model, title_field, body_field, offset) in KINDS.items():
+                people = 'sender_id, recipient_id' if kind == 'message' else 'NULL, NULL'
+                cursor.execute(
+                    f'INSERT INTO {self.table} (rowid, title, body, kind, object_id, chama_id, sender_id, recipient_id, created_at) '
+                    f'SELECT id * 4 + {offset}, {title_field}, {body_field}, %s, id, chama_id, {people}, created_at '
+                    f'FROM {model._meta.db_table}',
+                    [kind],
+                )
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')")
+            cursor.execute(f'SELECT COUNT(*) FROM {self.table}')
+            return cursor.fetchone()[0]
+
+    def match_expression(self, query):
+        # Quote every term so user input can't inject FTS5 syntax; prefix-match the last one
+        terms = [f'"{term}"' for term in search_terms(query)]
+        if not terms:
+            return None
+        terms[-1] += '*'
+        return ' '.join(terms)
+
+    def search(self, user_id, chama_ids, query, kinds=None, limit=MAX_RESULTS):
+        match = self.match_expression(query)
+        if match is None:
+            return []
+        kinds = [kind for kind in (kinds or KINDS) if kind in KINDS]
+        visible, params = [], [match]
+        chama_kinds = [kind for kind in kinds if kind in CHAMA_KINDS]
+        if chama_kinds and chama_ids:
+            visible.append(
+                f'(kind IN ({", ".join(["%s"] * len(chama_kinds))}) AND chama_id IN ({", ".join(["%s"] * len(chama_ids))}))'
+            )
+            params += chama_kinds + list(chama_ids)
+        if 'message' in kinds:
+            # Leave out messages the user hid by deleting the conversation
+            visible.append(
+                "(kind = 'message' AND (sender_id = %s OR recipient_id = %s) AND NOT EXISTS ("
+                f'SELECT 1 FROM {Message._meta.db_table} m JOIN {ThreadParticipant._meta.db_table} p '
+                'ON p.thread_id = m.thread_id AND p.user_id = %s '
+                'WHERE m.id = object_id AND p.cleared_at >= m.created_at))'
+            )
+            params += [user_id, user_id, user_id]
+        if not visible:
+            return []
+        sql = (
+            f'SELECT kind, object_id, chama_id, created_at, '
+            f"snippet({self.table}, 0, %s, %s, '…', 12), snippet({self.table}, 1, %s, %s, '…', 24), "
+            f'{self.rank_expression} AS rank '
+            f'FROM {self.table} WHERE {self.table} MATCH %s AND ({" OR ".join(visible)}) '
+            f'ORDER BY rank LIMIT %s'
+        )
+        params = [HIT_START, HIT_END, HIT_START, HIT_END] + params + [limit]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        return [
+            SearchHit(kind, object_id, chama_id, stored_datetime(created_at), highlight(title), highlight(body), rank)
+            for kind, object_id, chama_id, created_at, title, body, rank in rows
+        ]
+
+    def search_ids(self, kind, query, limit=1000):
+        match = self.match_expression(query)
+        if match is None:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT object_id FROM {self.table} WHERE {self.table} MATCH %s AND kind = %s '
+                f'ORDER BY {self.rank_expression} LIMIT %s',
+                [match, kind, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """icontains fallback for databases without a full-text backend; there is no index to maintain."""
+
+    def index(self, kind, obj):
+        pass
+
+    def remove(self, kind, pk):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def filter(self, kind, query):
+        model, title_field, body_field, _ = KINDS[kind]
+        condition = Q()
+        for term in search_terms(query):
+            condition &= Q(**{f'{title_field}__icontains': term}) | Q(**{f'{body_field}__icontains': term})
+        return model.objects.filter(condition)
+
+    def search(self, user_id, chama_ids, query, kinds=None, limit=MAX_RESULTS):
+        if not search_terms(query):
+            return []
+        hits = []
+        for kind in kinds or KINDS:
+            if kind not in KINDS:
+                continue
+            model, title_field, body_field, _ = KINDS[kind]
+            queryset = self.filter(kind, query)
+            if kind == 'message':
+                queryset = queryset.filter(Q(sender_id=user_id) | Q(recipient_id=user_id)).exclude(cleared_by(user_id))
+            else:
+                queryset = queryset.filter(chama_id__in=chama_ids)
+            for obj in queryset.order_by('-created_at')[:limit]:
+                hits.append(SearchHit(
+                    kind, obj.pk, obj.chama_id, obj.created_at,
+                    escape(getattr(obj, title_field)), escape(getattr(obj, body_field)[:200]), 0,
+                ))
+        hits.sort(key=lambda hit: hit.created_at, reverse=True)
+        return hits[:limit]
+
+    def search_ids(self, kind, query, limit=1000):
+        return list(self.filter(kind, query).values_list('pk', flat=True)[:limit])
+
+
+def get_search_backend():
+    path = getattr(settings, 'SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTSBackend()
+    return DatabaseSearchBackend()
@@ -0,0 +1,161 @@
+from django.db import transaction as db_transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .cache import bump_version_on_commit, invalidate_object_on_commit
+from .dashboard import GLOBAL_SCOPE
+from .events import publish_announcement, publish_message
+from .models import (
+    Chama, Membership, Contribution, Transaction, Announcement, Message, MessageThread, UserProfile, ChamaBalance,
+    ContributionRollup,
+)
+from .permissions import invalidate_membership_map_on_commit
+from .search import KINDS as SEARCH_KINDS, get_search_backend
+from .unread import adjust_unread_count
+
+
+@receiver(post_save, sender=Chama)
+@receiver(post_save, sender=Membership)
+def open_balance(sender, instance, created, **kwargs):
+    # The ledger is only ever updated in place, so every chama and member starts with a zero row
+    if not created:
+        return
+    if sender is Chama:
+        ChamaBalance.objects.open(instance.pk)
+    else:
+        ChamaBalance.objects.open(instance.chama_id, instance.pk)
+
+
+# Ledger and rollups: every write to Contribution or Transaction moves the
+# stored totals by the difference. Bulk writes skip signals and rebuild instead.
+@receiver(pre_save, sender=Contribution)
+@receiver(pre_save, sender=Transaction)
+def remember_stored_amounts(sender, instance, **kwargs):
+    instance._stored = None
+    if instance.pk is not None and not instance._state.adding:
+        instance._stored = sender.objects.select_related(
+            *(['membership'] if sender is Contribution else [])
+        ).filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=Contribution)
+def contribution_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_stored', None)
+    if previous is not None:
+        if (previous.membership_id, previous.date, previous.amount) == (instance.membership_id, instance.date, instance.amount):
+            return
+        ChamaBalance.objects.record_contribution(previous, sign=-1)
+    ChamaBalance.objects.record_contribution(instance)
+    ContributionRollup.objects.record_change(previous, instance)
+
+
+@receiver(post_delete, sender=Contribution)
+def contribution_deleted(sender, instance, origin=None, **kwargs):
+    # A cascade from a membership (or its chama or user) is handled in membership_deleting
+    if not (isinstance(origin, Contribution) or getattr(origin, 'model', None) is Contribution):
+        return
+    ChamaBalance.objects.record_contribution(instance, sign=-1)
+    ContributionRollup.objects.record_contribution(instance, sign=-1)
+
+
+@receiver(pre_delete, sender=Membership)
+def membership_deleting(sender, instance, **kwargs):
+    # Runs before the cascade removes the contributions and the member's own rows
+    ChamaBalance.objects.remove_membership(instance)
+    ContributionRollup.objects.remove_membership(instance)
+
+
+@receiver(post_save, sender=Transaction)
+def transaction_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_stored', None)
+    if previous is not None:
+        if (previous.chama_id, previous.transaction_type, previous.amount) == (
+            instance.chama_id, instance.transaction_type, instance.amount
+        ):
+            return
+        ChamaBalance.objects.record_transaction(previous, sign=-1)
+    ChamaBalance.objects.record_transaction(instance)
+
+
+@receiver(post_delete, sender=Transaction)
+def transaction_deleted(sender, instance, **kwargs):
+    ChamaBalance.objects.record_transaction(instance, sign=-1)
+
+
+@receiver([post_save, post_delete], sender=Membership)
+def membership_changed(sender, instance, **kwargs):
+    invalidate_membership_map_on_commit(instance.user_id)
+    invalidate_object_on_commit(Membership, instance.pk)
+    bump_version_on_commit('chama', instance.chama_id)
+    bump_version_on_commit('user', instance.user_id)
+    bump_version_on_commit(GLOBAL_SCOPE, 0)
+
+
+@receiver([post_save, post_delete], sender=Chama)
+def chama_changed(sender, instance, **kwargs):
+    invalidate_object_on_commit(Chama, instance.pk)
+    bump_version_on_commit('chama', instance.pk)
+    bump_version_on_commit(GLOBAL_SCOPE, 0)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def profile_changed(sender, instance, **kwargs):
+    invalidate_object_on_commit(UserProfile, instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Contribution)
+def contribution_changed(sender, instance, **kwargs):
+    bump_version_on_commit('chama', instance.membership.chama_id)
+    previous = getattr(instance, '_stored', None)
+    if previous is not None and previous.membership.chama_id != instance.membership.chama_id:
+        # Moved to a membership in another chama: the old chama's totals changed too
+        bump_version_on_commit('chama', previous.membership.chama_id)
+    bump_version_on_commit(GLOBAL_SCOPE, 0)
+
+
+@receiver([post_save, post_delete], sender=Transaction)
+@receiver([post_save, post_delete], sender=Announcement)
+def chama_activity_changed(sender, instance, **kwargs):
+    bump_version_on_commit('chama', instance.chama_id)
+    previous = getattr(instance, '_stored', None)
+    if previous is not None and previous.chama_id != instance.chama_id:
+        bump_version_on_commit('chama', previous.chama_id)
+
+
+@receiver(post_delete, sender=Message)
+def message_deleted(sender, instance, **kwargs):
+    if not instance.is_read:
+        adjust_unread_count(instance.recipient_id, -1)
+    if instance.thread_id:
+        MessageThread.objects.refresh([instance.thread_id])
+
+
+@receiver(post_save, sender=Message)
+def message_created(sender, instance, created, **kwargs):
+    if created:
+        MessageThread.objects.record_message(instance)
+        db_transaction.on_commit(lambda: publish_message(instance))
+
+
+@receiver(post_save, sender=Announcement)
+def announcement_created(sender, instance, created, **kwargs):
+    if created:
+        db_transaction.on_commit(lambda: publish_announcement(instance))
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_save, sender=Announcement)
+@receiver(post_save, sender=Message)
+def searchable_saved(sender, instance, update_fields=None, **kwargs):
+    kind = sender._meta.model_name
+    if update_fields and not set(update_fields) & set(SEARCH_KINDS[kind][1:3]):
+        return
+    # Same connection and transaction as the write, so a rollback undoes both
+    get_search_backend().index(kind, instance)
+
+
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=Announcement)
+@receiver(post_delete, sender=Message)
+def searchable_deleted(sender, instance, **kwargs):
+    get_search_backend().remove(sender._meta.model_name, instance.pk)
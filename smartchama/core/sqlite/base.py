@@ -0,0 +1,40 @@
+"""
+SQLite backend with connection-level tuning, selected with
+ENGINE = 'core.sqlite'. Two extra OPTIONS are understood:
+
+``pragmas``
+    {name: value} applied to every new connection (journal_mode, synchronous,
+    busy_timeout, mmap_size, cache_size, ...).
+``transaction_mode``
+    'DEFERRED' (SQLite's default) or 'IMMEDIATE'. Immediate transactions take
+    the write lock at BEGIN, so a transaction that reads before it writes
+    waits on busy_timeout instead of failing with "database is locked" when
+    another writer got there first.
+"""
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+def apply_pragmas(conn, pragmas):
+    for name, value in pragmas.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        kwargs.pop('pragmas', None)
+        kwargs.pop('transaction_mode', None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        apply_pragmas(conn, self.settings_dict['OPTIONS'].get('pragmas', {}))
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode', 'DEFERRED').upper()
+        if mode not in TRANSACTION_MODES:
+            mode = 'DEFERRED'
+        self.cursor().execute(f'BEGIN {mode}')
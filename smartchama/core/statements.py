@@ -0,0 +1,176 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Sum
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .arrears import compute_arrears
+from .models import Contribution, StatementRun, Transaction
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+except ImportError:  # PDF output is optional; statements fall back to HTML
+    canvas = None
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_EVERY = 50
+
+
+def statement_format():
+    return 'pdf' if canvas is not None else 'html'
+
+
+def worker_count():
+    return getattr(settings, 'STATEMENT_WORKERS', os.cpu_count() or 1)
+
+
+def output_dir(run):
+    return os.path.join('statements', f'chama_{run.chama_id}', f'run_{run.pk}')
+
+
+def statement_filename(membership_id, username, fmt=None):
+    return f'{membership_id}-{slugify(username) or "member"}.{fmt or statement_format()}'
+
+
+def collect_statement_data(chama, start, end):
+    """
+    Everything needed to render every member's statement, fetched with three
+    queries: balances/arrears per member, contributions in the period and the
+    dividends paid out in the period.
+    """
+    members = compute_arrears([chama.pk], as_of=end)
+    contributions = {}
+    for row in Contribution.objects.filter(
+        membership__chama=chama, date__gte=start, date__lte=end
+    ).order_by('membership_id', 'date', 'id').values('membership_id', 'date', 'amount', 'reference'):
+        contributions.setdefault(row['membership_id'], []).append(row)
+    dividends = Transaction.objects.filter(
+        chama=chama, transaction_type='dividend', date__gte=start, date__lte=end
+    ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+
+    chama_paid = sum((member['paid'] for member in members), Decimal('0.00'))
+    statements = []
+    for member in members:
+        rows = contributions.get(member['membership_id'], [])
+        period_total = sum((row['amount'] for row in rows), Decimal('0.00'))
+        # Dividends are shared in proportion to what each member has paid in
+        share = (dividends * member['paid'] / chama_paid).quantize(Decimal('0.01')) if chama_paid else Decimal('0.00')
+        statements.append({
+            'chama': chama.name,
+            'membership_id': member['membership_id'],
+            'username': member['username'],
+            'role': member['role_display'],
+            'period_start': start,
+            'period_end': end,
+            'opening_paid': member['paid'] - period_total,
+            'contributions': rows,
+            'period_total': period_total,
+            'closing_paid': member['paid'],
+            'dividend_share': share,
+            'expected': member['expected'],
+            'arrears': member['arrears'],
+            'credit': member['credit'],
+        })
+    return statements
+
+
+def write_pdf(statement, path):
+    pdf = canvas.Canvas(path, pagesize=A4)
+    _, height = A4
+    y = height - 60
+
+    def line(text, size=10, gap=16):
+        nonlocal y
+        if y < 60:
+            pdf.showPage()
+            y = height - 60
+        pdf.setFont('Helvetica', size)
+        pdf.drawString(50, y, text)
+        y -= gap
+
+    line(f'{statement["chama"]} - Member Statement', size=14, gap=24)
+    line(f'{statement["username"]} ({statement["role"]})')
+    line(f'Period: {statement["period_start"]:%d %b %Y} to {statement["period_end"]:%d %b %Y}', gap=24)
+    line(f'Opening contributions: KSh {statement["opening_paid"]:,.2f}')
+    for row in statement['contributions']:
+        line(f'  {row["date"]:%d %b %Y}   KSh {row["amount"]:,.2f}   {row["reference"]}')
+    line(f'Contributions this period: KSh {statement["period_total"]:,.2f}')
+    line(f'Closing contributions: KSh {statement["closing_paid"]:,.2f}')
+    line(f'Share of dividends: KSh {statement["dividend_share"]:,.2f}')
+    line(f'Expected to date: KSh {statement["expected"]:,.2f}')
+    line(f'Arrears: KSh {statement["arrears"]:,.2f}')
+    pdf.save()
+
+
+def render_statement(job):
+    """Render one statement to ``path``; runs inside a pool worker."""
+    statement, path, fmt = job
+    if fmt == 'pdf':
+        write_pdf(statement, path)
+    else:
+        with open(path, 'w', encoding='utf-8') as fileobj:
+            fileobj.write(render_to_string('core/statement.html', {'statement': statement}))
+    return statement['membership_id']
+
+
+def init_worker():
+    # Workers started with spawn/forkserver need their own app registry
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def generate_statements(run, workers=None):
+    """Fetch the data for ``run`` up front, then render statements across a process pool."""
+    workers = worker_count() if workers is None else workers
+    StatementRun.objects.filter(pk=run.pk).update(status='running', started_at=timezone.now(), error='')
+    try:
+        statements = collect_statement_data(run.chama, run.period_start, run.period_end)
+        relative_dir = output_dir(run)
+        absolute_dir = os.path.join(settings.MEDIA_ROOT, relative_dir)
+        os.makedirs(absolute_dir, exist_ok=True)
+        fmt = statement_format()
+        jobs = [
+            (statement, os.path.join(absolute_dir, statement_filename(statement['membership_id'], statement['username'], fmt)), fmt)
+            for statement in statements
+        ]
+        StatementRun.objects.filter(pk=run.pk).update(total=len(jobs), output_dir=relative_dir, output_format=fmt)
+
+        rendered = 0
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+                chunksize = max(1, len(jobs) // (workers * 4))
+                for _ in pool.map(render_statement, jobs, chunksize=chunksize):
+                    rendered += 1
+                    if rendered % PROGRESS_EVERY == 0:
+                        StatementRun.objects.filter(pk=run.pk).update(rendered=rendered)
+        else:
+            for job in jobs:
+                render_statement(job)
+                rendered += 1
+    except Exception as exc:
+        logger.exception('Statement run %s failed', run.pk)
+        StatementRun.objects.filter(pk=run.pk).update(status='failed', error=str(exc), finished_at=timezone.now())
+        raise
+    StatementRun.objects.filter(pk=run.pk).update(status='done', rendered=rendered, finished_at=timezone.now())
+    run.refresh_from_db(fields=[
+        'status', 'total', 'rendered', 'output_dir', 'output_format', 'error', 'started_at', 'finished_at',
+    ])
+    return run
+
+
+def statement_path(run, membership_id, username):
+    if not run.output_dir:
+        return None
+    # The format the run was rendered in, not whatever statement_format() says today
+    filename = statement_filename(membership_id, username, run.output_format or None)
+    path = os.path.join(settings.MEDIA_ROOT, run.output_dir, filename)
+    return path if os.path.exists(path) else None
@@ -0,0 +1,41 @@
+// Live updates from the /events/ server-sent events stream
+(function () {
+    var nav = document.querySelector('[data-events-url]');
+    if (!nav || !window.EventSource) {
+        return;
+    }
+    var source = new EventSource(nav.getAttribute('data-events-url'));
+
+    function notify(text, href) {
+        var container = document.querySelector('.messages-container');
+        if (!container) {
+            container = document.createElement('div');
+            container.className = 'messages-container';
+            document.querySelector('.main-content').prepend(container);
+        }
+        var alert = document.createElement('a');
+        alert.className = 'alert alert-info';
+        alert.href = href;
+        alert.textContent = text;
+        container.appendChild(alert);
+    }
+
+    source.addEventListener('message', function (e) {
+        var data = JSON.parse(e.data);
+        var link = document.querySelector('[data-unread-link]');
+        var badge = link.querySelector('.badge');
+        if (!badge) {
+            badge = document.createElement('span');
+            badge.className = 'badge';
+            badge.textContent = '0';
+            link.appendChild(badge);
+        }
+        badge.textContent = parseInt(badge.textContent, 10) + 1;
+        notify('New message from ' + data.sender + ': ' + data.subject, data.url);
+    });
+
+    source.addEventListener('announcement', function (e) {
+        var data = JSON.parse(e.data);
+        notify('New announcement: ' + data.title, data.url);
+    });
+})();
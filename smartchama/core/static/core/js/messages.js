@@ -0,0 +1,76 @@
+// Inbox bulk actions without a page reload; the forms still work without JavaScript
+(function () {
+    var forms = document.querySelectorAll('[data-bulk-form]');
+    if (!forms.length || !window.fetch) {
+        return;
+    }
+
+    function setUnread(count) {
+        var link = document.querySelector('[data-unread-link]');
+        var badge = link && link.querySelector('.badge');
+        if (badge && count) {
+            badge.textContent = count;
+        } else if (badge) {
+            badge.remove();
+        }
+        var alert = document.querySelector('[data-unread-alert]');
+        if (alert && !count) {
+            alert.remove();
+        }
+    }
+
+    function markRead(item) {
+        item.classList.remove('unread');
+        var badge = item.querySelector('.badge');
+        if (badge) {
+            badge.remove();
+        }
+    }
+
+    function apply(action, form) {
+        if (action === 'mark_all_read') {
+            document.querySelectorAll('[data-thread]').forEach(markRead);
+            return;
+        }
+        form.querySelectorAll('input[name="threads"]:checked').forEach(function (box) {
+            var item = box.closest('[data-thread]');
+            if (action === 'mark_read') {
+                markRead(item);
+                box.checked = false;
+            } else {
+                item.remove();
+            }
+        });
+    }
+
+    forms.forEach(function (form) {
+        form.addEventListener('submit', function (e) {
+            e.preventDefault();
+            var data = new FormData(form);
+            var action = e.submitter && e.submitter.name === 'action' ? e.submitter.value : data.get('action');
+            data.set('action', action);
+            fetch(form.action, {
+                method: 'POST',
+                body: data,
+                headers: {'Accept': 'application/json'},
+                credentials: 'same-origin'
+            }).then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.statusText);
+                }
+                return response.json();
+            }).then(function (result) {
+                apply(result.action, form);
+                setUnread(result.unread_count);
+            }).catch(function () {
+                // Fall back to a normal post, which form.submit() sends without the clicked button
+                var input = document.createElement('input');
+                input.type = 'hidden';
+                input.name = 'action';
+                input.value = action;
+                form.appendChild(input);
+                form.submit();
+            });
+        });
+    });
+})();
@@ -0,0 +1,17 @@
+from .jobs import task
+from .models import StatementRun
+from .notifications import notify_announcement
+from .statements import generate_statements
+
+
+@task('statements.generate')
+def generate_statement_run(run_id):
+    run = StatementRun.objects.select_related('chama').get(pk=run_id)
+    if run.status == 'done':
+        return
+    generate_statements(run)
+
+
+@task('notifications.announcement')
+def notify_announcement_members(announcement_id):
+    notify_announcement(announcement_id)
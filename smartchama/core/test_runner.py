@@ -0,0 +1,15 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class StrictQueryBudgetRunner(DiscoverRunner):
+    """Run the suite with QUERY_BUDGET_STRICT on, so any view over its query budget fails its test."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._strict_budgets = override_settings(QUERY_BUDGET_STRICT=True)
+        self._strict_budgets.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._strict_budgets.disable()
+        super().teardown_test_environment(**kwargs)
@@ -1,3 +1,1598 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command, CommandError
+from django.db import connection, connections
+from django.db.models import Sum
+from django.template.backends.django import Template
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+
+from .models import (
+    UserProfile, Chama, Membership, Contribution,
+    Transaction, Announcement, Message, ChamaBalance, ContributionRollup,
+    ArrearsSnapshot, StatementRun, Job, Notification, MessageThread, ThreadParticipant
+)
+from . import profiling
+from .arrears import compute_arrears, periods_due
+from .importers import ContributionImporter
+from .statements import collect_statement_data
+from .jobs import Worker, claim_next, enqueue, requeue_stale, run_job, task
+from .benchmark import run_async_comparison, run_write_comparison
+from .db import PIN_COOKIE, REPLICA
+from .events import publish_message
+from .notifications import BaseBackend
+from .search import DatabaseSearchBackend, get_search_backend
+from .cache import ObjectCache, clear_local_object_caches, get_version, object_cache
+from .messaging import read_message
+from .unread import get_unread_count
+from .permissions import get_membership_map, membership_map_key
+
+
+class ChamaTestMixin:
+    def setUp(self):
+        cache.clear()
+        clear_local_object_caches()
+
+    def make_user(self, username, role='member'):
+        user = User.objects.create(username=username)
+        UserProfile.objects.create(user=user, role=role)
+        return user
+
+    def make_chama(self, owner, name='Chama', **kwargs):
+        chama = Chama.objects.create(name=name, created_by=owner, **kwargs)
+        membership = Membership.objects.create(chama=chama, user=owner, role='admin')
+        return chama, membership
+
+
+class ChamaStatsTests(ChamaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('alice')
+        self.client.force_login(self.user)
+
+    def add_chamas(self, count):
+        for i in range(count):
+            chama, membership = self.make_chama(self.user, name=f'Chama {i}')
+            Contribution.objects.create(membership=membership, amount=Decimal('100.00'), date=date(2024, 1, 1))
+            other = self.make_user(f'member-{chama.pk}')
+            Membership.objects.create(chama=chama, user=other)
+
+    def test_with_stats_annotations(self):
+        chama, membership = self.make_chama(self.user)
+        Contribution.objects.create(membership=membership, amount=Decimal('150.00'), date=date(2024, 1, 1))
+        Contribution.objects.create(membership=membership, amount=Decimal('50.50'), date=date(2024, 2, 1))
+        Membership.objects.create(chama=chama, user=self.make_user('bob'), is_active=False)
+        empty, _ = self.make_chama(self.user, name='Empty')
+
+        stats = {c.pk: c for c in Chama.objects.with_stats()}
+        self.assertEqual(stats[chama.pk].member_count, 1)
+        self.assertEqual(stats[chama.pk].total_contributions, Decimal('200.50'))
+        self.assertEqual(stats[empty.pk].total_contributions, Decimal('0.00'))
+
+    def count_queries(self, url):
+        get_unread_count(self.user.pk)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_list_pages_query_count_is_constant(self):
+        for name in ['chama_list', 'dashboard']:
+            self.add_chamas(2)
+            small = self.count_queries(reverse(name))
+            self.add_chamas(10)
+            large = self.count_queries(reverse(name))
+            self.assertEqual(small, large, name)
+
+
+class ChamaBalanceTests(ChamaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('alice')
+        self.chama, self.membership = self.make_chama(self.user)
+        self.client.force_login(self.user)
+
+    def test_views_update_ledger_incrementally(self):
+        self.client.post(reverse('contribution_add', args=[self.chama.pk]), {'amount': '500.00', 'date': '2024-01-05'})
+        self.client.post(reverse('contribution_add', args=[self.chama.pk]), {'amount': '250.00', 'date': '2024-02-05'})
+        self.client.post(reverse('transaction_add', args=[self.chama.pk]), {
+            'transaction_type': 'loan', 'amount': '300.00', 'date': '2024-02-10', 'purpose': 'Loan to member',
+        })
+
+        balance = ChamaBalance.objects.for_chama(self.chama)
+        self.assertEqual(balance.contributions_in, Decimal('750.00'))
+        self.assertEqual(balance.transactions_out, Decimal('300.00'))
+        self.assertEqual(balance.balance, Decimal('450.00'))
+        member = ChamaBalance.objects.get(membership=self.membership)
+        self.assertEqual(member.contributions_in, Decimal('750.00'))
+        self.assertEqual(ChamaBalance.objects.find_drift(), [])
+
+    def test_rows_open_with_chama_and_membership(self):
+        bob = self.make_user('bob')
+        membership = Membership.objects.create(chama=self.chama, user=bob)
+        self.assertTrue(ChamaBalance.objects.filter(chama=self.chama, membership__isnull=True).exists())
+        self.assertTrue(ChamaBalance.objects.filter(membership=membership).exists())
+
+        with CaptureQueriesContext(connection) as queries:
+            Contribution.objects.create(membership=membership, amount=Decimal('80.00'), date=date(2024, 1, 1))
+        ledger = [q['sql'].split()[0] for q in queries.captured_queries if 'core_chamabalance' in q['sql']]
+        self.assertEqual(ledger, ['UPDATE', 'UPDATE'])
+        self.assertEqual(ChamaBalance.objects.find_drift(), [])
+
+        with CaptureQueriesContext(connection) as queries:
+            ChamaBalance.objects.for_chama(self.chama)
+        self.assertEqual([q['sql'].split()[0] for q in queries.captured_queries], ['SELECT'])
+
+    def test_edits_and_deletes_move_the_ledger(self):
+        bob = self.make_user('bob')
+        bob_membership = Membership.objects.create(chama=self.chama, user=bob)
+        mine = Contribution.objects.create(membership=self.membership, amount=Decimal('100.00'), date=date(2024, 1, 5))
+        Contribution.objects.create(membership=bob_membership, amount=Decimal('100.00'), date=date(2024, 1, 6))
+        Contribution.objects.create(membership=bob_membership, amount=Decimal('30.00'), date=date(2024, 2, 6))
+        loan = Transaction.objects.create(chama=self.chama, transaction_type='loan', amount=Decimal('50.00'),
+                                          date=date(2024, 1, 7), purpose='Loan')
+
+        mine.amount, mine.date = Decimal('120.00'), date(2024, 3, 1)
+        mine.save()
+        loan.transaction_type = 'other'
+        loan.save()
+        bob_membership.delete()
+        balance = ChamaBalance.objects.for_chama(self.chama)
+        self.assertEqual((balance.contributions_in, balance.transactions_in, balance.transactions_out),
+                         (Decimal('120.00'), Decimal('50.00'), Decimal('0.00')))
+        self.assertEqual(ChamaBalance.objects.find_drift(), [])
+
+        loan.delete()
+        Contribution.objects.filter(pk=mine.pk).delete()
+        self.assertEqual(ChamaBalance.objects.for_chama(self.chama).balance, Decimal('0.00'))
+        self.assertEqual(ChamaBalance.objects.find_drift(), [])
+        self.assertFalse(ContributionRollup.objects.exclude(total=0, count=0).exists())
+
+    def test_moves_between_chamas_update_both_ledgers(self):
+        other, other_membership = self.make_chama(self.user)
+        loan = Transaction.objects.create(chama=self.chama, transaction_type='loan', amount=Decimal('50.00'),
+                                          date=date(2024, 1, 7), purpose='Loan')
+        contribution = Contribution.objects.create(membership=self.membership, amount=Decimal('100.00'),
+                                                   date=date(2024, 1, 5))
+        versions = (get_version('chama', self.chama.pk), get_version('chama', other.pk))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            loan.chama = other
+            loan.save()
+            contribution.membership = other_membership
+            contribution.save()
+        self.assertEqual(ChamaBalance.objects.for_chama(self.chama).balance, Decimal('0.00'))
+        other_balance = ChamaBalance.objects.for_chama(other)
+        self.assertEqual((other_balance.contributions_in, other_balance.transactions_out),
+                         (Decimal('100.00'), Decimal('50.00')))
+        self.assertEqual(ChamaBalance.objects.find_drift(), [])
+        self.assertGreater(get_version('chama', self.chama.pk), versions[0])
+        self.assertGreater(get_version('chama', other.pk), versions[1])
+
+    def test_rebuild_command_detects_and_fixes_drift(self):
+        ChamaBalance.objects.rebuild()
+        # bulk_create skips the signals that keep the ledger current
+        Contribution.objects.bulk_create([
+            Contribution(membership=self.membership, amount=Decimal('100.00'), date=date(2024, 1, 1)),
+        ])
+        Transaction.objects.bulk_create([
+            Transaction(chama=self.chama, transaction_type='dividend', amount=Decimal('40.00'),
+                        date=date(2024, 1, 2), purpose='Payout'),
+        ])
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_balances', '--check', stdout=StringIO())
+        call_command('rebuild_balances', stdout=StringIO())
+        call_command('rebuild_balances', '--check', stdout=StringIO())
+        self.assertEqual(ChamaBalance.objects.for_chama(self.chama).balance, Decimal('60.00'))
+
+
+class KeysetPaginationTests(ChamaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('alice')
+        self.chama, self.membership = self.make_chama(self.user)
+        self.client.force_login(self.user)
+        # Several rows share a date so the created_at/id tiebreakers matter
+        for i in range(7):
+            Contribution.objects.create(membership=self.membership, amount=Decimal(i + 1), date=date(2024, 1, 1 + i // 3))
+
+    def test_pages_cover_every_row_once(self):
+        url = reverse('contribution_list', args=[self.chama.pk])
+        seen = []
+        next_url = f'{url}?page_size=3'
+        while next_url:
+            response = self.client.get(next_url if next_url.startswith('/') else url + next_url)
+            page = response.context['contributions']
+            self.assertLessEqual(len(page), 3)
+            seen.extend(c.pk for c in page)
+            next_url = page.next_url
+        expected = list(Contribution.objects.order_by('-date', '-created_at', '-id').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        url = reverse('contribution_list', args=[self.chama.pk])
+        response = self.client.get(url, {'cursor': 'not-a-cursor', 'page_size': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['contributions']), 3)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite specific')
+class IndexCoverageTests(ChamaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('alice')
+        self.chama, self.membership = self.make_chama(self.user)
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, plan)
+
+    def test_list_views_are_covered_by_indexes(self):
+        from .views import CONTRIBUTION_ORDERING, TRANSACTION_ORDERING, ANNOUNCEMENT_ORDERING
+        from .messaging import INBOX_ORDERING, THREAD_ORDERING, inbox, thread_messages
+        cases = [
+            (Contribution.objects.filter(membership=self.membership).order_by(*CONTRIBUTION_ORDERING),
+             'contribution_member_date_idx'),
+            (Transaction.objects.filter(chama=self.chama).order_by(*TRANSACTION_ORDERING),
+             'transaction_chama_date_idx'),
+            (Announcement.objects.filter(chama=self.chama).order_by(*ANNOUNCEMENT_ORDERING),
+             'announcement_chama_recent_idx'),
+            (Announcement.objects.filter(chama=self.chama), 'announcement_chama_idx'),
+            (Message.objects.filter(recipient=self.user).order_by(*THREAD_ORDERING), 'message_recipient_idx'),
+            (Message.objects.filter(sender=self.user).order_by(*THREAD_ORDERING), 'message_sender_idx'),
+            (inbox(self.user).order_by(*INBOX_ORDERING), 'thread_inbox_idx'),
+            (thread_messages(1).order_by(*THREAD_ORDERING), 'message_thread_idx'),
+            (Message.objects.filter(recipient=self.user, is_read=False).order_by(), 'message_unread_idx'),
+            (Membership.objects.filter(user=self.user, is_active=True).order_by(), 'membership_user_active_idx'),
+            (Membership.objects.filter(chama=self.chama, is_active=True).order_by(), 'membership_chama_active_idx'),
+        ]
+        for queryset, index_name in cases:
+            with self.subTest(index=index_name):
+                self.assertUsesIndex(queryset, index_name)
+
+
+class ChamaMemberRequiredTests(ChamaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = self.make_user('alice')
+        self.chama, self.membership = self.make_chama(self.owner)
+        self.member = self.make_user('bob')
+        Membership.objects.create(chama=self.chama, user=self.member)
+
+    def test_non_member_is_redirected_and_missing_chama_is_404(self):
+        self.client.force_login(self.make_user('carol'))
+        response = self.client.get(reverse('chama_detail', args=[self.chama.pk]))
+        self.assertRedirects(response, reverse('chama_list'))
+        response = self.client.get(reverse('chama_detail', args=[self.chama.pk + 100]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_role_check_uses_cached_map(self):
+        self.client.force_login(self.member)
+        self.client.get(reverse('chama_detail', args=[self.chama.pk]))
+        with self.assertNumQueries(2):  # session + user
+            response = self.client.get(reverse('chama_edit', args=[self.chama.pk]))
+        self.assertRedirects(response, reverse('chama_detail', args=[self.chama.pk]), fetch_redirect_response=False)
+
+    def test_membership_change_invalidates_map(self):
+        self.client.force_login(self.member)
+        self.client.get(reverse('chama_edit', args=[self.chama.pk]))
+        Membership.objects.filter(user=self.member).update(role='chairperson')
+        Membership.objects.get(user=self.member).save()
+        response = self.client.get(reverse('chama_edit', args=[self.chama.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['chama'], self.chama)
+
+    def test_map_is_invalidated_again_on_commit(self):
+        membership = Membership.objects.get(user=self.member)
+        with self.captureOnCommitCallbacks() as callbacks:
+            membership.is_active = False
+            membership.save()
+            # A concurrent request caches the roles it read before the commit
+            cache.set(membership_map_key(self.member.pk), {self.chama.pk: 'member'})
+        for callback in callbacks:
+            callback()
+        self.assertEqual(get_membership_map(self.member), {})
+
+    def test_removal_in_another_process_is_not_served_from_the_local_cache(self):
+        clear_local_object_caches()  # forget the rows setUp wrote, as if committed
+        self.client.force_login(self.member)
+        self.assertEqual(self.client.get(reverse('chama_detail', args=[self.chama.pk])).status_code, 200)
+        # What a commit in another process leaves behind: new row, shared
+        # caches invalidated, this process's LRU untouched
+        membership = Membership.objects.get(user=self.member)
+        Membership.objects.filter(pk=membership.pk).update(is_active=False)
+        object_cache(Membership).invalidate(membership.pk)
+        object_cache(Membership).local.set(membership.pk, tuple(
+            getattr(membership, name) for name in object_cache(Membership).field_names
+        ))
+        cache.delete(membership_map_key(self.member.pk))
+        response = self.client.get(reverse('chama_detail', args=[self.chama.pk]))
+        self.assertRedirects(response, reverse('chama_list'))
+
+
+class ContributionImportTests(ChamaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('alice')
+        self.chama, self.membership = self.make_chama(self.user)
+        self.bob = self.make_user('bob')
+        self.bob.profile.phone_number = '0712 345 678'
+        self.bob.profile.save()
+        self.bob_membership = Membership.objects.create(chama=self.chama, user=self.bob)
+
+    def write_csv(self, rows):
+        path = os.path.join(self.tmpdir, 'statement.csv')
+        with open(path, 'w', newline='') as fileobj:
+            fileobj.write('phone_number,username,amount,date,reference,notes\n')
+            fileobj.writelines(f'{row}\n' for row in rows)
+        return path
+
+    def test_import_matches_members_and_skips_duplicates_on_rerun(self):
+        with tempfile.TemporaryDirectory() as self.tmpdir:
+            path = self.write_csv([
+                '254712345678,,1000,2024-03-01,QXR12345,March',
+                ',alice,500.50,01/03/2024,,',
+                ',nobody,100,2024-03-01,,',
+                ',alice,abc,2024-03-01,,',
+            ])
+            out, err = StringIO(), StringIO()
+            call_command('import_contributions', self.chama.pk, path, '--batch-size', '2', stdout=out, stderr=err)
+            self.assertIn('2 created', out.getvalue())
+            self.assertIn('line 4: no active member', err.getvalue())
+            self.assertIn('line 5: invalid amount', err.getvalue())
+
+            err = StringIO()
+            call_command('import_contributions', self.chama.pk, path, stdout=out, stderr=err)
+            self.assertIn('0 created, 2 skipped', out.getvalue())
+            self.assertNotIn('possible duplicate', err.getvalue())
+
+        self.assertEqual(Contribution.objects.get(reference='QXR12345').membership, self.bob_membership)
+        self.assertEqual(ChamaBalance.objects.for_chama(self.chama).contributions_in, Decimal('1500.50'))
+
+    def test_identical_unreferenced_payments_are_all_imported(self):
+        rows = iter([{'username': 'bob', 'amount': '200', 'date': '2024-03-01'}] * 2)
+        report = ContributionImporter(self.chama).run(rows)
+        self.assertEqual((report.created, report.skipped), (2, 0))
+        self.assertEqual(report.warnings, [(3, 'possible duplicate: same member, date and amount without a reference')])
+        self.assertEqual(self.bob_membership.get_total_contributions(), Decimal('400.00'))
+
+        # A rerun skips both, also across batches; a third payment in a longer file is new
+        report = ContributionImporter(self.chama, batch_size=1).run(iter([{'username': 'bob', 'amount': '200', 'date': '2024-03-01'}] * 2))
+        self.assertEqual((report.created, report.skipped), (0, 2))
+        report = ContributionImporter(self.chama).run(iter([{'username': 'bob', 'amount': '200', 'date': '2024-03-01'}] * 3))
+        self.assertEqual((report.created, report.skipped), (1, 2))
+        self.assertEqual(self.bob_membership.get_total_contributions(), Decimal('600.00'))
+
+        # Rows from earlier batches of the same run do not count as stored
+        report = ContributionImporter(self.chama, batch_size=1).run(iter([{'username': 'bob', 'amount': '50', 'date': '2024-03-02'}] * 2))
+        self.assertEqual((report.created, report.skipped), (2, 0))
+
+    def test_rows_are_never_credited_to_the_wrong_member(self):
+        carol = self.make_user('carol')
+        carol.profile.phone_number = 'N/A'
+        carol.profile.save()
+        Membership.objects.create(chama=self.chama, user=carol)
+        Membership.objects.create(chama=self.chama, user=self.make_user('Bob'))
+        report = ContributionImporter(self.chama).run(iter([
+            {'username': 'nobody', 'amount': '10', 'date': '2024-03-01'},
+            {'phone_number': 'none', 'amount': '10', 'date': '2024-03-01'},
+            {'username': 'BOB', 'amount': '10', 'date': '2024-03-01'},
+            {'username': 'Bob', 'amount': '20', 'date': '2024-03-01'},
+            {'member': 'ALICE', 'amount': '30', 'date': '2024-03-01'},
+        ]))
+        self.assertEqual(report.errors, [
+            (2, 'no active member matches this row'),
+            (3, 'no active member matches this row'),
+            (4, "username 'BOB' matches more than one active member"),
+        ])
+        self.assertEqual(report.created, 2)
+        self.assertFalse(Contribution.objects.filter(membership__user=carol).exists())
+        self.assertEqual(self.membership.get_total_contributions(), Decimal('30.00'))
+
+    def test_bad_uploads_are_reported_not_raised(self):
+        self.client.force_login(self.user)
+        url = reverse('contribution_import', args=[self.chama.pk])
+        # A latin-1 export, as many banks produce
+        upload = SimpleUploadedFile('statement.csv', 'username,amount,date,notes\nbob,250,2024-04-01,Caf\xe9\n'.encode('latin-1'))
+        response = self.client.post(url, {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'not UTF-8 encoded')
+        self.assertFalse(Contribution.objects.exists())
+
+        upload = SimpleUploadedFile('statement.csv', b'username,amount,date\nbob,250,2024-04-01,extra\nbob,300,2024-04-02\n')
+        report = self.client.post(url, {'file': upload}).context['report']
+        self.assertEqual(report.created, 1)
+        self.assertEqual(report.errors, [(2, '1 more field(s) than the header')])
+
+        upload = SimpleUploadedFile('statement.csv', b'username,amount,date\nbob,NaN,2024-04-03\nbob,123456789012,2024-04-03\nbob,75,2024-04-03\n')
+        report = self.client.post(url, {'file': upload}).context['report']
+        self.assertEqual(report.created, 1)
+        self.assertEqual(report.errors, [(2, "invalid amount 'NaN'"), (3, 'amount 123456789012.00 is too large')])
+
+        upload = SimpleUploadedFile('statement.xlsx', b'not a workbook')
+        response = self.client.post(url, {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Contribution.objects.count(), 2)
+
+    def test_import_view_requires_treasury_role(self):
+        self.client.force_login(self.bob)
+        response = self.client.get(reverse('contribution_import', args=[self.chama.pk]))
+        self.assertRedirects(response, reverse('chama_detail', args=[self.chama.pk]), fetch_redirect_response=False)
+
+        self.client.force_login(self.user)
+        upload = SimpleUploadedFile('statement.csv', b'username,amount,date\nbob,250,2024-04-01\n')
+        response = self.client.post(reverse('contribution_import', args=[self.chama.pk]), {'file': upload})
+        self.assertEqual(response.context['report'].created, 1)
+
+
+class LedgerExportTests(ChamaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('alice')
+        self.chama, self.membership = self.make_chama(self.user)
+        self.client.force_login(self.user)
+        for day in (1, 15, 28):
+            Contribution.objects.create(membership=self.membership, amount=Decimal('100.00'), date=date(2024, 2, day))
+        Transaction.objects.create(chama=self.chama, transaction_type='loan', amount=Decimal('50.00'),
+                                   date=date(2024, 2, 2), purpose='Loan')
+        Transaction.objects.create(chama=self.chama, transaction_type='expense', amount=Decimal('20.00'),
+                                   date=date(2024, 2, 3), purpose='Stationery')
+
+    def read_csv(self, response):
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        return list(csv.reader(StringIO(content)))
+
+    def test_contribution_export_filters_by_date(self):
+        url = reverse('contribution_export', args=[self.chama.pk])
+        rows = self.read_csv(self.client.get(url, {'date_from': '2024-02-10'}))
+        self.assertEqual(rows[0][:3], ['Date', 'Chama', 'Member'])
+        self.assertEqual([row[0] for row in rows[1:]], ['2024-02-15', '2024-02-28'])
+
+    def test_transaction_export_filters_by_type(self):
+        url = reverse('transaction_export', args=[self.chama.pk])
+        rows = self.read_csv(self.client.get(url, {'type': 'expense'}))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][4], 'Stationery')
+        self.assertEqual(self.client.get(url, {'date_from': 'nope'}).status_code, 400)
+
+    def test_formula_cells_are_escaped(self):
+        Transaction.objects.create(chama=self.chama, transaction_type='expense', amount=Decimal('5.00'),
+                                   date=date(2024, 2, 4), purpose='=HYPERLINK("http://x")', description='-2+3')
+        url = reverse('transaction_export', args=[self.chama.pk])
+        row = self.read_csv(self.client.get(url, {'type': 'expense'}))[-1]
+        self.assertEqual(row[4:6], ['\'=HYPERLINK("http://x")', "'-2+3"])
+        self.assertEqual(row[3], '5.00')
+
+    def test_export_command_writes_csv(self):
+        out = StringIO()
+        call_command('export_ledger', 'transactions', '--chama', str(self.chama.pk), '--type', 'loan', stdout=out)
+        self.assertEqual(out.getvalue().splitlines()[1].split(',')[2], 'loan')
+
+
+class DashboardCacheTests(ChamaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('alice', role='admin')
+        self.chama, self.membership = self.make_chama(self.user)
+        self.client.force_login(self.user)
+
+    def test_repeat_hits_are_served_from_cache(self):
+        self.client.get(reverse('dashboard'))
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('dashboard'))
+        # session, user and profile only
+        self.assertEqual(len(ctx.captured_queries), 3)
+
+    def test_writes_invalidate_user_and_global_stats(self):
+        self.client.get(reverse('dashboard'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('contribution_add', args=[self.chama.pk]), {'amount': '75.00', 'date': '2024-05-01'})
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['total_contributions'], Decimal('75.00'))
+        self.assertEqual(response.context['total_chama_contributions'], Decimal('75.00'))
+        self.assertEqual(response.context['user_chamas'][0].total_contributions, Decimal('75.00'))
+
+
+
+class UnreadCounterTests(ChamaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = self.make_user('alice')
+        self.bob = self.make_user('bob')
+        self.chama, _ = self.make_chama(self.alice)
+        Membership.objects.create(chama=self.chama, user=self.bob)
+
+    def send(self, sender, recipient):
+        self.client.force_login(sender)
+        self.client.post(reverse('message_send'), {'recipient': recipient.pk, 'subject': 'Hi', 'content': 'Hello'})
+
+    def test_counter_follows_send_and_read_without_queries(self):
+        self.assertEqual(get_unread_count(self.alice.pk), 0)
+        self.send(self.bob, self.alice)
+        self.send(self.bob, self.alice)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_count(self.alice.pk), 2)
+
+        self.client.force_login(self.alice)
+        self.client.get(reverse('message_detail', args=[Message.objects.first().pk]))
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['unread_message_count'], 1)
+        self.assertEqual(response.context['unread_messages'], 1)
+
+    def test_reconcile_command_fixes_drift(self):
+        get_unread_count(self.alice.pk)
+        Message.objects.create(sender=self.bob, recipient=self.alice, subject='Hi', content='Direct insert')
+        out = StringIO()
+        call_command('reconcile_unread_counts', stdout=out)
+        self.assertIn(f'user {self.alice.pk}: cached=0 actual=1', out.getvalue())
+        self.assertEqual(get_unread_count(self.alice.pk), 1)
+
+
+
+class MessageThreadTests(ChamaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = self.make_user('alice')
+        self.bob = self.make_user('bob')
+        self.carol = self.make_user('carol')
+        self.chama, _ = self.make_chama(self.alice)
+        Membership.objects.create(chama=self.chama, user=self.bob)
+        Membership.objects.create(chama=self.chama, user=self.carol)
+
+    def send(self, sender, recipient, content='Hello'):
+        self.client.force_login(sender)
+        self.client.post(reverse('message_send'), {'recipient': recipient.pk, 'subject': 'Hi', 'content': content})
+        return Message.objects.filter(sender=sender, recipient=recipient).order_by('-pk').first()
+
+    def test_messages_between_a_pair_share_one_thread(self):
+        first = self.send(self.bob, self.alice)
+        last = self.send(self.alice, self.bob, content='Hi back')
+        self.assertEqual(first.thread_id, last.thread_id)
+        thread = MessageThread.objects.get()
+        self.assertEqual((thread.message_count, thread.last_message_id), (2, last.pk))
+        unread = dict(ThreadParticipant.objects.values_list('user__username', 'unread_count'))
+        self.assertEqual(unread, {'alice': 1, 'bob': 1})
+
+    def test_inbox_queries_do_not_grow_or_load_bodies(self):
+        self.send(self.bob, self.alice)
+        self.client.force_login(self.alice)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(reverse('message_list'))
+        for i in range(5):
+            sender = self.make_user(f'sender{i}')
+            Membership.objects.create(chama=self.chama, user=sender)
+            self.send(sender, self.alice, content='x' * 2000)
+        self.client.force_login(self.alice)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(reverse('message_list'))
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(len(response.context['threads'].object_list), 6)
+        self.assertIn('content', response.context['threads'].object_list[0].thread.last_message.get_deferred_fields())
+        self.assertContains(response, 'x' * 119 + '…')
+
+    def test_opening_thread_marks_it_read(self):
+        self.send(self.bob, self.alice)
+        message = self.send(self.bob, self.alice)
+        self.assertEqual(get_unread_count(self.alice.pk), 2)
+        self.client.force_login(self.alice)
+        response = self.client.get(reverse('message_thread', args=[message.thread_id]))
+        self.assertEqual(len(response.context['thread_messages'].object_list), 2)
+        self.assertEqual(get_unread_count(self.alice.pk), 0)
+        self.assertFalse(Message.objects.filter(is_read=False).exists())
+        self.assertEqual(ThreadParticipant.objects.get(user=self.alice).unread_count, 0)
+
+    def test_outsider_cannot_open_thread(self):
+        message = self.send(self.bob, self.alice)
+        self.client.force_login(self.carol)
+        response = self.client.get(reverse('message_thread', args=[message.thread_id]))
+        self.assertRedirects(response, reverse('message_list'))
+
+    def test_rebuild_threads_bulk_created_messages(self):
+        Message.objects.bulk_create([
+            Message(sender=self.bob, recipient=self.alice, subject='Hi', content='One'),
+            Message(sender=self.alice, recipient=self.bob, subject='Hi', content='Two'),
+            Message(sender=self.carol, recipient=self.alice, subject='Hi', content='Three'),
+        ])
+        self.assertEqual(MessageThread.objects.rebuild(), 2)
+        self.assertFalse(Message.objects.filter(thread__isnull=True).exists())
+        self.assertEqual(ThreadParticipant.objects.get(user=self.alice, other=self.bob).unread_count, 1)
+        self.assertEqual(ThreadParticipant.objects.filter(user=self.alice).count(), 2)
+
+    def bulk(self, action, threads=(), **extra):
+        return self.client.post(reverse('message_bulk'), {'action': action, 'threads': list(threads)},
+                                HTTP_ACCEPT='application/json', **extra)
+
+    def test_mark_all_read_is_one_update_per_table(self):
+        for _ in range(3):
+            self.send(self.bob, self.alice)
+        self.send(self.carol, self.alice)
+        self.client.force_login(self.alice)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.bulk('mark_all_read')
+        self.assertEqual(response.json(), {'action': 'mark_all_read', 'updated': 4, 'unread_count': 0})
+        updates = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        self.assertFalse(Message.objects.filter(is_read=False).exists())
+        self.assertFalse(ThreadParticipant.objects.filter(unread_count__gt=0).exists())
+
+    def test_archive_and_delete_only_affect_the_acting_user(self):
+        thread_id = self.send(self.bob, self.alice).thread_id
+        self.client.force_login(self.alice)
+        self.assertEqual(self.bulk('archive', [thread_id]).json()['updated'], 1)
+        self.assertEqual(len(self.client.get(reverse('message_list')).context['threads'].object_list), 0)
+        archived = self.client.get(reverse('message_list'), {'archived': '1'}).context['threads']
+        self.assertEqual([row.thread_id for row in archived.object_list], [thread_id])
+
+        response = self.bulk('delete', [thread_id])
+        self.assertEqual(response.json()['unread_count'], 0)
+        self.assertEqual(Message.objects.count(), 1)
+        self.assertEqual(len(self.client.get(reverse('message_list'), {'archived': '1'}).context['threads'].object_list), 0)
+        self.client.force_login(self.bob)
+        self.assertEqual(len(self.client.get(reverse('message_list')).context['threads'].object_list), 1)
+
+        # A new message brings the conversation back with only the new message
+        self.send(self.bob, self.alice, content='Again')
+        self.client.force_login(self.alice)
+        self.assertEqual(len(self.client.get(reverse('message_list')).context['threads'].object_list), 1)
+        response = self.client.get(reverse('message_thread', args=[thread_id]))
+        self.assertEqual([m.content for m in response.context['thread_messages'].object_list], ['Again'])
+
+    def test_deleted_conversation_no_longer_opens_by_id(self):
+        message = self.send(self.bob, self.alice)
+        self.client.force_login(self.alice)
+        self.bulk('delete', [message.thread_id])
+        self.assertEqual(self.client.get(reverse('message_detail', args=[message.pk])).status_code, 404)
+        newer = self.send(self.bob, self.alice, content='Again')
+        self.assertEqual(self.client.get(reverse('message_detail', args=[message.pk])).status_code, 200)
+        self.client.force_login(self.alice)
+        self.assertEqual(self.client.get(reverse('message_detail', args=[newer.pk])).status_code, 200)
+
+    def test_bulk_rejects_unknown_action_and_other_users_threads(self):
+        thread_id = self.send(self.bob, self.alice).thread_id
+        self.client.force_login(self.carol)
+        self.assertEqual(self.bulk('explode').status_code, 400)
+        self.assertEqual(self.bulk('archive', [thread_id]).json()['updated'], 0)
+        self.assertEqual(self.client.get(reverse('message_bulk')).status_code, 405)
+
+    def test_bulk_without_javascript_redirects(self):
+        thread_id = self.send(self.bob, self.alice).thread_id
+        self.client.force_login(self.alice)
+        response = self.client.post(reverse('message_bulk'), {'action': 'mark_read', 'threads': [thread_id]})
+        self.assertRedirects(response, reverse('message_list'))
+        self.assertEqual(get_unread_count(self.alice.pk), 0)
+
+    def test_reading_a_message_twice_moves_counters_once(self):
+        message = self.send(self.bob, self.alice)
+        self.send(self.bob, self.alice)
+        stale = Message.objects.get(pk=message.pk)
+        self.client.force_login(self.alice)
+        self.client.get(reverse('message_detail', args=[message.pk]))
+        # A concurrent request that loaded the row before it was marked
+        self.assertFalse(read_message(stale))
+        self.assertEqual(get_unread_count(self.alice.pk), 1)
+        self.assertEqual(ThreadParticipant.objects.get(user=self.alice).unread_count, 1)
+
+
+class QueryBudgetTests(ChamaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        profiling.registry.reset()
+        self.user = self.make_user('alice', role='admin')
+        self.user.is_staff = True
+        self.user.save()
+        self.chama, self.membership = self.make_chama(self.user)
+        for i in range(8):
+            member = self.make_user(f'member{i}')
+            membership = Membership.objects.create(chama=self.chama, user=member)
+            Contribution.objects.create(membership=membership, amount=Decimal('10.00'), date=date(2024, 1, 1 + i))
+            Transaction.objects.create(chama=self.chama, transaction_type='expense', amount=Decimal('1.00'),
+                                       date=date(2024, 1, 1 + i), purpose='Fee', created_by=member)
+            Announcement.objects.create(chama=self.chama, title=f'News {i}', content='...', created_by=member)
+            Message.objects.create(sender=member, recipient=self.user, subject='Hi', content='...', chama=self.chama)
+        ChamaBalance.objects.rebuild()
+        self.client.force_login(self.user)
+
+    def test_views_stay_within_budget_when_cold(self):
+        message = Message.objects.first()
+        urls = [
+            reverse('dashboard'),
+            reverse('profile'),
+            reverse('chama_list'),
+            reverse('chama_detail', args=[self.chama.pk]),
+            reverse('contribution_list', args=[self.chama.pk]),
+            reverse('transaction_list', args=[self.chama.pk]),
+            reverse('announcement_list', args=[self.chama.pk]),
+            reverse('message_list'),
+            reverse('message_detail', args=[message.pk]),
+            reverse('message_thread', args=[message.thread_id]),
+        ]
+        for url in urls:
+            cache.clear()
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_suite_runs_in_strict_mode(self):
+        self.assertTrue(settings.QUERY_BUDGET_STRICT)
+
+    def test_budget_violation_raises_in_strict_mode(self):
+        with override_settings(QUERY_BUDGETS={'dashboard': 1}):
+            with self.assertRaises(profiling.QueryBudgetExceeded):
+                self.client.get(reverse('dashboard'))
+
+    def test_template_timer_only_installed_while_enabled(self):
+        self.client.get(reverse('chama_list'))
+        self.assertIs(Template.render, profiling._timed_render)
+        with override_settings(PROFILING_ENABLED=False):
+            self.client_class().get(reverse('home'))
+            self.assertIs(Template.render, profiling._original_render)
+        self.client_class().get(reverse('home'))
+        self.assertIs(Template.render, profiling._timed_render)
+
+    def test_metrics_endpoint_reports_views(self):
+        self.client.get(reverse('chama_list'))
+        snapshot = self.client.get(reverse('metrics'), {'format': 'json'}).json()
+        self.assertEqual(snapshot['chama_list']['queries']['count'], 1)
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('smartchama_request_queries_count{view="chama_list"} 1', text)
+
+
+class BenchmarkHarnessTests(TestCase):
+    def test_seed_and_benchmark_against_baseline(self):
+        call_command(
+            'seed_synthetic', '--users', '12', '--chamas', '3', '--members-per-chama', '4',
+            '--contributions', '60', '--transactions', '20', '--announcements', '6', '--messages', '30',
+            '--prefix', 'bench', stdout=StringIO(),
+        )
+        self.assertEqual(Membership.objects.count(), 12)
+        self.assertEqual(Contribution.objects.count(), 60)
+        self.assertEqual(ChamaBalance.objects.find_drift(), [])
+        self.assertEqual(
+            ContributionRollup.objects.filter(period='month', membership=None).aggregate(n=Sum('count'))['n'], 60
+        )
+        self.assertEqual(len(get_search_backend().search_ids('transaction', 'synthetic')), 20)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            baseline = os.path.join(tmpdir, 'baseline.json')
+            out = StringIO()
+            unread = Message.objects.filter(is_read=False).count()
+            call_command('benchmark', '--warmup', '1', '--repetitions', '2', '--output', baseline, stdout=out)
+            self.assertEqual(Message.objects.filter(is_read=False).count(), unread)
+            with open(baseline) as fileobj:
+                results = json.load(fileobj)
+            self.assertEqual(results['dashboard']['status'], 200)
+            self.assertIn('contribution_list', results)
+            self.assertIn('message_thread', results)
+            self.assertNotIn('user_logout', results)
+            self.assertNotIn('message_bulk', results)
+            self.assertEqual(results['message_detail']['status'], 200)
+            # Seeding renders no statements, so their routes are named as skipped
+            self.assertIn('statement_status, statement_download', out.getvalue())
+
+            for row in results.values():
+                row['queries'] -= 1
+            with open(baseline, 'w') as fileobj:
+                json.dump(results, fileobj)
+            with self.assertRaises(CommandError):
+                call_command('benchmark', '--warmup', '0', '--repetitions', '1', '--baseline', baseline,
+                             '--fail-on-regression', stdout=StringIO())
+
+
+class ContributionRollupTests(ChamaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('alice')
+        self.chama, self.membership = self.make_chama(self.user, contribution_frequency='Weekly')
+        self.client.force_login(self.user)
+
+    def rollups(self):
+        return sorted(ContributionRollup.objects.values_list(
+            'membership_id', 'period', 'period_start', 'total', 'count'
+        ), key=str)
+
+    def test_incremental_rollups_match_rebuild(self):
+        # A contribution recorded before any rollup existed is picked up when its bucket is seeded
+        Contribution.objects.create(membership=self.membership, amount=Decimal('40.00'), date=date(2024, 3, 4))
+        for amount, day in [('100.00', '2024-03-05'), ('50.00', '2024-03-07'), ('25.00', '2024-03-12')]:
+            self.client.post(reverse('contribution_add', args=[self.chama.pk]), {'amount': amount, 'date': day})
+
+        march = ContributionRollup.objects.get(membership=None, period='month', period_start=date(2024, 3, 1))
+        self.assertEqual((march.total, march.count), (Decimal('215.00'), 4))
+        week = ContributionRollup.objects.get(membership=self.membership, period='week', period_start=date(2024, 3, 4))
+        self.assertEqual((week.total, week.count), (Decimal('190.00'), 3))
+
+        incremental = self.rollups()
+        call_command('backfill_rollups', stdout=StringIO())
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_edits_and_member_removal_match_rebuild(self):
+        bob = Membership.objects.create(chama=self.chama, user=self.make_user('bob'))
+        mine = Contribution.objects.create(membership=self.membership, amount=Decimal('40.00'), date=date(2024, 3, 4))
+        Contribution.objects.create(membership=self.membership, amount=Decimal('10.00'), date=date(2024, 3, 5))
+        Contribution.objects.create(membership=bob, amount=Decimal('25.00'), date=date(2024, 3, 5))
+        ContributionRollup.objects.all().delete()
+        # Same buckets: the bucket seeded by the edit must not count it twice
+        mine.amount = Decimal('45.00')
+        mine.save()
+        mine.date = date(2024, 4, 2)
+        mine.save()
+        bob.delete()
+
+        incremental = [row for row in self.rollups() if row[4]]
+        call_command('backfill_rollups', stdout=StringIO())
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_report_reads_rollups(self):
+        today = timezone.localdate()
+        self.client.post(reverse('contribution_add', args=[self.chama.pk]), {'amount': '80.00', 'date': today.isoformat()})
+        response = self.client.get(reverse('chama_report_data', args=[self.chama.pk]), {'months': 3})
+        data = response.json()
+        self.assertEqual(data['period'], 'week')
+        self.assertEqual(data['series'][-1]['total'], '80.00')
+        self.assertEqual(data['members'][0]['username'], 'alice')
+
+        response = self.client.get(reverse('chama_report', args=[self.chama.pk]), {'period': 'month'})
+        self.assertEqual(len(response.context['report']['series']), 12)
+
+
+class ArrearsTests(ChamaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('alice')
+        self.chama, self.membership = self.make_chama(
+            self.user, contribution_amount=Decimal('100.00'), contribution_frequency='Monthly'
+        )
+        self.client.force_login(self.user)
+
+    def join(self, username, joined):
+        membership = Membership.objects.create(chama=self.chama, user=self.make_user(username))
+        Membership.objects.filter(pk=membership.pk).update(joined_at=joined)
+        return membership
+
+    def test_periods_due(self):
+        self.assertEqual(periods_due(date(2024, 1, 31), date(2024, 3, 1), 'Monthly'), 3)
+        self.assertEqual(periods_due(date(2024, 1, 1), date(2024, 1, 14), 'Weekly'), 2)
+        self.assertEqual(periods_due(date(2024, 1, 1), date(2024, 1, 1), 'Daily'), 1)
+        self.assertEqual(periods_due(date(2024, 1, 1), date(2024, 12, 31), 'Quarterly'), 4)
+        self.assertEqual(periods_due(date(2024, 2, 1), date(2024, 1, 1), 'Monthly'), 0)
+
+    def test_batched_arrears_match_pending_amount(self):
+        as_of = date(2024, 6, 15)
+        bob = self.join('bob', timezone.make_aware(timezone.datetime(2024, 1, 10, 12)))
+        Contribution.objects.create(membership=bob, amount=Decimal('250.00'), date=date(2024, 2, 1))
+        # Paid after as_of, so a back-dated report must not count it
+        Contribution.objects.create(membership=bob, amount=Decimal('200.00'), date=date(2024, 7, 1))
+        carol = self.join('carol', timezone.make_aware(timezone.datetime(2024, 5, 2, 12)))
+        Contribution.objects.create(membership=carol, amount=Decimal('300.00'), date=date(2024, 5, 2))
+
+        with self.assertNumQueries(1):
+            rows = {row['username']: row for row in compute_arrears([self.chama.pk], as_of)}
+        self.assertEqual((rows['bob']['expected'], rows['bob']['arrears']), (Decimal('600.00'), Decimal('350.00')))
+        self.assertEqual((rows['carol']['arrears'], rows['carol']['credit']), (Decimal('0.00'), Decimal('100.00')))
+        bob.refresh_from_db()
+        self.assertEqual(bob.get_pending_amount(as_of), Decimal('350.00'))
+        self.assertEqual(bob.get_pending_amount(date(2024, 7, 1)), Decimal('250.00'))
+        self.assertEqual(self.chama.get_total_contributions(), Decimal('750.00'))
+
+    def test_detail_page_caches_arrears_until_a_contribution(self):
+        bob = self.join('bob', timezone.now() - timedelta(days=1))
+        url = reverse('chama_detail', args=[self.chama.pk])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse(any('SUM(' in q['sql'] and 'core_membership' in q['sql'] for q in queries.captured_queries))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Contribution.objects.create(membership=bob, amount=Decimal('100.00'), date=timezone.localdate())
+        response = self.client.get(url)
+        self.assertEqual(response.context['arrears_summary']['arrears'], Decimal('100.00'))
+
+    def test_snapshot_and_report(self):
+        bob = self.join('bob', timezone.now() - timezone.timedelta(days=1))
+        call_command('snapshot_arrears', stdout=StringIO())
+        snapshot = ArrearsSnapshot.objects.get(membership=bob)
+        self.assertEqual(snapshot.arrears, Decimal('100.00'))
+
+        response = self.client.get(reverse('chama_detail', args=[self.chama.pk]))
+        self.assertEqual(response.context['arrears_summary']['arrears'], Decimal('200.00'))
+        self.assertEqual(response.context['your_arrears']['arrears'], Decimal('100.00'))
+
+        Contribution.objects.create(membership=bob, amount=Decimal('100.00'), date=timezone.localdate())
+        response = self.client.get(reverse('arrears_report', args=[self.chama.pk]))
+        row = next(row for row in response.context['rows'] if row['username'] == 'bob')
+        self.assertEqual((row['arrears'], row['change']), (Decimal('0.00'), Decimal('-100.00')))
+
+        self.client.force_login(bob.user)
+        response = self.client.get(reverse('arrears_report', args=[self.chama.pk]))
+        self.assertRedirects(response, reverse('chama_detail', args=[self.chama.pk]))
+
+
+class StatementTests(ChamaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.user = self.make_user('alice')
+        self.chama, self.membership = self.make_chama(self.user, contribution_amount=Decimal('100.00'))
+        self.bob = Membership.objects.create(chama=self.chama, user=self.make_user('bob'))
+        for membership, amount in [(self.membership, '300.00'), (self.bob, '100.00')]:
+            Contribution.objects.create(membership=membership, amount=Decimal(amount), date=date(2024, 3, 5))
+        Transaction.objects.create(
+            chama=self.chama, transaction_type='dividend', amount=Decimal('40.00'), date=date(2024, 3, 20),
+            purpose='Dividend', created_by=self.user,
+        )
+        self.client.force_login(self.user)
+
+    def queue_run(self):
+        response = self.client.post(reverse('statement_list', args=[self.chama.pk]), {
+            'period_start': '2024-03-01', 'period_end': '2024-03-31',
+        })
+        self.assertEqual(response.status_code, 302)
+        return StatementRun.objects.get()
+
+    def test_statements_render_in_pool_and_download(self):
+        run = self.queue_run()
+        self.assertEqual(run.status, 'pending')
+        with self.settings(MEDIA_ROOT=self.media.name):
+            call_command('generate_statements', workers=2, stdout=StringIO())
+            run.refresh_from_db()
+            self.assertEqual((run.status, run.total, run.rendered), ('done', 2, 2))
+            self.assertEqual(len(os.listdir(os.path.join(self.media.name, run.output_dir))), 2)
+
+            status = self.client.get(reverse('statement_status', args=[self.chama.pk, run.pk])).json()
+            self.assertEqual(status['status'], 'done')
+            # Downloads keep the rendered format even if PDF support comes or goes later
+            with mock.patch('core.statements.statement_format', return_value='other'):
+                response = self.client.get(status['download_url'])
+            self.assertTrue(response['Content-Disposition'].endswith(f'.{run.output_format}"'))
+            content = b''.join(response.streaming_content)
+            self.assertIn(b'KSh 30.00', content)  # 300 of 400 paid in -> 3/4 of the dividend
+
+            self.client.force_login(self.bob.user)
+            response = self.client.get(reverse('statement_download', args=[self.chama.pk, run.pk, self.membership.pk]))
+            self.assertRedirects(response, reverse('chama_detail', args=[self.chama.pk]))
+
+    def test_statement_data_is_prefetched(self):
+        for i in range(5):
+            Membership.objects.create(chama=self.chama, user=self.make_user(f'member{i}'))
+        with self.assertNumQueries(3):
+            statements = collect_statement_data(self.chama, date(2024, 3, 1), date(2024, 3, 31))
+        self.assertEqual(len(statements), 7)
+        alice = next(s for s in statements if s['username'] == 'alice')
+        self.assertEqual((alice['period_total'], alice['dividend_share']), (Decimal('300.00'), Decimal('30.00')))
+
+
+FLAKY_CALLS = []
+
+
+@task('tests.flaky')
+def flaky_task(fail_times=0):
+    FLAKY_CALLS.append(fail_times)
+    if len(FLAKY_CALLS) <= fail_times:
+        raise RuntimeError('temporary failure')
+
+
+class JobQueueTests(ChamaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        FLAKY_CALLS.clear()
+        self.worker = Worker(worker_id='test-worker')
+
+    def test_retries_with_backoff_then_succeeds(self):
+        job = enqueue('tests.flaky', {'fail_times': 1})
+        self.assertTrue(self.worker.run_once())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertIn('temporary failure', job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+
+        # Not due yet, so the worker has nothing to do
+        self.assertFalse(self.worker.run_once())
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.assertTrue(self.worker.run_once())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('done', 2))
+        self.assertIsNotNone(job.duration_ms)
+
+    def test_gives_up_after_max_attempts(self):
+        job = enqueue('tests.flaky', {'fail_times': 5}, max_attempts=1)
+        self.worker.run_once()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(self.worker.failed, 1)
+
+    def test_claims_are_exclusive_and_stale_locks_are_released(self):
+        job = enqueue('tests.flaky')
+        self.assertEqual(claim_next('a').pk, job.pk)
+        self.assertIsNone(claim_next('b'))
+
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timezone.timedelta(hours=1))
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(claim_next('b').locked_by, 'b')
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 1)
+
+    def test_late_result_does_not_overwrite_a_newer_claim(self):
+        job = enqueue('tests.flaky')
+        first = claim_next('a')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timezone.timedelta(hours=1))
+        requeue_stale()
+        claim_next('b')
+
+        # Worker a finishes after its lock expired and b took over
+        self.assertTrue(run_job(first))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.attempts), ('running', 'b', 1))
+
+    def test_job_that_keeps_killing_its_worker_fails(self):
+        job = enqueue('tests.flaky', max_attempts=2)
+        for expected in ('queued', 'failed'):
+            claim_next('a')
+            Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timezone.timedelta(hours=1))
+            requeue_stale()
+            job.refresh_from_db()
+            self.assertEqual(job.status, expected)
+        self.assertEqual(job.attempts, 2)
+        self.assertIn('lock expired', job.last_error)
+
+    @override_settings(STATEMENT_WORKERS=0)
+    def test_statement_request_is_queued_for_worker(self):
+        user = self.make_user('alice')
+        chama, _ = self.make_chama(user)
+        self.client.force_login(user)
+        with tempfile.TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media):
+            self.client.post(reverse('statement_list', args=[chama.pk]), {
+                'period_start': '2024-01-01', 'period_end': '2024-01-31',
+            })
+            run = StatementRun.objects.get()
+            self.assertEqual(run.status, 'pending')
+            self.assertEqual(Job.objects.get().payload, {'run_id': run.pk})
+            self.worker.run_once()
+        run.refresh_from_db()
+        self.assertEqual((run.status, run.rendered), ('done', 1))
+
+
+class UnreachableBackend(BaseBackend):
+    """Delivers everything except messages addressed to ``options['unreachable']``."""
+
+    def send_batch(self, messages):
+        return [message['id'] for message in messages if message['to'] != self.options['unreachable']]
+
+
+class AnnouncementNotificationTests(ChamaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.log = tempfile.NamedTemporaryFile(suffix='.log', delete=False)
+        self.log.close()
+        self.addCleanup(os.unlink, self.log.name)
+        self.user = self.make_user('alice')
+        self.chama, _ = self.make_chama(self.user)
+        self.members = []
+        for i in range(5):
+            user = self.make_user(f'member{i}')
+            User.objects.filter(pk=user.pk).update(email=f'member{i}@example.com' if i % 2 else '')
+            Membership.objects.create(chama=self.chama, user=user)
+            self.members.append(user)
+        Membership.objects.filter(user=self.members[-1]).update(is_active=False)
+        self.client.force_login(self.user)
+
+    def post_announcement(self, **data):
+        return self.client.post(reverse('announcement_add', args=[self.chama.pk]), dict(
+            {'title': 'AGM', 'content': 'AGM on Saturday.'}, **data
+        ))
+
+    def test_important_announcement_fans_out_in_batches(self):
+        backends = {
+            'email': {'BACKEND': 'core.notifications.FileBackend', 'PATH': self.log.name},
+            'sms': {'BACKEND': 'core.notifications.ConsoleBackend', 'STREAM': StringIO()},
+        }
+        self.post_announcement()
+        self.assertFalse(Job.objects.exists())
+        self.post_announcement(is_important='on')
+        with self.settings(NOTIFICATION_BACKENDS=backends, NOTIFICATION_BATCH_SIZE=2):
+            Worker().run_once()
+
+        notifications = Notification.objects.order_by('user__username')
+        self.assertEqual([n.user.username for n in notifications], ['member0', 'member1', 'member2', 'member3'])
+        self.assertEqual([n.email_status for n in notifications], ['skipped', 'sent', 'skipped', 'sent'])
+        self.assertTrue(all(n.sms_status == 'skipped' and n.delivered_at for n in notifications))
+        with open(self.log.name) as fileobj:
+            self.assertEqual(sorted(json.loads(line)['to'] for line in fileobj), ['member1@example.com', 'member3@example.com'])
+
+    def test_failed_recipients_are_retried_without_resending_the_rest(self):
+        sms = {'BACKEND': 'core.notifications.ConsoleBackend', 'STREAM': StringIO()}
+        flaky = {'BACKEND': 'core.tests.UnreachableBackend', 'UNREACHABLE': 'member3@example.com'}
+        self.post_announcement(is_important='on')
+        with self.settings(NOTIFICATION_BACKENDS={'email': flaky, 'sms': sms}):
+            Worker().run_once()
+
+        failed = Notification.objects.get(user=self.members[3])
+        self.assertEqual((failed.email_status, failed.delivery_attempts, failed.last_error),
+                         ('failed', 1, 'email: not delivered'))
+        self.assertIsNone(failed.delivered_at)
+        self.assertEqual(Notification.objects.filter(delivered_at__isnull=False).count(), 3)
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+
+        Job.objects.update(run_at=timezone.now())
+        backends = {'email': {'BACKEND': 'core.notifications.FileBackend', 'PATH': self.log.name}, 'sms': sms}
+        with self.settings(NOTIFICATION_BACKENDS=backends):
+            Worker().run_once()
+        failed.refresh_from_db()
+        self.assertEqual((failed.email_status, failed.last_error), ('sent', ''))
+        self.assertIsNotNone(failed.delivered_at)
+        self.assertEqual(Job.objects.get().status, 'done')
+        with open(self.log.name) as fileobj:
+            self.assertEqual([json.loads(line)['to'] for line in fileobj], ['member3@example.com'])
+
+    def test_gives_up_after_max_attempts(self):
+        sms = {'BACKEND': 'core.notifications.ConsoleBackend', 'STREAM': StringIO()}
+        flaky = {'BACKEND': 'core.tests.UnreachableBackend', 'UNREACHABLE': 'member3@example.com'}
+        self.post_announcement(is_important='on')
+        with self.settings(NOTIFICATION_BACKENDS={'email': flaky, 'sms': sms}, NOTIFICATION_MAX_ATTEMPTS=2):
+            for _ in range(2):
+                Job.objects.update(run_at=timezone.now())
+                Worker().run_once()
+        failed = Notification.objects.get(user=self.members[3])
+        self.assertEqual((failed.delivery_attempts, failed.delivered_at), (2, None))
+        self.assertEqual(Job.objects.get().status, 'done')
+
+    def test_inbox_lists_and_marks_read(self):
+        self.post_announcement(is_important='on')
+        with self.settings(NOTIFICATION_BACKENDS={'email': {'BACKEND': 'core.notifications.ConsoleBackend', 'STREAM': StringIO()},
+                                                  'sms': {'BACKEND': 'core.notifications.ConsoleBackend', 'STREAM': StringIO()}}):
+            Worker().run_once()
+        self.client.force_login(self.members[0])
+        response = self.client.get(reverse('notification_list'))
+        self.assertEqual(response.context['unread_count'], 1)
+        self.assertEqual(response.context['notifications'].object_list[0].title, 'AGM')
+        self.client.post(reverse('notification_list'))
+        self.assertFalse(Notification.objects.filter(user=self.members[0], is_read=False).exists())
+
+
+class SearchTests(ChamaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = self.make_user('alice')
+        self.bob = self.make_user('bob')
+        self.carol = self.make_user('carol')
+        self.chama, _ = self.make_chama(self.alice)
+        Membership.objects.create(chama=self.chama, user=self.bob)
+        self.other, _ = self.make_chama(self.carol, name='Other')
+        self.client.force_login(self.bob)
+
+    def search(self, query, **params):
+        response = self.client.get(reverse('search'), dict(params, q=query))
+        self.assertEqual(response.status_code, 200)
+        return [(hit.kind, hit.object_id) for hit in response.context['hits']]
+
+    def test_ranks_title_hits_first_and_filters_by_membership(self):
+        in_body = Announcement.objects.create(chama=self.chama, title='Notice', content='Harambee budget for the fundraiser')
+        in_title = Announcement.objects.create(chama=self.chama, title='Fundraiser date', content='Saturday at noon')
+        Announcement.objects.create(chama=self.other, title='Fundraiser elsewhere', content='Not for bob')
+        tents = Transaction.objects.create(chama=self.chama, transaction_type='expense', amount=Decimal('10.00'),
+                                           date=date(2024, 1, 5), purpose='Tent hire', description='Fundraiser tents')
+
+        hits = self.search('fundrais')
+        self.assertEqual(hits[0], ('announcement', in_title.pk))
+        self.assertEqual(sorted(hits[1:]), [('announcement', in_body.pk), ('transaction', tents.pk)])
+        self.assertEqual(self.search('fundraiser', type='transaction'), [('transaction', tents.pk)])
+
+    def test_messages_only_visible_to_sender_and_recipient(self):
+        mine = Message.objects.create(sender=self.alice, recipient=self.bob, subject='Loan request', content='About the loan')
+        Message.objects.create(sender=self.alice, recipient=self.carol, subject='Loan', content='Private loan')
+        self.assertEqual(self.search('loan'), [('message', mine.pk)])
+
+    def test_deleted_conversations_drop_out_of_search(self):
+        hidden = Message.objects.create(sender=self.alice, recipient=self.bob, subject='Loan request', content='About the loan')
+        self.client.post(reverse('message_bulk'), {'action': 'delete', 'threads': [hidden.thread_id]})
+        newer = Message.objects.create(sender=self.alice, recipient=self.bob, subject='Loan again', content='Still the loan')
+        self.assertEqual(self.search('loan'), [('message', newer.pk)])
+        with self.settings(SEARCH_BACKEND='core.search.DatabaseSearchBackend'):
+            self.assertEqual(self.search('loan'), [('message', newer.pk)])
+        # The other participant kept their copy
+        self.client.force_login(self.alice)
+        self.assertEqual(sorted(self.search('loan')), [('message', hidden.pk), ('message', newer.pk)])
+
+    def test_snippets_are_escaped_and_highlighted(self):
+        Announcement.objects.create(chama=self.chama, title='Meeting', content='<b>Agenda</b> for the meeting')
+        response = self.client.get(reverse('search'), {'q': 'agenda'})
+        self.assertContains(response, '&lt;b&gt;<mark>Agenda</mark>&lt;/b&gt;')
+
+    def test_index_follows_edits_and_deletes(self):
+        announcement = Announcement.objects.create(chama=self.chama, title='Picnic', content='Bring food')
+        announcement.title = 'Retreat'
+        announcement.save()
+        self.assertEqual(self.search('picnic'), [])
+        self.assertEqual(self.search('retreat'), [('announcement', announcement.pk)])
+        announcement.delete()
+        self.assertEqual(self.search('retreat'), [])
+
+    def test_rebuild_command_and_query_syntax(self):
+        announcement = Announcement.objects.create(chama=self.chama, title='AGM "minutes"', content='NEAR OR AND')
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM core_search_index')
+        self.assertEqual(self.search('minutes'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 1 row(s)', out.getvalue())
+        self.assertEqual(self.search('"minutes* OR ('), [('announcement', announcement.pk)])
+
+    def test_database_backend_matches_fts_visibility(self):
+        Announcement.objects.create(chama=self.chama, title='Fundraiser', content='Saturday')
+        Announcement.objects.create(chama=self.other, title='Fundraiser', content='Elsewhere')
+        hits = DatabaseSearchBackend().search(self.bob.pk, [self.chama.pk], 'fundraiser')
+        self.assertEqual([hit.chama_id for hit in hits], [self.chama.pk])
+
+    def test_admin_search_uses_index(self):
+        admin_user = User.objects.create_superuser('root', 'root@example.com', 'pw')
+        Announcement.objects.create(chama=self.chama, title='Harambee', content='Details')
+        Announcement.objects.create(chama=self.other, title='Other', content='Details')
+        self.client.force_login(admin_user)
+        response = self.client.get(reverse('admin:core_announcement_changelist'), {'q': 'harambee'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        response = self.client.get(reverse('admin:core_announcement_changelist'), {'q': 'Other'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+
+class ObjectCacheTests(ChamaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = self.make_user('alice')
+            self.chama, self.membership = self.make_chama(self.user)
+        self.chamas = object_cache(Chama)
+
+    def test_reads_through_local_and_shared_layers(self):
+        before = self.chamas.stats()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.chamas.get(self.chama.pk).name, 'Chama')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.chamas.get(self.chama.pk).name, 'Chama')
+            self.chamas.local.clear()
+            self.assertEqual(self.chamas.get(self.chama.pk).name, 'Chama')
+        after = self.chamas.stats()
+        self.assertEqual(
+            {name: after[name] - before[name] for name in ('local_hits', 'shared_hits', 'misses')},
+            {'local_hits': 1, 'shared_hits': 1, 'misses': 1},
+        )
+        self.assertIsNone(self.chamas.get(self.chama.pk + 100))
+
+    def test_save_and_delete_invalidate(self):
+        self.chamas.get(self.chama.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chama.name = 'Renamed'
+            self.chama.save()
+        self.assertEqual(self.chamas.get(self.chama.pk).name, 'Renamed')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chama.delete()
+        self.assertIsNone(self.chamas.get(self.chama.pk))
+
+    def test_uncommitted_writes_are_not_cached(self):
+        self.chamas.get(self.chama.pk)
+        self.chama.name = 'Draft'
+        self.chama.save()
+        self.assertEqual(self.chamas.get(self.chama.pk).name, 'Draft')
+        with self.assertNumQueries(1):
+            self.chamas.get(self.chama.pk)
+
+    def test_lru_evicts_and_expires(self):
+        small = ObjectCache(Chama, max_entries=2, local_ttl=60)
+        with self.captureOnCommitCallbacks(execute=True):
+            others = [self.make_chama(self.user, name=f'Chama {i}')[0] for i in range(2)]
+        for chama in [self.chama] + others:
+            small.get(chama.pk)
+        self.assertEqual((small.stats()['evictions'], small.stats()['size']), (1, 2))
+        small.local.ttl = 0
+        small.local.set(self.chama.pk, ())
+        self.assertIsNone(small.local.get(self.chama.pk))
+        self.assertEqual(small.stats()['expirations'], 1)
+
+    def test_warm_views_skip_profile_and_membership_queries(self):
+        self.client.force_login(self.user)
+        for _ in range(2):
+            self.client.get(reverse('profile'))
+            self.client.get(reverse('chama_detail', args=[self.chama.pk]))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('profile'))
+            self.client.get(reverse('chama_detail', args=[self.chama.pk]))
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn('"core_userprofile"', sql)
+        self.assertNotIn(f'"core_membership"."user_id" = {self.user.pk}', sql)
+
+        self.user.is_staff = True
+        self.user.save()
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('smartchama_object_cache_total{model="core.userprofile",counter="local_hits"}', body)
+
+
+class DatabaseConfigTests(TestCase):
+    def test_connections_are_tuned(self):
+        self.assertEqual(connection.vendor, 'sqlite')
+        self.assertEqual(connection.settings_dict['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -20000)
+
+    def test_tuned_writers_do_not_hit_lock_errors(self):
+        results = run_write_comparison(writers=4, writes=25)
+        self.assertEqual(results['tuned']['errors'], 0)
+        self.assertEqual(results['tuned']['committed'], 100)
+        self.assertEqual(results['defaults']['attempted'], 100)
+
+
+class ReplicaHarness:
+    """
+    Adds a 'replica' alias backed by its own SQLite file. Nothing reaches it
+    until sync_replica() copies the primary over, which stands in for
+    replication and makes lag observable.
+    """
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.replica_path = os.path.join(directory, 'replica.sqlite3')
+        primary = connections['default'].settings_dict
+        connections.settings[REPLICA] = dict(
+            primary, NAME=self.replica_path, TEST=dict(primary['TEST']),
+            OPTIONS={'pragmas': {'query_only': 'ON'}},
+        )
+        self.addCleanup(self.drop_replica)
+
+    def drop_replica(self):
+        if hasattr(connections._connections, REPLICA):
+            connections[REPLICA].close()
+            del connections[REPLICA]
+        del connections.settings[REPLICA]
+
+    def sync_replica(self):
+        if hasattr(connections._connections, REPLICA):
+            connections[REPLICA].close()
+        connections['default'].ensure_connection()
+        target = sqlite3.connect(self.replica_path)
+        try:
+            connections['default'].connection.backup(target)
+        finally:
+            target.close()
+
+
+class ReplicaRoutingTests(ReplicaHarness, ChamaTestMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('alice')
+        self.chama, self.membership = self.make_chama(self.user)
+        self.client.force_login(self.user)
+        self.sync_replica()
+
+    def listed(self, response):
+        return [c.amount for c in response.context['contributions'].object_list]
+
+    def test_marked_views_read_from_replica(self):
+        Contribution.objects.create(membership=self.membership, amount=Decimal('40.00'), date=date(2024, 1, 1))
+        response = self.client.get(reverse('contribution_list', args=[self.chama.pk]))
+        self.assertTrue(response.wsgi_request.use_replica)
+        self.assertEqual(self.listed(response), [])
+
+        self.sync_replica()
+        response = self.client.get(reverse('contribution_list', args=[self.chama.pk]))
+        self.assertEqual(self.listed(response), [Decimal('40.00')])
+
+        response = self.client.get(reverse('chama_detail', args=[self.chama.pk]))
+        self.assertFalse(response.wsgi_request.use_replica)
+
+    def test_writes_pin_reads_to_primary(self):
+        response = self.client.post(
+            reverse('contribution_add', args=[self.chama.pk]), {'amount': '75.00', 'date': '2024-05-01'}, follow=True,
+        )
+        self.assertIn(PIN_COOKIE, self.client.cookies)
+        self.assertFalse(response.wsgi_request.use_replica)
+        self.assertEqual(self.listed(response), [Decimal('75.00')])
+
+        # Once the pin expires reads go back to the (still lagging) replica
+        del self.client.cookies[PIN_COOKIE]
+        response = self.client.get(reverse('contribution_list', args=[self.chama.pk]))
+        self.assertEqual(self.listed(response), [])
+
+    def test_replica_views_never_write(self):
+        # Even with the ledger rows missing, a GET of a replica-routed view must not write
+        ChamaBalance.objects.all().delete()
+        self.sync_replica()
+        routed = [
+            pattern for pattern in get_resolver('core.urls').url_patterns
+            if getattr(pattern.callback, 'replica_reads', False)
+        ]
+        self.assertIn('contribution_list', [pattern.name for pattern in routed])
+        for pattern in routed:
+            kwargs = {'chama_id': self.chama.pk} if 'chama_id' in pattern.pattern.converters else {}
+            with self.subTest(view=pattern.name), CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse(pattern.name, kwargs=kwargs))
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.wsgi_request.use_replica)
+                writes = [q['sql'] for q in queries.captured_queries if not q['sql'].startswith('SELECT')]
+                self.assertEqual(writes, [])
+
+
+class AsyncViewTests(ChamaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('alice', role='admin')
+        self.chama, _ = self.make_chama(self.user)
+        Contribution.objects.create(membership=self.chama.memberships.get(), amount=Decimal('10.00'), date=date.today())
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+
+    def test_async_views_match_sync_context(self):
+        for sync_name, async_name, args in [('dashboard', 'dashboard_async', []),
+                                            ('chama_detail', 'chama_detail_async', [self.chama.pk])]:
+            sync_response = self.client.get(reverse(sync_name, args=args))
+            async_response = self.client.get(reverse(async_name, args=args))
+            self.assertEqual(async_response.status_code, 200)
+            for key in ['user_chamas', 'total_contributions', 'all_chamas_count', 'members', 'balance']:
+                if key in sync_response.context:
+                    self.assertEqual(async_response.context[key], sync_response.context[key])
+
+    async def test_asgi_access_checks(self):
+        response = await self.async_client.get(reverse('chama_detail_async', args=[self.chama.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+        response = await self.async_client.get(reverse('chama_detail_async', args=[self.chama.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_anonymous_users_are_sent_to_login(self):
+        self.client.logout()
+        response = self.client.get(reverse('dashboard_async'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/login/', response['Location'])
+
+
+@override_settings(ASYNC_PARALLEL_READS=True)
+class AsyncComparisonTests(ChamaTestMixin, TransactionTestCase):
+    def test_wsgi_and_asgi_under_concurrent_load(self):
+        user = self.make_user('alice')
+        chama, _ = self.make_chama(user)
+        # Shared-cache in-memory SQLite locks whole tables on write; keep the load read-only
+        ChamaBalance.objects.rebuild([chama.pk])
+        results = run_async_comparison(user, concurrency=3, requests=6, db_latency_ms=1)
+        self.assertEqual(set(results), {'dashboard', 'chama_detail'})
+        for servers in results.values():
+            self.assertEqual((servers['wsgi']['errors'], servers['asgi']['errors']), (0, 0))
+            self.assertEqual(servers['asgi']['requests'], 6)
+
+
+@override_settings(EVENTS_KEEPALIVE=0.05, EVENTS_POLL_INTERVAL=0.01, EVENTS_MAX_STREAM_SECONDS=1)
+class EventStreamTests(ChamaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = self.make_user('alice')
+        self.bob = self.make_user('bob')
+        self.chama, _ = self.make_chama(self.alice)
+        Membership.objects.create(chama=self.chama, user=self.bob)
+        self.async_client.force_login(self.alice)
+
+    def send(self, subject):
+        return Message.objects.create(sender=self.bob, recipient=self.alice, subject=subject, content='Hi')
+
+    async def test_memory_backend_pushes_new_messages(self):
+        response = await self.async_client.get(reverse('event_stream'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertTrue((await anext(chunks)).startswith(b'retry:'))
+        self.assertEqual(await anext(chunks), b'id: 0.0\n\n')
+
+        message = await sync_to_async(self.send)('Minutes')
+        publish_message(message)
+        chunk = (await anext(chunks)).decode()
+        self.assertIn(f'id: {message.pk}.0', chunk)
+        self.assertIn('event: message', chunk)
+        data = json.loads(chunk.split('data: ')[1])
+        self.assertEqual(data['subject'], 'Minutes')
+        self.assertEqual(data['url'], reverse('message_detail', args=[message.pk]))
+
+    @override_settings(EVENTS_BACKEND='poll')
+    async def test_poll_backend_replays_from_last_event_id(self):
+        first = await sync_to_async(self.send)('Before')
+        await sync_to_async(Announcement.objects.create)(chama=self.chama, title='AGM', content='Saturday')
+        response = await self.async_client.get(reverse('event_stream'), headers={'Last-Event-ID': f'{first.pk}.0'})
+        chunks = aiter(response.streaming_content)
+        await anext(chunks)
+        chunk = (await anext(chunks)).decode()
+        self.assertIn('event: announcement', chunk)
+        self.assertEqual(json.loads(chunk.split('data: ')[1])['url'], reverse('announcement_list', args=[self.chama.pk]))
+
+        later = await sync_to_async(self.send)('After')
+        chunk = await anext(chunks)
+        while chunk.startswith(b':'):
+            chunk = await anext(chunks)
+        self.assertIn(f'"id": {later.pk}'.encode(), chunk)
+
+
+class APITests(ChamaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = self.make_user('alice')
+        self.bob = self.make_user('bob')
+        self.chama, self.membership = self.make_chama(self.alice, name='Savers')
+        self.other, _ = self.make_chama(self.bob, name='Private')
+        for i in range(3):
+            Transaction.objects.create(chama=self.chama, transaction_type='expense', amount=Decimal('5.00'),
+                                       date=date(2024, 1, 1 + i), purpose=f'Fee {i}', created_by=self.alice)
+        self.client.force_login(self.alice)
+
+    def test_requires_login_and_membership(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('api_chama_list')).status_code, 401)
+        self.client.force_login(self.alice)
+        self.assertEqual(self.client.get(reverse('api_transaction_list', args=[self.other.pk])).status_code, 404)
+        self.assertEqual(self.client.post(reverse('api_chama_list')).status_code, 405)
+
+    def test_sparse_fields(self):
+        response = self.client.get(reverse('api_chama_list'), {'fields': 'name'})
+        self.assertEqual(response.json(), {'results': [{'id': self.chama.pk, 'name': 'Savers'}], 'next': None})
+        self.assertEqual(self.client.get(reverse('api_chama_list'), {'fields': 'name,secret'}).status_code, 400)
+
+    def test_cursor_pagination(self):
+        url = reverse('api_transaction_list', args=[self.chama.pk])
+        first = self.client.get(url, {'page_size': 2, 'fields': 'purpose'}).json()
+        self.assertEqual([row['purpose'] for row in first['results']], ['Fee 2', 'Fee 1'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual(([row['purpose'] for row in second['results']], second['next']), (['Fee 0'], None))
+
+    def test_etag_revalidation(self):
+        url = reverse('api_transaction_list', args=[self.chama.pk])
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        self.assertIn('Last-Modified', response)
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((cached.status_code, cached.content, cached['ETag']), (304, b'', etag))
+
+        Transaction.objects.filter(purpose='Fee 0').update(purpose='Changed')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_chama_detail_honours_if_modified_since(self):
+        url = reverse('api_chama_detail', args=[self.chama.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.json()['name'], 'Savers')
+        last_modified = response['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        Chama.objects.filter(pk=self.chama.pk).update(
+            name='Renamed', updated_at=self.chama.updated_at + timedelta(seconds=5),
+        )
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_messages_are_limited_to_the_user(self):
+        Membership.objects.create(chama=self.chama, user=self.bob)
+        carol = self.make_user('carol')
+        mine = Message.objects.create(sender=self.bob, recipient=self.alice, subject='Hi', content='Hello')
+        Message.objects.create(sender=self.bob, recipient=carol, subject='Hi', content='Not for alice')
+        url = reverse('api_message_list')
+        rows = self.client.get(url, {'fields': 'subject,sender_username'}).json()['results']
+        self.assertEqual(rows, [{'id': mine.pk, 'subject': 'Hi', 'sender_username': 'bob'}])
+        self.assertEqual(len(self.client.get(url, {'thread': mine.thread_id}).json()['results']), 1)
+
+        self.client.post(reverse('message_bulk'), {'action': 'delete', 'threads': [mine.thread_id]})
+        self.assertEqual(self.client.get(url).json()['results'], [])
@@ -0,0 +1,36 @@
+from django.core.cache import cache
+
+from .models import Message
+
+UNREAD_TIMEOUT = 3600
+
+
+def unread_key(user_id):
+    return f'core:unread:{user_id}'
+
+
+def count_unread(user_id):
+    return Message.objects.filter(recipient_id=user_id, is_read=False).count()
+
+
+def get_unread_count(user_id):
+    """Return the cached unread count, counting once on a miss."""
+    count = cache.get(unread_key(user_id))
+    if count is None:
+        count = count_unread(user_id)
+        cache.add(unread_key(user_id), count, UNREAD_TIMEOUT)
+    return count
+
+
+def adjust_unread_count(user_id, delta):
+    # A missing counter is fine: the next read counts from the database
+    try:
+        count = cache.incr(unread_key(user_id), delta)
+    except ValueError:
+        return
+    if count < 0:
+        cache.delete(unread_key(user_id))
+
+
+def set_unread_counts(counts):
+    cache.set_many({unread_key(user_id): count for user_id, count in counts.items()}, UNREAD_TIMEOUT)
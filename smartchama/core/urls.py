@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, async_views, events, views, profiling
 
 urlpatterns = [
     # Authentication
@@ -24,17 +24,55 @@ urlpatterns = [
     # Contributions
     path('chamas/<int:chama_id>/contributions/', views.contribution_list, name='contribution_list'),
     path('chamas/<int:chama_id>/contributions/add/', views.contribution_add, name='contribution_add'),
+    path('chamas/<int:chama_id>/contributions/import/', views.contribution_import, name='contribution_import'),
+    path('chamas/<int:chama_id>/contributions/export/', views.contribution_export, name='contribution_export'),
+    
+    # Reports
+    path('chamas/<int:chama_id>/reports/contributions/', views.chama_report, name='chama_report'),
+    path('chamas/<int:chama_id>/reports/contributions.json', views.chama_report_data, name='chama_report_data'),
+    path('chamas/<int:chama_id>/reports/arrears/', views.arrears_report, name='arrears_report'),
+    path('chamas/<int:chama_id>/statements/', views.statement_list, name='statement_list'),
+    path('chamas/<int:chama_id>/statements/<int:run_id>/status/', views.statement_status, name='statement_status'),
+    path('chamas/<int:chama_id>/statements/<int:run_id>/<int:membership_id>/', views.statement_download, name='statement_download'),
     
     # Transactions
     path('chamas/<int:chama_id>/transactions/', views.transaction_list, name='transaction_list'),
     path('chamas/<int:chama_id>/transactions/add/', views.transaction_add, name='transaction_add'),
+    path('chamas/<int:chama_id>/transactions/export/', views.transaction_export, name='transaction_export'),
     
     # Announcements
     path('chamas/<int:chama_id>/announcements/', views.announcement_list, name='announcement_list'),
     path('chamas/<int:chama_id>/announcements/add/', views.announcement_add, name='announcement_add'),
     
+    # Search
+    path('search/', views.search, name='search'),
+    
+    # Notifications
+    path('notifications/', views.notification_list, name='notification_list'),
+    
     # Messages
     path('messages/', views.message_list, name='message_list'),
     path('messages/send/', views.message_send, name='message_send'),
     path('messages/<int:message_id>/', views.message_detail, name='message_detail'),
+    path('messages/threads/<int:thread_id>/', views.message_thread, name='message_thread'),
+    path('messages/bulk/', views.message_bulk, name='message_bulk'),
+    
+    # JSON API
+    path('api/v1/chamas/', api.chama_list, name='api_chama_list'),
+    path('api/v1/chamas/<int:chama_id>/', api.chama_detail, name='api_chama_detail'),
+    path('api/v1/chamas/<int:chama_id>/memberships/', api.membership_list, name='api_membership_list'),
+    path('api/v1/chamas/<int:chama_id>/contributions/', api.contribution_list, name='api_contribution_list'),
+    path('api/v1/chamas/<int:chama_id>/transactions/', api.transaction_list, name='api_transaction_list'),
+    path('api/v1/chamas/<int:chama_id>/announcements/', api.announcement_list, name='api_announcement_list'),
+    path('api/v1/messages/', api.message_list, name='api_message_list'),
+    
+    # Async (ASGI) variants of the busiest pages
+    path('async/dashboard/', async_views.dashboard, name='dashboard_async'),
+    path('async/chamas/<int:chama_id>/', async_views.chama_detail, name='chama_detail_async'),
+    
+    # Server-sent events
+    path('events/', events.event_stream, name='event_stream'),
+    
+    # Profiling
+    path('metrics/', profiling.metrics, name='metrics'),
 ]
@@ -1,23 +1,54 @@
+import os
+
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import FileResponse, Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
 from django.contrib import messages
-from django.db.models import Sum, Count, Q
+from django.urls import reverse
+from django.db import transaction as db_transaction
+from django.db.models import Count, Q
 from django.utils import timezone
 from datetime import datetime, timedelta
-from decimal import Decimal
 
 from .models import (
     UserProfile, Chama, Membership, Contribution, 
-    Transaction, Announcement, Message
+    Transaction, Announcement, Message, ChamaBalance,
+    StatementRun, Notification, ThreadParticipant
+)
+from .dashboard import get_user_stats, get_global_stats
+from .exporters import (
+    CONTRIBUTION_COLUMNS, TRANSACTION_COLUMNS, contribution_rows, transaction_rows, iter_csv
 )
+from .importers import ContributionImporter, ImportFileError, iter_rows
+from .cache import object_cache
+from .db import replica_reads
+from .pagination import paginate_keyset
+from .permissions import chama_member_required, get_membership_map
+from .unread import get_unread_count, adjust_unread_count
+from .reports import contribution_report
+from .arrears import cached_arrears, compute_arrears, latest_snapshot, summarize as summarize_arrears, take_snapshot
+from .statements import statement_path
+from .jobs import enqueue
+from .messaging import (
+    BULK_ACTIONS, INBOX_ORDERING, PREVIEW_CHARS, THREAD_ORDERING, cleared_by, inbox, mark_threads_read,
+    read_message, thread_messages,
+)
+from .search import KINDS as SEARCH_KINDS, get_search_backend
 from .forms import (
     MemberRegistrationForm, UserProfileForm, ChamaForm, 
-    ContributionForm, TransactionForm, AnnouncementForm, 
-    MessageForm, JoinChamaForm
+    ContributionForm, ContributionImportForm, LedgerExportForm, 
+    StatementRunForm, TransactionForm, AnnouncementForm, MessageForm, JoinChamaForm
 )
 
+# Keyset orderings for paginated lists; the last term must be unique
+CONTRIBUTION_ORDERING = ['-date', '-created_at', '-id']
+TRANSACTION_ORDERING = ['-date', '-created_at', '-id']
+ANNOUNCEMENT_ORDERING = ['-created_at', '-id']
+NOTIFICATION_ORDERING = ['-created_at', '-id']
+
 # Authentication Views
 def home(request):
     if request.user.is_authenticated:
@@ -56,9 +87,16 @@ def user_logout(request):
     return redirect('user_login')
 
 # Profile Views
+def get_user_profile(user):
+    profile_obj = object_cache(UserProfile).get_by(
+        fetch=lambda: UserProfile.objects.get_or_create(user=user)[0], user_id=user.pk,
+    )
+    profile_obj.user = user
+    return profile_obj
+
 @login_required
 def profile(request):
-    profile_obj, created = UserProfile.objects.get_or_create(user=request.user)
+    profile_obj = get_user_profile(request.user)
     if request.method == 'POST':
         form = UserProfileForm(request.POST, request.FILES, instance=profile_obj)
         if form.is_valid():
@@ -70,57 +108,40 @@ def profile(request):
     return render(request, 'core/profile.html', {'form': form, 'profile': profile_obj})
 
 # Dashboard Views
-@login_required
-def dashboard(request):
-    profile_obj, created = UserProfile.objects.get_or_create(user=request.user)
-    user_chamas = Chama.objects.filter(memberships__user=request.user, memberships__is_active=True).distinct()
-    
-    # User's contributions summary
-    user_contributions = Contribution.objects.filter(membership__user=request.user)
-    total_contributions = user_contributions.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-    
-    # Recent contributions
-    recent_contributions = user_contributions.order_by('-date')[:5]
-    
-    # Recent announcements
-    recent_announcements = Announcement.objects.filter(
-        chama__in=user_chamas
-    ).order_by('-created_at')[:5]
-    
-    # Unread messages
-    unread_messages = Message.objects.filter(recipient=request.user, is_read=False).count()
-    
-    context = {
-        'profile': profile_obj,
-        'user_chamas': user_chamas,
-        'total_contributions': total_contributions,
-        'recent_contributions': recent_contributions,
-        'recent_announcements': recent_announcements,
-        'unread_messages': unread_messages,
+def dashboard_reads(user):
+    """Independent reads behind the dashboard; the async view runs them concurrently."""
+    return {
+        'profile': lambda: get_user_profile(user),
+        'unread_messages': lambda: get_unread_count(user.pk),
+        'stats': lambda: get_user_stats(user),
     }
+
+def dashboard_context(reads, global_stats=None):
+    # Stat blocks are cached and invalidated by model signals (see core.signals)
+    context = {'profile': reads['profile'], 'unread_messages': reads['unread_messages']}
+    context.update(reads['stats'])
     
     # Admin dashboard stats
-    if profile_obj.is_admin():
-        all_chamas = Chama.objects.all()
-        all_members = User.objects.filter(memberships__is_active=True).distinct().count()
-        total_chama_contributions = Contribution.objects.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        
-        context.update({
-            'all_chamas': all_chamas,
-            'all_members': all_members,
-            'total_chama_contributions': total_chama_contributions,
-        })
-    
-    return render(request, 'core/dashboard.html', context)
+    if global_stats is not None:
+        context.update(global_stats)
+    return context
+
+@login_required
+def dashboard(request):
+    reads = {name: read() for name, read in dashboard_reads(request.user).items()}
+    global_stats = get_global_stats() if reads['profile'].is_admin() else None
+    return render(request, 'core/dashboard.html', dashboard_context(reads, global_stats))
 
 # Chama Views
 @login_required
 def chama_list(request):
-    user_chamas = Chama.objects.filter(memberships__user=request.user, memberships__is_active=True).distinct()
+    user_chamas = Chama.objects.filter(
+        memberships__user=request.user, memberships__is_active=True
+    ).distinct().with_stats()
     available_chamas = Chama.objects.filter(is_active=True).exclude(
         memberships__user=request.user, 
         memberships__is_active=True
-    ).distinct()
+    ).distinct().with_stats()
     
     return render(request, 'core/chama_list.html', {
         'user_chamas': user_chamas,
@@ -147,59 +168,50 @@ def chama_create(request):
         form = ChamaForm()
     return render(request, 'core/chama_form.html', {'form': form, 'action': 'Create'})
 
-@login_required
-def chama_detail(request, chama_id):
-    chama = get_object_or_404(Chama, id=chama_id)
-    membership = Membership.objects.filter(chama=chama, user=request.user, is_active=True).first()
-    
-    if not membership:
-        messages.error(request, 'You are not a member of this Chama.')
-        return redirect('chama_list')
-    
-    # Chama statistics
-    total_contributions = Contribution.objects.filter(membership__chama=chama).aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0.00')
-    
-    member_count = chama.get_member_count()
-    
-    # Recent contributions
-    recent_contributions = Contribution.objects.filter(
-        membership__chama=chama
-    ).order_by('-date')[:10]
-    
-    # Recent transactions
-    recent_transactions = Transaction.objects.filter(chama=chama).order_by('-date')[:10]
-    
-    # Announcements
-    chama_announcements = Announcement.objects.filter(chama=chama).order_by('-created_at')[:10]
-    
-    # Members list
-    members = Membership.objects.filter(chama=chama, is_active=True).select_related('user')
-    
-    context = {
+def chama_detail_reads(chama):
+    """Independent reads behind chama_detail; the async view runs them concurrently."""
+    return {
+        # Chama statistics
+        'balance': lambda: ChamaBalance.objects.for_chama(chama),
+        'member_count': chama.get_member_count,
+        'recent_contributions': lambda: list(Contribution.objects.filter(
+            membership__chama=chama
+        ).select_related('membership__user').order_by('-date')[:10]),
+        'recent_transactions': lambda: list(Transaction.objects.filter(chama=chama).order_by('-date')[:10]),
+        'announcements': lambda: list(
+            Announcement.objects.filter(chama=chama).select_related('created_by').order_by('-created_at')[:10]
+        ),
+        # Members list with expected-vs-paid, cached per chama version so most views skip the grouped query
+        'members': lambda: cached_arrears(chama),
+        'latest_statement': lambda: StatementRun.objects.filter(chama=chama, status='done').first(),
+    }
+
+def chama_detail_context(chama, membership, reads):
+    members = reads['members']
+    context = dict(reads)
+    context.update({
         'chama': chama,
         'membership': membership,
-        'total_contributions': total_contributions,
-        'member_count': member_count,
-        'recent_contributions': recent_contributions,
-        'recent_transactions': recent_transactions,
-        'announcements': chama_announcements,
-        'members': members,
+        'total_contributions': reads['balance'].contributions_in,
+        'arrears_summary': summarize_arrears(members),
+        'your_arrears': next((m for m in members if m['membership_id'] == membership.pk), None),
         'can_edit': membership.can_edit_chama(),
         'can_add_transactions': membership.can_add_transactions(),
-    }
-    
-    return render(request, 'core/chama_detail.html', context)
+    })
+    return context
 
-@login_required
+@chama_member_required()
+def chama_detail(request, chama_id):
+    reads = {name: read() for name, read in chama_detail_reads(request.chama).items()}
+    return render(request, 'core/chama_detail.html', chama_detail_context(request.chama, request.membership, reads))
+
+@chama_member_required(
+    roles=Membership.EDITOR_ROLES,
+    message='You do not have permission to edit this Chama.',
+    redirect_to='chama_detail',
+)
 def chama_edit(request, chama_id):
-    chama = get_object_or_404(Chama, id=chama_id)
-    membership = Membership.objects.filter(chama=chama, user=request.user, is_active=True).first()
-    
-    if not membership or not membership.can_edit_chama():
-        messages.error(request, 'You do not have permission to edit this Chama.')
-        return redirect('chama_detail', chama_id=chama_id)
+    chama = request.chama
     
     if request.method == 'POST':
         form = ChamaForm(request.POST, instance=chama)
@@ -214,7 +226,9 @@ def chama_edit(request, chama_id):
 
 @login_required
 def chama_join(request, chama_id):
-    chama = get_object_or_404(Chama, id=chama_id, is_active=True)
+    chama = object_cache(Chama).get(chama_id)
+    if chama is None or not chama.is_active:
+        raise Http404('No Chama matches the given query.')
     
     # Check if already a member
     existing_membership = Membership.objects.filter(chama=chama, user=request.user).first()
@@ -233,17 +247,18 @@ def chama_join(request, chama_id):
     return redirect('chama_detail', chama_id=chama_id)
 
 # Contribution Views
-@login_required
+@replica_reads
+@chama_member_required()
 def contribution_list(request, chama_id):
-    chama = get_object_or_404(Chama, id=chama_id)
-    membership = Membership.objects.filter(chama=chama, user=request.user, is_active=True).first()
+    chama = request.chama
+    membership = request.membership
     
-    if not membership:
-        messages.error(request, 'You are not a member of this Chama.')
-        return redirect('chama_list')
-    
-    contributions = Contribution.objects.filter(membership__chama=chama).order_by('-date')
-    total = contributions.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+    contributions = paginate_keyset(
+        request,
+        Contribution.objects.filter(membership__chama=chama).select_related('membership__user'),
+        CONTRIBUTION_ORDERING,
+    )
+    total = ChamaBalance.objects.for_chama(chama).contributions_in
     
     return render(request, 'core/contribution_list.html', {
         'chama': chama,
@@ -252,21 +267,19 @@ def contribution_list(request, chama_id):
         'total': total,
     })
 
-@login_required
+@chama_member_required()
 def contribution_add(request, chama_id):
-    chama = get_object_or_404(Chama, id=chama_id)
-    membership = Membership.objects.filter(chama=chama, user=request.user, is_active=True).first()
-    
-    if not membership:
-        messages.error(request, 'You are not a member of this Chama.')
-        return redirect('chama_list')
+    chama = request.chama
+    membership = request.membership
     
     if request.method == 'POST':
         form = ContributionForm(request.POST)
         if form.is_valid():
             contribution = form.save(commit=False)
             contribution.membership = membership
-            contribution.save()
+            with db_transaction.atomic():
+                # Signals move the ledger and rollups in the same transaction
+                contribution.save()
             messages.success(request, 'Contribution recorded successfully!')
             return redirect('contribution_list', chama_id=chama_id)
     else:
@@ -278,17 +291,177 @@ def contribution_add(request, chama_id):
         'membership': membership,
     })
 
+@chama_member_required(
+    roles=Membership.TREASURY_ROLES,
+    message='You do not have permission to import contributions.',
+    redirect_to='chama_detail',
+)
+def contribution_import(request, chama_id):
+    chama = request.chama
+    report = None
+    
+    if request.method == 'POST':
+        form = ContributionImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                report = ContributionImporter(chama).run(iter_rows(upload.file, upload.name))
+            except ImportFileError as exc:
+                messages.error(request, str(exc))
+            else:
+                messages.success(request, f'Imported {report.created} contributions, skipped {report.skipped} duplicates.')
+    else:
+        form = ContributionImportForm()
+    
+    return render(request, 'core/contribution_import.html', {
+        'form': form,
+        'chama': chama,
+        'membership': request.membership,
+        'report': report,
+    })
+
+def stream_csv(filename, columns, rows):
+    response = StreamingHttpResponse(iter_csv(columns, rows, bom=True), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@chama_member_required()
+def contribution_export(request, chama_id):
+    form = LedgerExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    rows = contribution_rows(
+        chama_ids=[chama_id],
+        date_from=form.cleaned_data['date_from'],
+        date_to=form.cleaned_data['date_to'],
+    )
+    return stream_csv(f'contributions-{chama_id}.csv', CONTRIBUTION_COLUMNS, rows)
+
+# Report Views
+@replica_reads
+@chama_member_required()
+def chama_report(request, chama_id):
+    report = contribution_report(request.chama, request.GET.get('period'), request.GET.get('months'))
+    return render(request, 'core/chama_report.html', {
+        'chama': request.chama,
+        'membership': request.membership,
+        'report': report,
+    })
+
+@replica_reads
+@chama_member_required()
+def chama_report_data(request, chama_id):
+    report = contribution_report(request.chama, request.GET.get('period'), request.GET.get('months'))
+    return JsonResponse({
+        'chama': request.chama.pk,
+        'period': report['period'],
+        'start': report['start'],
+        'end': report['end'],
+        'series': report['series'],
+        'members': report['members'],
+    })
+
+@replica_reads
+@chama_member_required(
+    roles=Membership.TREASURY_ROLES,
+    message='You do not have permission to view the arrears report.',
+    redirect_to='chama_detail',
+)
+def arrears_report(request, chama_id):
+    chama = request.chama
+    
+    if request.method == 'POST':
+        count = take_snapshot([chama.pk])
+        messages.success(request, f'Saved an arrears snapshot for {count} member(s).')
+        return redirect('arrears_report', chama_id=chama.id)
+    
+    rows = compute_arrears([chama.pk])
+    snapshot_date, snapshot = latest_snapshot(chama)
+    for row in rows:
+        previous = snapshot.get(row['membership_id'])
+        row['previous_arrears'] = previous
+        row['change'] = row['arrears'] - previous if previous is not None else None
+    
+    return render(request, 'core/arrears_report.html', {
+        'chama': chama,
+        'membership': request.membership,
+        'rows': rows,
+        'summary': summarize_arrears(rows),
+        'snapshot_date': snapshot_date,
+    })
+
+# Statement Views
+@chama_member_required(
+    roles=Membership.TREASURY_ROLES,
+    message='You do not have permission to generate statements.',
+    redirect_to='chama_detail',
+)
+def statement_list(request, chama_id):
+    chama = request.chama
+    
+    if request.method == 'POST':
+        form = StatementRunForm(request.POST)
+        if form.is_valid():
+            # Rendering happens in a background worker, never in the request
+            with db_transaction.atomic():
+                run = StatementRun.objects.create(chama=chama, requested_by=request.user, **form.cleaned_data)
+                enqueue('statements.generate', {'run_id': run.pk})
+            messages.success(request, 'Statements queued. They will be available here once rendered.')
+            return redirect('statement_list', chama_id=chama.id)
+    else:
+        end = timezone.localdate().replace(day=1) - timedelta(days=1)
+        form = StatementRunForm(initial={'period_start': end.replace(day=1), 'period_end': end})
+    
+    return render(request, 'core/statement_list.html', {
+        'form': form,
+        'chama': chama,
+        'membership': request.membership,
+        'runs': StatementRun.objects.filter(chama=chama).select_related('requested_by')[:20],
+    })
+
+@chama_member_required()
+def statement_status(request, chama_id, run_id):
+    run = get_object_or_404(StatementRun, pk=run_id, chama=request.chama)
+    data = {
+        'id': run.pk,
+        'status': run.status,
+        'total': run.total,
+        'rendered': run.rendered,
+        'period_start': run.period_start,
+        'period_end': run.period_end,
+        'started_at': run.started_at,
+        'finished_at': run.finished_at,
+        'error': run.error,
+    }
+    if run.status == 'done':
+        data['download_url'] = reverse('statement_download', args=[chama_id, run.pk, request.membership.pk])
+    return JsonResponse(data)
+
+@chama_member_required()
+def statement_download(request, chama_id, run_id, membership_id):
+    membership = request.membership
+    if membership_id != membership.pk and membership.role not in Membership.TREASURY_ROLES:
+        messages.error(request, 'You can only download your own statement.')
+        return redirect('chama_detail', chama_id=chama_id)
+    run = get_object_or_404(StatementRun, pk=run_id, chama=request.chama, status='done')
+    member = get_object_or_404(Membership.objects.select_related('user'), pk=membership_id, chama=request.chama)
+    path = statement_path(run, member.pk, member.user.username)
+    if path is None:
+        raise Http404('Statement not found.')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=os.path.basename(path))
+
 # Transaction Views
-@login_required
+@replica_reads
+@chama_member_required()
 def transaction_list(request, chama_id):
-    chama = get_object_or_404(Chama, id=chama_id)
-    membership = Membership.objects.filter(chama=chama, user=request.user, is_active=True).first()
-    
-    if not membership:
-        messages.error(request, 'You are not a member of this Chama.')
-        return redirect('chama_list')
+    chama = request.chama
+    membership = request.membership
     
-    transactions = Transaction.objects.filter(chama=chama).order_by('-date')
+    transactions = paginate_keyset(
+        request,
+        Transaction.objects.filter(chama=chama).select_related('created_by'),
+        TRANSACTION_ORDERING,
+    )
     
     return render(request, 'core/transaction_list.html', {
         'chama': chama,
@@ -296,14 +469,14 @@ def transaction_list(request, chama_id):
         'transactions': transactions,
     })
 
-@login_required
+@chama_member_required(
+    roles=Membership.TREASURY_ROLES,
+    message='You do not have permission to add transactions.',
+    redirect_to='chama_detail',
+)
 def transaction_add(request, chama_id):
-    chama = get_object_or_404(Chama, id=chama_id)
-    membership = Membership.objects.filter(chama=chama, user=request.user, is_active=True).first()
-    
-    if not membership or not membership.can_add_transactions():
-        messages.error(request, 'You do not have permission to add transactions.')
-        return redirect('chama_detail', chama_id=chama_id)
+    chama = request.chama
+    membership = request.membership
     
     if request.method == 'POST':
         form = TransactionForm(request.POST)
@@ -311,7 +484,8 @@ def transaction_add(request, chama_id):
             transaction = form.save(commit=False)
             transaction.chama = chama
             transaction.created_by = request.user
-            transaction.save()
+            with db_transaction.atomic():
+                transaction.save()
             messages.success(request, 'Transaction recorded successfully!')
             return redirect('transaction_list', chama_id=chama_id)
     else:
@@ -323,17 +497,31 @@ def transaction_add(request, chama_id):
         'membership': membership,
     })
 
+@chama_member_required()
+def transaction_export(request, chama_id):
+    form = LedgerExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    rows = transaction_rows(
+        chama_ids=[chama_id],
+        date_from=form.cleaned_data['date_from'],
+        date_to=form.cleaned_data['date_to'],
+        transaction_types=form.cleaned_data['type'],
+    )
+    return stream_csv(f'transactions-{chama_id}.csv', TRANSACTION_COLUMNS, rows)
+
 # Announcement Views
-@login_required
+@replica_reads
+@chama_member_required()
 def announcement_list(request, chama_id):
-    chama = get_object_or_404(Chama, id=chama_id)
-    membership = Membership.objects.filter(chama=chama, user=request.user, is_active=True).first()
-    
-    if not membership:
-        messages.error(request, 'You are not a member of this Chama.')
-        return redirect('chama_list')
+    chama = request.chama
+    membership = request.membership
     
-    announcements = Announcement.objects.filter(chama=chama).order_by('-created_at')
+    announcements = paginate_keyset(
+        request,
+        Announcement.objects.filter(chama=chama).select_related('created_by'),
+        ANNOUNCEMENT_ORDERING,
+    )
     
     return render(request, 'core/announcement_list.html', {
         'chama': chama,
@@ -341,14 +529,14 @@ def announcement_list(request, chama_id):
         'announcements': announcements,
     })
 
-@login_required
+@chama_member_required(
+    roles=Membership.EDITOR_ROLES,
+    message='You do not have permission to create announcements.',
+    redirect_to='chama_detail',
+)
 def announcement_add(request, chama_id):
-    chama = get_object_or_404(Chama, id=chama_id)
-    membership = Membership.objects.filter(chama=chama, user=request.user, is_active=True).first()
-    
-    if not membership or not membership.can_edit_chama():
-        messages.error(request, 'You do not have permission to create announcements.')
-        return redirect('chama_detail', chama_id=chama_id)
+    chama = request.chama
+    membership = request.membership
     
     if request.method == 'POST':
         form = AnnouncementForm(request.POST)
@@ -356,7 +544,10 @@ def announcement_add(request, chama_id):
             announcement = form.save(commit=False)
             announcement.chama = chama
             announcement.created_by = request.user
-            announcement.save()
+            with db_transaction.atomic():
+                announcement.save()
+                if announcement.is_important:
+                    enqueue('notifications.announcement', {'announcement_id': announcement.pk})
             messages.success(request, 'Announcement created successfully!')
             return redirect('announcement_list', chama_id=chama_id)
     else:
@@ -368,17 +559,77 @@ def announcement_add(request, chama_id):
         'membership': membership,
     })
 
+# Notification Views
+@login_required
+def notification_list(request):
+    notifications = Notification.objects.filter(user=request.user)
+    
+    if request.method == 'POST':
+        notifications.filter(is_read=False).update(is_read=True)
+        return redirect('notification_list')
+    
+    return render(request, 'core/notification_list.html', {
+        'notifications': paginate_keyset(
+            request, notifications.select_related('chama'), NOTIFICATION_ORDERING
+        ),
+        'unread_count': notifications.filter(is_read=False).count(),
+    })
+
+# Search
+@login_required
+def search(request):
+    query = request.GET.get('q', '').strip()
+    kind = request.GET.get('type', '')
+    kinds = [kind] if kind in SEARCH_KINDS else None
+    membership_map = get_membership_map(request.user)
+    hits = []
+    if query:
+        hits = get_search_backend().search(request.user.pk, list(membership_map), query, kinds)
+        chama_names = dict(Chama.objects.filter(pk__in={hit.chama_id for hit in hits}).values_list('pk', 'name'))
+        for hit in hits:
+            hit.chama_name = chama_names.get(hit.chama_id, '')
+            if hit.kind == 'message':
+                hit.url = reverse('message_detail', args=[hit.object_id])
+            elif hit.kind == 'announcement':
+                hit.url = reverse('announcement_list', args=[hit.chama_id])
+            else:
+                hit.url = reverse('transaction_list', args=[hit.chama_id])
+    
+    return render(request, 'core/search.html', {
+        'query': query,
+        'kind': kind if kinds else '',
+        'kinds': list(SEARCH_KINDS),
+        'hits': hits,
+    })
+
 # Message Views
 @login_required
 def message_list(request):
-    received_messages = Message.objects.filter(recipient=request.user).order_by('-created_at')
-    sent_messages = Message.objects.filter(sender=request.user).order_by('-created_at')
-    unread_count = received_messages.filter(is_read=False).count()
-    
+    archived = request.GET.get('archived') == '1'
     return render(request, 'core/message_list.html', {
-        'received_messages': received_messages,
-        'sent_messages': sent_messages,
-        'unread_count': unread_count,
+        'threads': paginate_keyset(request, inbox(request.user, archived=archived), INBOX_ORDERING),
+        'archived': archived,
+        'unread_count': get_unread_count(request.user.pk),
+        'preview_chars': PREVIEW_CHARS,
+    })
+
+@login_required
+def message_thread(request, thread_id):
+    participant = ThreadParticipant.objects.select_related('other').filter(
+        thread_id=thread_id, user=request.user
+    ).first()
+    if participant is None:
+        messages.error(request, 'You do not have permission to view this conversation.')
+        return redirect('message_list')
+    
+    thread_page = paginate_keyset(request, thread_messages(thread_id, since=participant.cleared_at), THREAD_ORDERING)
+    if participant.unread_count:
+        mark_threads_read(request.user.pk, [thread_id])
+    
+    return render(request, 'core/message_thread.html', {
+        'participant': participant,
+        'other': participant.other,
+        'thread_messages': thread_page,
     })
 
 @login_required
@@ -389,6 +640,7 @@ def message_send(request):
             message = form.save(commit=False)
             message.sender = request.user
             message.save()
+            adjust_unread_count(message.recipient_id, 1)
             messages.success(request, 'Message sent successfully!')
             return redirect('message_list')
     else:
@@ -409,16 +661,51 @@ def message_send(request):
 
 @login_required
 def message_detail(request, message_id):
-    message = get_object_or_404(Message, id=message_id)
+    message = get_object_or_404(
+        Message.objects.select_related('sender', 'recipient', 'chama').annotate(cleared=cleared_by(request.user)),
+        id=message_id,
+    )
     
     # Only sender or recipient can view
-    if message.sender != request.user and message.recipient != request.user:
+    if message.sender_id != request.user.id and message.recipient_id != request.user.id:
         messages.error(request, 'You do not have permission to view this message.')
         return redirect('message_list')
+    # Gone for this user once they deleted the conversation
+    if message.cleared:
+        raise Http404('No Message matches the given query.')
     
     # Mark as read if recipient
-    if message.recipient == request.user and not message.is_read:
-        message.is_read = True
-        message.save()
+    if message.recipient_id == request.user.id and not message.is_read:
+        read_message(message)
     
     return render(request, 'core/message_detail.html', {'message': message})
+
+@login_required
+@require_POST
+def message_bulk(request):
+    """
+    Bulk inbox actions: mark_all_read, or mark_read, archive, unarchive and
+    delete for the threads posted as ``threads``. Answers JSON to clients that
+    ask for it and redirects back to the inbox otherwise.
+    """
+    action = request.POST.get('action')
+    if action not in BULK_ACTIONS:
+        return JsonResponse({'error': f'Unknown action {action!r}.'}, status=400)
+    function, takes_threads = BULK_ACTIONS[action]
+    if takes_threads:
+        try:
+            thread_ids = [int(pk) for pk in request.POST.getlist('threads')]
+        except ValueError:
+            return JsonResponse({'error': 'Thread ids must be integers.'}, status=400)
+        updated = function(request.user.pk, thread_ids)
+    else:
+        updated = function(request.user.pk)
+    
+    if 'application/json' not in request.headers.get('Accept', ''):
+        messages.success(request, 'Your inbox has been updated.')
+        return redirect(reverse('message_list') + ('?archived=1' if request.POST.get('archived') == '1' else ''))
+    return JsonResponse({
+        'action': action,
+        'updated': updated,
+        'unread_count': get_unread_count(request.user.pk),
+    })
@@ -10,12 +10,23 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
+def env(name, default=None, cast=str):
+    """Read a setting from the environment, falling back to ``default`` when unset or empty."""
+    value = os.environ.get(name, '')
+    if value == '':
+        return default
+    if cast is bool:
+        return value.lower() in ('1', 'true', 'yes', 'on')
+    return cast(value)
+
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
 
@@ -42,10 +53,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.profiling.ProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.db.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -63,6 +76,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.unread_messages',
             ],
         },
     },
@@ -74,11 +88,79 @@ WSGI_APPLICATION = 'smartchama.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Every value can be overridden from the environment (DB_*, SQLITE_*).
+# core.sqlite is Django's SQLite backend plus per-connection PRAGMAs and
+# BEGIN IMMEDIATE transactions; any other ENGINE takes USER/PASSWORD/HOST/PORT.
+SQLITE_PRAGMAS = {
+    'synchronous': env('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    # Wait this long (ms) for the write lock instead of raising "database is locked"
+    'busy_timeout': env('SQLITE_BUSY_TIMEOUT', 5000, int),
+    'mmap_size': env('SQLITE_MMAP_SIZE', 128 * 1024 * 1024, int),
+    # Negative values are KiB: a 20 MB page cache per connection
+    'cache_size': env('SQLITE_CACHE_SIZE', -20000, int),
+    'temp_store': 'MEMORY',
+}
+# journal_mode is persistent in the database file, so it is only changed when
+# asked for. SQLITE_JOURNAL_MODE=WAL lets readers and the writer stop blocking
+# each other, and the WAL is only fsynced at checkpoints.
+if env('SQLITE_JOURNAL_MODE'):
+    SQLITE_PRAGMAS['journal_mode'] = env('SQLITE_JOURNAL_MODE')
+
+
+def database(prefix, name, **extra):
+    engine = env(f'{prefix}_ENGINE', 'core.sqlite')
+    config = {
+        'ENGINE': engine,
+        'NAME': env(f'{prefix}_NAME', name),
+        # Keep connections open across requests; health checks replace ones that went away
+        'CONN_MAX_AGE': env('DB_CONN_MAX_AGE', 60, int),
+        'CONN_HEALTH_CHECKS': env('DB_CONN_HEALTH_CHECKS', True, bool),
+        **extra,
+    }
+    if engine == 'core.sqlite':
+        config['OPTIONS'] = {
+            'pragmas': SQLITE_PRAGMAS,
+            'transaction_mode': env('SQLITE_TRANSACTION_MODE', 'IMMEDIATE'),
+        }
+    else:
+        config.update(
+            USER=env(f'{prefix}_USER', ''),
+            PASSWORD=env(f'{prefix}_PASSWORD', ''),
+            HOST=env(f'{prefix}_HOST', ''),
+            PORT=env(f'{prefix}_PORT', ''),
+        )
+    return config
+
+
 DATABASES = {
+    'default': database('DB', BASE_DIR / 'db.sqlite3'),
+}
+
+# Optional read replica. GETs of views marked @replica_reads (lists and
+# reports) read from it; everything else stays on the primary. On SQLite,
+# pointing DB_REPLICA_NAME at the primary file gives those views their own
+# read-only connection, which under WAL never waits on writers.
+if env('DB_REPLICA_NAME'):
+    DATABASES['replica'] = database('DB_REPLICA', None, TEST={'MIRROR': 'default'})
+    if DATABASES['replica']['ENGINE'] == 'core.sqlite':
+        DATABASES['replica']['OPTIONS']['pragmas'] = dict(SQLITE_PRAGMAS, query_only='ON')
+
+DATABASE_ROUTERS = ['core.db.ReplicaRouter']
+
+# After a write, a browser reads from the primary for this long (read-your-writes)
+REPLICA_PIN_SECONDS = env('REPLICA_PIN_SECONDS', 5, int)
+
+# Cache versions, dashboard stats, unread counters, membership maps and the
+# shared object-cache layer. Invalidations only reach the processes that share
+# this cache, so with several web processes or a run_worker point every one of
+# them at the same server, e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# and CACHE_LOCATION=redis://127.0.0.1:6379. The LocMemCache default is
+# private to each process and only suits a single development server.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': env('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': env('CACHE_LOCATION', ''),
+    },
 }
 
 
@@ -122,7 +204,92 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Processes used by generate_statements; 0 or 1 renders in the calling process
+STATEMENT_WORKERS = 4
+
+# Background jobs (python manage.py run_worker)
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_BACKOFF = 10
+JOB_RETRY_BACKOFF_MAX = 3600
+JOB_LOCK_TIMEOUT = 15 * 60
+# How often (seconds) each running worker looks for expired locks
+JOB_STALE_CHECK_INTERVAL = 60
+
+# Announcement notifications; swap in core.notifications.DjangoEmailBackend or an SMS gateway backend in production
+NOTIFICATION_BACKENDS = {
+    'email': 'core.notifications.ConsoleBackend',
+    'sms': 'core.notifications.ConsoleBackend',
+}
+NOTIFICATION_BATCH_SIZE = 200
+# Undelivered notifications are retried on later passes until they have failed this many times
+NOTIFICATION_MAX_ATTEMPTS = 3
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Keyset pagination for list views (override per request with ?page_size=)
+PAGINATION_PAGE_SIZE = 25
+PAGINATION_MAX_PAGE_SIZE = 200
+
+# Dashboard stat blocks are invalidated by signals; the timeout only bounds memory
+DASHBOARD_CACHE_TIMEOUT = 600
+
+# Chama, Membership and UserProfile rows by primary key (core.cache.ObjectCache).
+# Each process keeps up to LOCAL_MAX_ENTRIES per model for LOCAL_TTL seconds,
+# which bounds how long another process's write can go unseen there
+OBJECT_CACHE_LOCAL_MAX_ENTRIES = 1000
+OBJECT_CACHE_LOCAL_TTL = 5
+OBJECT_CACHE_TIMEOUT = 3600
+
+# ProfilingMiddleware collects per-view metrics and times template rendering;
+# turning it off skips both
+PROFILING_ENABLED = env('PROFILING_ENABLED', True, bool)
+
+# Per-view SQL query budgets keyed by URL name, enforced by ProfilingMiddleware.
+# Exceeding one logs a warning, or raises when QUERY_BUDGET_STRICT is on; the
+# test runner turns it on for the whole suite.
+QUERY_BUDGETS = {
+    'dashboard': 12,
+    'profile': 5,
+    'chama_list': 6,
+    'chama_detail': 12,
+    'contribution_list': 7,
+    'transaction_list': 6,
+    'announcement_list': 6,
+    'message_list': 8,
+    'message_detail': 6,
+    'message_thread': 8,
+    'message_bulk': 10,
+    'notification_list': 6,
+    'search': 6,
+    'dashboard_async': 12,
+    'chama_detail_async': 12,
+    'arrears_report': 8,
+    'api_chama_list': 4,
+    'api_chama_detail': 4,
+    'api_membership_list': 4,
+    'api_contribution_list': 4,
+    'api_transaction_list': 4,
+    'api_announcement_list': 4,
+    'api_message_list': 3,
+}
+QUERY_BUDGET_STRICT = False
+TEST_RUNNER = 'core.test_runner.StrictQueryBudgetRunner'
+
+# Async views run independent reads on separate threads/connections; None picks
+# automatically (off for in-memory SQLite, which other connections can't open)
+ASYNC_PARALLEL_READS = None
+
+# Server-sent events at /events/ (needs ASGI). 'memory' pushes through an
+# in-process broker; 'poll' has each stream poll the database, for multi-process deployments
+EVENTS_STREAM_ENABLED = False
+EVENTS_BACKEND = 'memory'
+EVENTS_POLL_INTERVAL = 2.0
+EVENTS_KEEPALIVE = 15.0
+EVENTS_MAX_STREAM_SECONDS = 300
+
+# Full-text search backend (dotted path). None picks SQLite FTS5 on SQLite and
+# a plain icontains scan elsewhere; run rebuild_search_index after switching
+SEARCH_BACKEND = None